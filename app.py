@@ -1,70 +1,310 @@
-import argparse
-from src.language_compiler.pipeline import LanguageCompiler
-
-def main():
-    ap = argparse.ArgumentParser(
-        description="Language Compiler: NL → Logic → Pseudocode → (Optional) Python"
-    )
-
-    ap.add_argument(
-        "instruction",
-        type=str,
-        help="Natural-language instruction to compile"
-    )
-
-    ap.add_argument(
-        "--code",
-        action="store_true",
-        help="Also generate Python code from pseudocode"
-    )
-
-    ap.add_argument(
-        "--interactive",
-        action="store_true",
-        help="Return missing clarification fields for ambiguous instructions"
-    )
-
-    ap.add_argument(
-        "--model",
-        type=str,
-        default="qwen-mini",
-        choices=["qwen-mini", "phi-mini"],
-        help="Choose a lightweight local CPU model (default: qwen-mini)"
-    )
-
-    args = ap.parse_args()
-
-    # Initialize compiler with selected model
-    compiler = LanguageCompiler(model=args.model)
-
-    # Run compile pipeline
-    out = compiler.compile(
-        args.instruction,
-        to_code=args.code,
-        interactive=args.interactive
-    )
-
-    # Print reasoning
-    print("\n=== Reasoning (Logic Plan) ===")
-    for step in out.reasoning.steps:
-        deps = f"  depends_on={step.depends_on}" if step.depends_on else ""
-        print(f"- [{step.role}] {step.id}: {step.text}{deps}")
-
-    # Print pseudocode
-    print("\n=== Pseudocode ===")
-    print(out.pseudocode.code)
-
-    # Print missing clarifications
-    if out.clarifications_needed:
-        print("\n=== Missing Clarifications ===")
-        for f in out.clarifications_needed:
-            print(f"- {f}")
-
-    # Print Python code (optional)
-    if out.code:
-        print("\n=== Python Code ===")
-        print(out.code.code)
-
-
-if __name__ == "__main__":
-    main()
+import argparse
+import os
+from src.language_compiler.completion_cache import DEFAULT_CACHE_PATH
+from src.language_compiler.daemon import DEFAULT_SOCKET_PATH, DaemonUnavailable, request, serve
+
+# The pipeline (torch, transformers) is imported only when compiling
+# in-process, so a client talking to a warm daemon starts instantly.
+
+LM_DEFAULTS = {"model": "qwen-mini", "precision": "auto", "backend": "torch"}
+
+
+def main():
+    ap = argparse.ArgumentParser(
+        description="Language Compiler: NL → Logic → Pseudocode → (Optional) Python"
+    )
+
+    ap.add_argument(
+        "instruction",
+        type=str,
+        nargs="?",
+        help="Natural-language instruction to compile"
+    )
+
+    ap.add_argument(
+        "--code",
+        action="store_true",
+        help="Also generate Python code from pseudocode"
+    )
+
+    ap.add_argument(
+        "--interactive",
+        action="store_true",
+        help="Return missing clarification fields for ambiguous instructions"
+    )
+
+    ap.add_argument(
+        "--model",
+        type=str,
+        default=None,
+        choices=["qwen-mini", "phi-mini"],
+        help="Choose a lightweight local CPU model (default: qwen-mini)"
+    )
+
+    ap.add_argument(
+        "--precision",
+        type=str,
+        default=None,
+        choices=["auto", "float32", "bfloat16", "int8", "int4"],
+        help="Weight precision: float16/float32 by device (auto), bfloat16, int8 dynamic quantization (CPU) or int4 (needs torchao)"
+    )
+
+    ap.add_argument(
+        "--backend",
+        type=str,
+        default=None,
+        choices=["torch", "onnx"],
+        help="Run the LM and the embedder with PyTorch or ONNX Runtime (CPU, exported once from the local HF cache)"
+    )
+
+    ap.add_argument(
+        "--cache",
+        nargs="?",
+        const=DEFAULT_CACHE_PATH,
+        default=None,
+        metavar="PATH",
+        help=f"Reuse LM completions from an on-disk cache (default path: {DEFAULT_CACHE_PATH})"
+    )
+
+    ap.add_argument(
+        "--stream",
+        action="store_true",
+        help="Print each section as soon as it is ready and stream generated tokens"
+    )
+
+    ap.add_argument(
+        "--serve",
+        action="store_true",
+        help="Run a compile daemon that keeps the models loaded"
+    )
+
+    ap.add_argument(
+        "--socket",
+        type=str,
+        default=DEFAULT_SOCKET_PATH,
+        metavar="PATH",
+        help=f"Unix socket of the compile daemon (default: {DEFAULT_SOCKET_PATH})"
+    )
+
+    ap.add_argument(
+        "--no-daemon",
+        action="store_true",
+        help="Always compile in-process, even if a daemon is running"
+    )
+
+    ap.add_argument(
+        "--input",
+        type=str,
+        default=None,
+        metavar="FILE.jsonl",
+        help="Compile every instruction in a JSONL file (strings or {\"instruction\": ...} objects)"
+    )
+
+    ap.add_argument(
+        "--output",
+        type=str,
+        default=None,
+        metavar="FILE.jsonl",
+        help="With --input: append one CompilerOutput JSON line per instruction, resuming where a previous run stopped"
+    )
+
+    ap.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="With --input: number of compiler processes, each loading its own models"
+    )
+
+    ap.add_argument(
+        "--batch-size",
+        type=int,
+        default=8,
+        help="With --input: instructions per compile_batch() call"
+    )
+
+    args = ap.parse_args()
+
+    # Unset LM options stay out of daemon requests, so the daemon's own
+    # --model / --precision / --backend apply unless overridden here
+    explicit = {name: getattr(args, name) for name in LM_DEFAULTS if getattr(args, name) is not None}
+    for name, default in LM_DEFAULTS.items():
+        if getattr(args, name) is None:
+            setattr(args, name, default)
+
+    if args.serve:
+        serve(
+            args.socket,
+            model=args.model,
+            cache_path=args.cache,
+            precision=args.precision,
+            backend=args.backend
+        )
+        return
+
+    if args.input is not None:
+        if args.output is None:
+            ap.error("--input requires --output")
+        if args.instruction is not None or args.stream:
+            ap.error("--input cannot be combined with an instruction or --stream")
+        compile_file(args)
+        return
+
+    if args.instruction is None:
+        ap.error("the following arguments are required: instruction")
+
+    if not args.no_daemon:
+        try:
+            remote_compile(args, explicit)
+            return
+        except DaemonUnavailable:
+            pass
+
+    # Initialize compiler with selected model
+    from src.language_compiler.pipeline import LanguageCompiler
+    from src.language_compiler.completion_cache import CompletionCache
+
+    cache = CompletionCache(args.cache) if args.cache else None
+    compiler = LanguageCompiler(
+        model=args.model,
+        cache=cache,
+        precision=args.precision,
+        backend=args.backend
+    )
+
+    if args.stream:
+        print_events(compiler.compile_stream(
+            args.instruction,
+            to_code=args.code,
+            interactive=args.interactive
+        ))
+        return
+
+    # Run compile pipeline
+    out = compiler.compile(
+        args.instruction,
+        to_code=args.code,
+        interactive=args.interactive
+    )
+
+    print_output(out)
+
+
+def compile_file(args):
+    """Bulk mode: compiles args.input into args.output in-process."""
+    import json
+    from src.language_compiler.bulk import compile_file as compile_jsonl
+
+    summary = compile_jsonl(
+        args.input,
+        args.output,
+        model_name=args.model,
+        cache_path=args.cache,
+        precision=args.precision,
+        backend=args.backend,
+        to_code=args.code,
+        interactive=args.interactive,
+        workers=args.workers,
+        batch_size=args.batch_size
+    )
+    print(json.dumps(summary))
+
+
+def remote_compile(args, lm_options=None):
+    """
+    Compiles through the daemon on args.socket. Raises DaemonUnavailable
+    before printing anything if no daemon is listening. Only the
+    `lm_options` given (model, precision, backend) override the daemon's.
+    """
+    from src.language_compiler.schemas import CompileEvent, CompilerOutput
+
+    messages = request(
+        {
+            "instruction": args.instruction,
+            "to_code": args.code,
+            "interactive": args.interactive,
+            **(lm_options or {}),
+            "cache": os.path.abspath(args.cache) if args.cache else None,
+            "stream": args.stream
+        },
+        socket_path=args.socket
+    )
+
+    if args.stream:
+        print_events(
+            CompileEvent.model_validate(m["event"]) if "event" in m
+            else CompileEvent(kind="done", output=CompilerOutput.model_validate(m["output"]))
+            for m in messages
+        )
+        return
+
+    for message in messages:
+        print_output(CompilerOutput.model_validate(message["output"]))
+
+
+def print_output(out):
+    print_reasoning(out.reasoning)
+
+    # Print pseudocode
+    print("\n=== Pseudocode ===")
+    print(out.pseudocode.code)
+
+    print_clarifications(out.clarifications_needed)
+
+    # Print Python code (optional)
+    if out.code:
+        print("\n=== Python Code ===")
+        print(out.code.code)
+
+
+def print_reasoning(plan):
+    print("\n=== Reasoning (Logic Plan) ===")
+    for step in plan.steps:
+        deps = f"  depends_on={step.depends_on}" if step.depends_on else ""
+        print(f"- [{step.role}] {step.id}: {step.text}{deps}")
+
+
+def print_clarifications(fields):
+    if fields:
+        print("\n=== Missing Clarifications ===")
+        for f in fields:
+            print(f"- {f}")
+
+
+def print_events(events):
+    """
+    Prints sections as compile_stream() produces them. Token chunks are
+    echoed live; if post-processing changed the text, the final version
+    is printed underneath.
+    """
+    streamed = ""
+
+    for event in events:
+        if event.kind == "plan":
+            print_reasoning(event.plan)
+
+        elif event.kind in ("pseudocode_token", "code_token"):
+            if not streamed:
+                title = "Pseudocode" if event.kind == "pseudocode_token" else "Python Code"
+                print(f"\n=== {title} ===")
+            streamed += event.text
+            print(event.text, end="", flush=True)
+
+        elif event.kind in ("pseudocode", "code"):
+            final = event.pseudocode.code if event.kind == "pseudocode" else event.code.code
+            if not streamed:
+                title = "Pseudocode" if event.kind == "pseudocode" else "Python Code"
+                print(f"\n=== {title} ===")
+                print(final)
+            else:
+                print()
+                if final != streamed.strip():
+                    print("--- cleaned ---")
+                    print(final)
+            streamed = ""
+
+        elif event.kind == "clarifications":
+            print_clarifications(event.clarifications)
+
+
+if __name__ == "__main__":
+    main()
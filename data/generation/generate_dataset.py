@@ -1,28 +1,178 @@
-import json
-from data.generation.instruction_templates import (
-    simple_condition, negation, multi_condition, temporal, ambiguous
-)
-
-dataset = []
-
-def add(n, fn, label):
-    for _ in range(n):
-        dataset.append({
-            "type": label,
-            "instruction": fn()
-        })
-
-add(30, simple_condition, "simple")
-add(30, simple_condition, "threshold")
-add(22, negation, "negation")
-add(22, multi_condition, "multi_condition")
-add(22, temporal, "temporal")
-add(22, ambiguous, "ambiguous")
-
-
-print("Generated", len(dataset), "instructions")
-with open("data/generated_dataset.jsonl", "w") as f:
-    for item in dataset:
-        f.write(json.dumps(item) + "\n")
-        
-print("Saved to data/generated_dataset.jsonl")
\ No newline at end of file
+"""
+Seeded corpus builder: instructions with gold plans and pseudocode.
+
+Shard i draws from random.Random(f"{seed}:{i}"), worker processes build
+shards in parallel, and the main process writes them in shard order,
+dropping duplicate instructions, until --n unique items are written.
+Each type is capped at its share of --n (see TEMPLATES), so a type whose
+sentences repeat more often than others keeps its share. The same --seed
+and --n always produce the same file, whatever --workers is.
+
+Each line matches the gold format of eval/run_eval.py:
+{"type", "instruction", "gold_steps", "gold_pseudocode", "vague_phrases"}.
+gold_pseudocode is the deterministic PseudocodeRenderer output for
+gold_steps. Usage:
+
+    python -m data.generation.generate_dataset --n 1000000 --workers 8 --seed 0
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Tuple
+
+from data.generation.instruction_templates import (
+    event_condition, threshold_condition, negation, multi_condition, temporal, ambiguous
+)
+from src.language_compiler.phrase_scanner import vague_phrases
+from src.language_compiler.pseudocode_renderer import PseudocodeRenderer
+from src.language_compiler.schemas import LogicPlan
+
+# (label, template, weight); weights follow the original 148-item mix and
+# set each type's share of --n
+TEMPLATES = [
+    ("simple", event_condition, 30),
+    ("threshold", threshold_condition, 30),
+    ("negation", negation, 22),
+    ("multi_condition", multi_condition, 22),
+    ("temporal", temporal, 22),
+    ("ambiguous", ambiguous, 22),
+]
+
+
+def make_item(label: str, instruction: str, steps: List[Dict], renderer: PseudocodeRenderer) -> Dict:
+    plan = LogicPlan(steps=steps)
+    pseudocode = renderer.render(plan)
+    if pseudocode is None:
+        raise ValueError(f"Gold plan for {instruction!r} cannot be rendered")
+
+    return {
+        "type": label,
+        "instruction": instruction,
+        "gold_steps": [s.model_dump() for s in plan.steps],
+        "gold_pseudocode": pseudocode,
+        # same cues the compiler flags as ambiguous
+        "vague_phrases": vague_phrases(instruction)
+    }
+
+
+def quotas(n: int) -> Dict[str, int]:
+    """Items per type: n split by TEMPLATES weight (largest remainder)."""
+    total = sum(weight for _, _, weight in TEMPLATES)
+    shares = {label: n * weight / total for label, _, weight in TEMPLATES}
+    counts = {label: int(share) for label, share in shares.items()}
+
+    by_remainder = sorted(shares, key=lambda label: counts[label] - shares[label])
+    for label in by_remainder[:n - sum(counts.values())]:
+        counts[label] += 1
+    return counts
+
+
+def generate_shard(seed: int, shard: int, size: int) -> List[Tuple[str, bytes, str]]:
+    """
+    `size` items (duplicates possible) from shard `shard`'s own RNG, as
+    (type, dedup key, JSON line) so the writer only compares and writes.
+    """
+    rng = random.Random(f"{seed}:{shard}")
+    renderer = PseudocodeRenderer()
+
+    labels = [label for label, _, _ in TEMPLATES]
+    templates = {label: template for label, template, _ in TEMPLATES}
+    weights = [weight for _, _, weight in TEMPLATES]
+
+    lines = []
+    for label in rng.choices(labels, weights=weights, k=size):
+        instruction, steps = templates[label](rng)
+        key = hashlib.blake2b(instruction.encode("utf-8"), digest_size=8).digest()
+        lines.append((label, key, json.dumps(make_item(label, instruction, steps, renderer)) + "\n"))
+    return lines
+
+
+def _shards(seed: int, shard_size: int, workers: int) -> Iterator[List[Tuple[str, bytes, str]]]:
+    """Shards 0, 1, 2, ... in order; up to 2 * workers are built ahead."""
+    if workers <= 1:
+        shard = 0
+        while True:
+            yield generate_shard(seed, shard, shard_size)
+            shard += 1
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        shard = 0
+        try:
+            while True:
+                while len(pending) < 2 * workers:
+                    pending.append(pool.submit(generate_shard, seed, shard, shard_size))
+                    shard += 1
+                yield pending.popleft().result()
+        finally:
+            # Closed early: drop shards nobody will read
+            for future in pending:
+                future.cancel()
+
+
+def generate(
+    n: int,
+    output_path: str,
+    seed: int = 0,
+    workers: int = 1,
+    shard_size: int = 10_000,
+    max_shards: int = 10_000
+) -> int:
+    """
+    Streams `n` unique instructions to `output_path`, each type up to its
+    quota, and returns the number written (fewer than `n` only if
+    `max_shards` shards run out of new instructions). Duplicates are
+    detected by an 8-byte hash.
+    """
+    remaining = quotas(n)
+    seen = set()
+    written = 0
+    started = time.perf_counter()
+
+    shards = _shards(seed, shard_size, workers)
+    try:
+        with open(output_path, "w") as f:
+            for index, lines in enumerate(shards):
+                if written >= n or index >= max_shards:
+                    break
+
+                for label, key, line in lines:
+                    if not remaining[label] or key in seen:
+                        continue
+                    seen.add(key)
+                    remaining[label] -= 1
+                    f.write(line)
+                    written += 1
+                    if written >= n:
+                        break
+
+                f.flush()
+                elapsed = time.perf_counter() - started
+                print(f"[generate] {written}/{n} ({written / elapsed:.0f} items/s)", file=sys.stderr, flush=True)
+    finally:
+        shards.close()
+
+    return written
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Generate a seeded instruction corpus with gold labels")
+    ap.add_argument("--n", type=int, default=148, help="Number of unique instructions")
+    ap.add_argument("--output", default="data/generated_dataset.jsonl")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--shard-size", type=int, default=10_000)
+    args = ap.parse_args()
+
+    written = generate(args.n, args.output, args.seed, args.workers, min(args.shard_size, max(args.n, 1)))
+    print(f"Saved {written} instructions to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
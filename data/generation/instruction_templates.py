@@ -1,47 +1,252 @@
-import random
-
-METRICS = [
-    "temperature",
-    "humidity",
-    "air quality index",
-    "CPU usage",
-    "queue length",
-    "battery level"
-]
-
-ACTIONS = [
-    "turn on the AC",
-    "send a notification",
-    "close the windows",
-    "activate the alarm",
-    "start recording",
-    "decrease the fan speed"
-]
-
-THRESHOLDS = ["20", "25", "30", "70", "80", "90", "150"]
-
-TIME_PHRASES = [
-    "after 5 minutes",
-    "during the night",
-    "when it is evening",
-    "after a while",
-    "as soon as possible"
-]
-
-def simple_condition():
-    return f"If {random.choice(METRICS)} exceeds {random.choice(THRESHOLDS)}, {random.choice(ACTIONS)}."
-
-def negation():
-    return f"{random.choice(ACTIONS).capitalize()} unless {random.choice(METRICS)} is low."
-
-def multi_condition():
-    return (
-        f"If {random.choice(METRICS)} exceeds {random.choice(THRESHOLDS)} "
-        f"and {random.choice(METRICS)} is high, {random.choice(ACTIONS)}."
-    )
-
-def temporal():
-    return f"{random.choice(ACTIONS).capitalize()} {random.choice(TIME_PHRASES)}."
-
-def ambiguous():
-    return f"{random.choice(ACTIONS).capitalize()} when {random.choice(METRICS)} is high."
+import random
+import string
+from typing import Dict, List, Optional, Tuple
+
+from src.language_compiler.phrase_scanner import VAGUE_PHRASES, vague_phrases
+
+METRICS = [
+    "temperature",
+    "humidity",
+    "air quality index",
+    "CPU usage",
+    "queue length",
+    "battery level",
+    "noise level",
+    "water level",
+    "memory usage",
+    "wind speed",
+    "pressure",
+    "CO2 level"
+]
+
+ACTIONS = [
+    "turn on the AC",
+    "send a notification",
+    "close the windows",
+    "activate the alarm",
+    "start recording",
+    "decrease the fan speed",
+    "turn off the heater",
+    "open the vents",
+    "lock the door",
+    "dim the lights",
+    "notify the operator",
+    "restart the server"
+]
+
+ROOMS = [
+    "kitchen", "lobby", "server room", "garage", "office", "warehouse",
+    "lab", "greenhouse", "basement", "attic", "hallway", "bedroom"
+]
+
+# "{place}" is "" or " in room 214", " on floor 3", ...
+EVENTS = [
+    "the door opens{place}",
+    "motion is detected{place}",
+    "a window is opened{place}",
+    "someone enters{place}",
+    "smoke is detected{place}",
+    "a leak is detected{place}",
+    "the power goes out{place}",
+    "the alarm is triggered{place}",
+    "the doorbell rings",
+    "it starts raining",
+    "a package arrives",
+    "the garage door opens"
+]
+
+# (phrase, operator); phrasings the rule parser understands
+OPERATORS = [
+    ("exceeds", ">"),
+    ("is above", ">"),
+    ("goes over", ">"),
+    ("rises above", ">"),
+    ("is greater than", ">"),
+    ("is below", "<"),
+    ("drops below", "<"),
+    ("falls below", "<"),
+    ("is less than", "<"),
+    ("is at least", ">="),
+    ("is at most", "<="),
+]
+
+TRIGGERS = ["If", "When", "Whenever"]
+
+THRESHOLDS = ["20", "25", "30", "70", "80", "90", "150"]
+
+# Parts of the day → value of the "time of day" condition
+DAY_PARTS = {
+    "during the night": "night",
+    "in the morning": "morning",
+    "in the afternoon": "afternoon",
+    "in the evening": "evening",
+}
+
+# Vague wording that IntentParser turns into a clarification request;
+# every pattern holds at least one VAGUE_PHRASES entry with a field
+AMBIGUOUS_PATTERNS = [
+    "{action} when the queue{place} gets too long.",
+    "{action} when the line{place} gets too long.",
+    "{action} after a while.",
+    "After a while, {action}.",
+    "If {metric} rises a bit, {action}.",
+    "If {metric} drops a bit, {action}.",
+    "{action} quickly when {metric} changes.",
+    "Quickly {action} if {metric} spikes.",
+    "{action} soon.",
+    "Soon after {event}, {action}.",
+    "{action} as soon as possible.",
+    "When the system is busy, {action}.",
+    "When the network{place} is busy, {action}.",
+    "If the server is overloaded, {action}.",
+    "If the server{place} is overloaded, {action}.",
+]
+
+Steps = List[Dict]
+
+
+# ============================================================
+# Building blocks
+# ============================================================
+
+def _cap(text: str) -> str:
+    # str.capitalize() would also lowercase "AC" and "CPU"
+    return text[0].upper() + text[1:]
+
+
+def _place(rng: random.Random) -> str:
+    kind = rng.randrange(5)
+    if kind == 0:
+        return ""
+    if kind == 1:
+        return f" in room {rng.randint(100, 999)}"
+    if kind == 2:
+        return f" on floor {rng.randint(1, 40)}"
+    if kind == 3:
+        return f" in zone {rng.choice(string.ascii_uppercase)}"
+    return f" in the {rng.choice(ROOMS)}"
+
+
+def _action_text(rng: random.Random) -> str:
+    return rng.choice(ACTIONS) + _place(rng)
+
+
+def _event(rng: random.Random) -> str:
+    return rng.choice(EVENTS).format(place=_place(rng))
+
+
+def _threshold(rng: random.Random) -> str:
+    # Mostly the classic thresholds, otherwise any value up to 999
+    return rng.choice(THRESHOLDS) if rng.random() < 0.3 else str(rng.randint(1, 999))
+
+
+def _condition(rng: random.Random, sid: str, metric: Optional[str] = None) -> Tuple[str, Dict]:
+    metric = metric or rng.choice(METRICS)
+    phrase, op = rng.choice(OPERATORS)
+    value = _threshold(rng)
+    step = {"id": sid, "role": "condition", "text": f"{metric} {op} {value}", "operator": op, "value": value}
+    return f"{metric} {phrase} {value}", step
+
+
+def _timing(rng: random.Random, sid: str) -> Tuple[str, Dict]:
+    """A time phrase and its condition, e.g. "after 20 minutes" → elapsed minutes >= 20."""
+    kind = rng.randrange(4)
+    if kind == 0:
+        n = rng.randint(1, 180)
+        phrase, lhs, op, value = f"after {n} minute{'s' if n > 1 else ''}", "elapsed minutes", ">=", str(n)
+    elif kind == 1:
+        n = rng.randint(1, 24)
+        phrase, lhs, op, value = f"after {n} hour{'s' if n > 1 else ''}", "elapsed hours", ">=", str(n)
+    elif kind == 2:
+        value = f"{rng.randint(0, 23):02d}:{rng.choice([0, 15, 30, 45]):02d}"
+        word, op = rng.choice([("at", "=="), ("before", "<"), ("after", ">")])
+        phrase, lhs = f"{word} {value}", "time"
+    else:
+        phrase = rng.choice(list(DAY_PARTS))
+        lhs, op, value = "time of day", "==", DAY_PARTS[phrase]
+
+    step = {"id": sid, "role": "condition", "text": f"{lhs} {op} {value}", "operator": op, "value": value}
+    return phrase, step
+
+
+def _action(action: str, sid: str, depends_on: List[str]) -> Dict:
+    return {"id": sid, "role": "action", "text": action, "depends_on": depends_on}
+
+
+def _vague_field(instruction: str) -> Optional[str]:
+    """Clarification field IntentParser.precheck asks for, or None."""
+    fields = [VAGUE_PHRASES[p] for p in vague_phrases(instruction) if VAGUE_PHRASES[p]]
+    return fields[0] if fields else None
+
+
+def _clarification(field: str) -> Steps:
+    # Mirrors IntentParser.precheck for vague instructions
+    return [{
+        "id": "S1",
+        "role": "note",
+        "text": "Ambiguous instruction",
+        "clarification_needed": True,
+        "clarification_field": field,
+    }]
+
+
+# ============================================================
+# Templates: rng → (instruction, gold steps)
+# ============================================================
+
+def event_condition(rng: random.Random = random) -> Tuple[str, Steps]:
+    event = _event(rng)
+    action = _action_text(rng)
+    cond = {"id": "S1", "role": "condition", "text": event}
+    return f"{rng.choice(TRIGGERS)} {event}, {action}.", [cond, _action(action, "S2", ["S1"])]
+
+
+def threshold_condition(rng: random.Random = random) -> Tuple[str, Steps]:
+    clause, cond = _condition(rng, "S1")
+    action = _action_text(rng)
+    return f"{rng.choice(TRIGGERS)} {clause}, {action}.", [cond, _action(action, "S2", ["S1"])]
+
+
+def negation(rng: random.Random = random) -> Tuple[str, Steps]:
+    action = _action_text(rng)
+    if rng.random() < 0.5:
+        clause = _event(rng)
+        cond = {"id": "S1", "role": "condition", "text": clause}
+    else:
+        clause, cond = _condition(rng, "S1")
+    cond["negated"] = True
+    return f"{_cap(action)} unless {clause}.", [cond, _action(action, "S2", ["S1"])]
+
+
+def multi_condition(rng: random.Random = random) -> Tuple[str, Steps]:
+    # Two different metrics, so the conditions never contradict each other
+    metric1, metric2 = rng.sample(METRICS, 2)
+    first, cond1 = _condition(rng, "S1", metric1)
+    second, cond2 = _condition(rng, "S2", metric2)
+    action = _action_text(rng)
+    return (
+        f"If {first} and {second}, {action}.",
+        [cond1, cond2, _action(action, "S3", ["S1", "S2"])]
+    )
+
+
+def temporal(rng: random.Random = random) -> Tuple[str, Steps]:
+    action = _action_text(rng)
+    phrase, cond = _timing(rng, "S1")
+    if rng.random() < 0.5:
+        instruction = f"{_cap(action)} {phrase}."
+    else:
+        instruction = f"{_cap(phrase)}, {action}."
+    return instruction, [cond, _action(action, "S2", ["S1"])]
+
+
+def ambiguous(rng: random.Random = random) -> Tuple[str, Steps]:
+    pattern = rng.choice(AMBIGUOUS_PATTERNS)
+    instruction = _cap(pattern.format(
+        action=_action_text(rng),
+        metric=rng.choice(METRICS),
+        event=_event(rng),
+        place=_place(rng)
+    ))
+
+    return instruction, _clarification(_vague_field(instruction))
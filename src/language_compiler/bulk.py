@@ -0,0 +1,82 @@
+"""
+Bulk compilation of JSONL instruction files.
+
+    python app.py --input rules.jsonl --output compiled.jsonl --workers 4
+
+Each input line is a JSON string or an object with an "instruction" key
+(and optionally an "id", a string or integer). Each output line is the
+item's CompilerOutput JSON plus its "id" when given, otherwise its
+"index" (position among the input items). Lines are written in input
+order and flushed after every batch; a restarted run skips the items
+already in the output (see jsonl_runner): items with ids even if the
+input was reordered or edited, items without ids only if earlier lines
+were left alone.
+"""
+
+import json
+from functools import partial
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .jsonl_runner import WORKER, Key, init_compiler, key_fields, run_jsonl
+
+
+def iter_instructions(input_path: str) -> Iterator[Tuple[Key, str]]:
+    """(key, instruction) pairs from a JSONL file; blank lines are skipped."""
+    with open(input_path, "r", encoding="utf-8") as f:
+        position = 0
+        for number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+
+            item = json.loads(line)
+            key = ("index", position)
+            if isinstance(item, dict):
+                if "id" in item:
+                    if isinstance(item["id"], bool) or not isinstance(item["id"], (str, int)):
+                        raise ValueError(f"{input_path}:{number}: 'id' must be a string or an integer")
+                    key = ("id", item["id"])
+                item = item.get("instruction")
+            if not isinstance(item, str):
+                raise ValueError(f"{input_path}:{number}: expected a string or an object with an 'instruction' string")
+
+            yield key, item
+            position += 1
+
+
+def _compile_chunk(chunk: List[Tuple[Key, str]], to_code: bool, interactive: bool) -> List[Dict]:
+    instructions = [instruction for _, instruction in chunk]
+    outputs = WORKER["compiler"].compile_batch(instructions, to_code=to_code, interactive=interactive)
+    return [{**key_fields(key), **out.model_dump()} for (key, _), out in zip(chunk, outputs)]
+
+
+def compile_file(
+    input_path: str,
+    output_path: str,
+    model_name: str = "qwen-mini",
+    cache_path: Optional[str] = None,
+    precision: str = "auto",
+    backend: str = "torch",
+    to_code: bool = False,
+    interactive: bool = False,
+    workers: int = 1,
+    batch_size: int = 8,
+    progress_every: float = 10.0
+) -> Dict[str, float]:
+    """
+    Compiles every input item not yet in `output_path` and appends one
+    line per item, in input order.
+    """
+    summary = run_jsonl(
+        iter_instructions(input_path),
+        output_path,
+        process=partial(_compile_chunk, to_code=to_code, interactive=interactive),
+        init=init_compiler,
+        init_args=(model_name, cache_path, precision, backend),
+        workers=workers,
+        chunk_size=batch_size,
+        ordered=True,
+        label="bulk",
+        progress_every=progress_every
+    )
+    summary["compiled"] = summary.pop("written")
+    return summary
@@ -1,55 +1,111 @@
-import ast
-from .prompts import PYTHON_CODE_TEMPLATE
-from .lm_provider import LMProvider
-from .schemas import PseudocodeBlock, CodeBlock
-from .utils import clean_code
-
-class CodeGenerator:
-    """
-    Converts pseudocode → executable Python.
-    - Ensures deterministic output
-    - Repairs invalid Python via second-pass prompt
-    """
-
-    def __init__(self, lm: LMProvider):
-        self.lm = lm
-
-    # ------------------------------------------------------
-    # Helper: check if code is valid Python syntax
-    # ------------------------------------------------------
-    def _is_valid_python(self, code: str) -> bool:
-        try:
-            ast.parse(code)
-            return True
-        except SyntaxError:
-            return False
-
-    # ------------------------------------------------------
-    # Helper: second-pass correction if syntax fails
-    # ------------------------------------------------------
-    def _repair_code(self, pseudo: str) -> str:
-        fix_prompt = (
-            "The previous Python output contained syntax errors.\n"
-            "Regenerate correct, executable Python 3 code.\n\n"
-            "Pseudocode:\n"
-            f"{pseudo}"
-        )
-        fixed = self.lm.complete(fix_prompt, max_tokens=700)
-        return clean_code(fixed)
-
-    # ------------------------------------------------------
-    # Main generator
-    # ------------------------------------------------------
-    def generate_python(self, pseudo_block: PseudocodeBlock) -> CodeBlock:
-        pseudo = pseudo_block.code
-
-        # First attempt
-        prompt = PYTHON_CODE_TEMPLATE.format(pseudocode=pseudo)
-        code = self.lm.complete(prompt, max_tokens=700)
-        code = clean_code(code)
-
-        # Validate syntax
-        if not self._is_valid_python(code):
-            code = self._repair_code(pseudo)
-
-        return CodeBlock(language="python", code=code)
+import ast
+from typing import Iterator, List, Optional
+from .prompts import PYTHON_CODE_TEMPLATE
+from .lm_provider import LMProvider
+from .schemas import PseudocodeBlock, CodeBlock
+from .utils import clean_code
+from . import tracing
+
+class CodeGenerator:
+    """
+    Converts pseudocode → executable Python.
+    - Ensures deterministic output
+    - Repairs invalid Python via second-pass prompt
+    """
+
+    MAX_TOKENS = 700
+    STAGE = "code"
+
+    def __init__(self, lm: LMProvider):
+        self.lm = lm
+
+    # ------------------------------------------------------
+    # Helper: check if code is valid Python syntax
+    # ------------------------------------------------------
+    def _is_valid_python(self, code: str) -> bool:
+        try:
+            ast.parse(code)
+            return True
+        except SyntaxError:
+            return False
+
+    # ------------------------------------------------------
+    # Helper: second-pass correction if syntax fails
+    # ------------------------------------------------------
+    def _repair_prompt(self, pseudo: str) -> str:
+        return (
+            "The previous Python output contained syntax errors.\n"
+            "Regenerate correct, executable Python 3 code.\n\n"
+            "Pseudocode:\n"
+            f"{pseudo}"
+        )
+
+    def _repair_code(self, pseudo: str) -> str:
+        tracing.annotate(repaired=True)
+        with tracing.span("repair"):
+            fixed = self.lm.complete(self._repair_prompt(pseudo), max_tokens=self.MAX_TOKENS, stage=self.STAGE)
+        return clean_code(fixed)
+
+    def build_prompt(self, pseudo_block: PseudocodeBlock) -> str:
+        return PYTHON_CODE_TEMPLATE.format(pseudocode=pseudo_block.code)
+
+    # ------------------------------------------------------
+    # Main generator
+    # ------------------------------------------------------
+    def generate_python(self, pseudo_block: PseudocodeBlock) -> CodeBlock:
+        # First attempt
+        code = self.lm.complete(self.build_prompt(pseudo_block), max_tokens=self.MAX_TOKENS, stage=self.STAGE)
+        return self.block_from_output(code, pseudo_block)
+
+    def stream(self, pseudo_block: PseudocodeBlock) -> Iterator[str]:
+        """
+        Yields raw first-attempt Python tokens as they are generated.
+        Pass the joined chunks to block_from_output() for the cleaned
+        (and, if needed, repaired) block.
+        """
+        yield from self.lm.stream(self.build_prompt(pseudo_block), max_tokens=self.MAX_TOKENS, stage=self.STAGE)
+
+    def repair_prompt(self, code: str, pseudo_block: PseudocodeBlock) -> Optional[str]:
+        """
+        Second-pass prompt when cleaned `code` is not valid Python,
+        otherwise None. Lets callers that drive the LM themselves
+        (e.g. the async scheduler) run the repair pass.
+        """
+        if self._is_valid_python(code):
+            return None
+        return self._repair_prompt(pseudo_block.code)
+
+    def block_from_output(self, raw: str, pseudo_block: PseudocodeBlock) -> CodeBlock:
+        code = clean_code(raw)
+
+        # Validate syntax
+        if not self._is_valid_python(code):
+            code = self._repair_code(pseudo_block.code)
+
+        return CodeBlock(language="python", code=code)
+
+    def generate_python_batch(self, pseudo_blocks: List[PseudocodeBlock], batch_size: int = 8) -> List[CodeBlock]:
+        """
+        Same as generate_python() for many blocks. The first attempt and
+        the repair pass are each one complete_batch() call.
+        """
+        raws = self.lm.complete_batch(
+            [self.build_prompt(block) for block in pseudo_blocks],
+            max_tokens=self.MAX_TOKENS,
+            stage=self.STAGE,
+            batch_size=batch_size
+        )
+        codes = [clean_code(raw) for raw in raws]
+
+        broken = [i for i, code in enumerate(codes) if not self._is_valid_python(code)]
+        if broken:
+            fixed = self.lm.complete_batch(
+                [self._repair_prompt(pseudo_blocks[i].code) for i in broken],
+                max_tokens=self.MAX_TOKENS,
+                stage=self.STAGE,
+                batch_size=batch_size
+            )
+            for i, raw in zip(broken, fixed):
+                codes[i] = clean_code(raw)
+
+        return [CodeBlock(language="python", code=code) for code in codes]
@@ -0,0 +1,222 @@
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import weakref
+from typing import Dict, Optional
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "language_compiler", "completions.sqlite"
+)
+
+
+class CompletionCache:
+    """
+    Persistent, content-addressed cache of LM completions.
+
+    - Keyed by a SHA-256 of (model name, prompt, generation kwargs)
+    - SQLite-backed (WAL mode), so the CLI, the Streamlit app and the
+      eval runner can share one file on the same machine
+    - Capped at `max_entries`; least-recently-used entries are evicted.
+      The row count is kept in `counters` by triggers, so a put never
+      scans the table
+    - Counts hits and misses, per instance and across all processes
+
+    get() only reads. Access times and hit/miss counts are buffered in
+    memory and written in one transaction every `flush_every` lookups,
+    on put() and stats(), and at exit, so concurrent readers
+    never queue behind each other for the write lock.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_CACHE_PATH,
+        max_entries: int = 100_000,
+        timeout: float = 30.0,
+        flush_every: int = 64
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.flush_every = flush_every
+
+        self.hits = 0
+        self.misses = 0
+
+        self._local = threading.local()
+
+        # Buffered writes: key → last access time, and counter deltas
+        self._pending_lock = threading.Lock()
+        self._touched: Dict[str, float] = {}
+        self._pending_hits = 0
+        self._pending_misses = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS completions ("
+                " key TEXT PRIMARY KEY,"
+                " value TEXT NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS completions_lru ON completions(last_access)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS counters ("
+                " name TEXT PRIMARY KEY,"
+                " value INTEGER NOT NULL)"
+            )
+            conn.execute(
+                "INSERT OR IGNORE INTO counters(name, value) VALUES ('hits', 0), ('misses', 0)"
+            )
+
+            # Row count for eviction; seeded once for caches created before it existed
+            conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS completions_insert AFTER INSERT ON completions"
+                " BEGIN UPDATE counters SET value = value + 1 WHERE name = 'entries'; END"
+            )
+            conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS completions_delete AFTER DELETE ON completions"
+                " BEGIN UPDATE counters SET value = value - 1 WHERE name = 'entries'; END"
+            )
+            conn.execute(
+                "INSERT OR IGNORE INTO counters(name, value)"
+                " SELECT 'entries', COUNT(*) FROM completions"
+            )
+
+        atexit.register(_flush_at_exit, weakref.ref(self))
+
+    # ------------------------------------------------------
+    # Connection handling: one connection per thread and per
+    # process (sqlite connections must not cross a fork)
+    # ------------------------------------------------------
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def make_key(model_name: str, prompt: str, **gen_kwargs) -> str:
+        payload = json.dumps(
+            {"model": model_name, "prompt": prompt, "kwargs": gen_kwargs},
+            sort_keys=True,
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        row = self._conn().execute(
+            "SELECT value FROM completions WHERE key = ?", (key,)
+        ).fetchone()
+
+        with self._pending_lock:
+            if row is None:
+                self.misses += 1
+                self._pending_misses += 1
+            else:
+                self.hits += 1
+                self._pending_hits += 1
+                self._touched[key] = time.time()
+            due = self._pending_hits + self._pending_misses >= self.flush_every
+
+        if due:
+            self.flush()
+        return None if row is None else row[0]
+
+    def put(self, key: str, value: str) -> None:
+        conn = self._conn()
+        with conn:
+            # Pending access times first, so eviction sees recent hits
+            self._write_pending(conn)
+
+            # Upsert rather than REPLACE: an update must not fire the row-count triggers
+            conn.execute(
+                "INSERT INTO completions(key, value, last_access) VALUES (?, ?, ?)"
+                " ON CONFLICT(key) DO UPDATE SET value = excluded.value, last_access = excluded.last_access",
+                (key, value, time.time())
+            )
+
+            # LRU eviction once the cap is exceeded
+            (count,) = conn.execute("SELECT value FROM counters WHERE name = 'entries'").fetchone()
+            if count > self.max_entries:
+                conn.execute(
+                    "DELETE FROM completions WHERE key IN ("
+                    " SELECT key FROM completions ORDER BY last_access ASC LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+
+    def flush(self) -> None:
+        """Writes buffered access times and hit/miss counts."""
+        conn = self._conn()
+        with conn:
+            self._write_pending(conn)
+
+    def _write_pending(self, conn: sqlite3.Connection) -> None:
+        with self._pending_lock:
+            touched, self._touched = self._touched, {}
+            hits, misses = self._pending_hits, self._pending_misses
+            self._pending_hits = self._pending_misses = 0
+
+        if touched:
+            conn.executemany(
+                "UPDATE completions SET last_access = MAX(last_access, ?) WHERE key = ?",
+                [(t, key) for key, t in touched.items()]
+            )
+        if hits or misses:
+            conn.executemany(
+                "UPDATE counters SET value = value + ? WHERE name = ?",
+                [(hits, "hits"), (misses, "misses")]
+            )
+
+    def stats(self) -> Dict[str, float]:
+        self.flush()
+        totals = dict(self._conn().execute("SELECT name, value FROM counters").fetchall())
+
+        lookups = self.hits + self.misses
+        return {
+            "entries": totals.get("entries", 0),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "total_hits": totals.get("hits", 0),
+            "total_misses": totals.get("misses", 0),
+        }
+
+    def clear(self) -> None:
+        with self._pending_lock:
+            self._touched = {}
+            self._pending_hits = self._pending_misses = 0
+
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM completions")
+            conn.execute("UPDATE counters SET value = 0")
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        (count,) = self._conn().execute(
+            "SELECT value FROM counters WHERE name = 'entries'"
+        ).fetchone()
+        return count
+
+
+def _flush_at_exit(ref: "weakref.ref[CompletionCache]") -> None:
+    cache = ref()
+    if cache is not None:
+        try:
+            cache.flush()
+        except sqlite3.Error:
+            pass
@@ -0,0 +1,244 @@
+"""
+Long-lived compile daemon on a local Unix socket.
+
+`python app.py --serve` loads the models once and answers compile
+requests; a plain `python app.py "..."` connects to it when it is
+running and compiles in-process otherwise. This module only needs the
+standard library on the client side: the pipeline (torch, transformers)
+is imported by the serving process alone.
+
+Protocol: the client sends one JSON line
+    {"instruction": ..., "to_code": ..., "interactive": ..., "model": ...,
+     "precision": ..., "backend": ..., "cache": ..., "stream": ...}
+and the daemon answers with JSON lines: {"event": CompileEvent} per event
+when streaming, then {"output": CompilerOutput}, or {"error": message}.
+"""
+
+import json
+import os
+import queue
+import socket
+import socketserver
+import threading
+from typing import Dict, Iterator, Optional, Tuple
+
+DEFAULT_SOCKET_PATH = os.path.join(
+    os.path.expanduser("~"), ".cache", "language_compiler", "daemon.sock"
+)
+
+
+class DaemonUnavailable(ConnectionError):
+    """No daemon is listening on the socket; callers fall back to in-process."""
+
+
+_END = object()
+
+
+# ============================================================
+# Client
+# ============================================================
+
+def connect(socket_path: str = DEFAULT_SOCKET_PATH, timeout: Optional[float] = None) -> socket.socket:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(socket_path)
+    except OSError as e:
+        # Missing, stale, foreign-owned (EACCES) or not a socket (ENOTSOCK)
+        sock.close()
+        raise DaemonUnavailable(f"No usable compile daemon at {socket_path}: {e}") from e
+    return sock
+
+
+def request(payload: Dict, socket_path: str = DEFAULT_SOCKET_PATH) -> Iterator[Dict]:
+    """
+    Sends one compile request and yields the daemon's reply messages.
+    Raises DaemonUnavailable if nothing is listening, RuntimeError if
+    the daemon reports an error.
+    """
+    with connect(socket_path) as sock:
+        sock.sendall((json.dumps(payload) + "\n").encode("utf-8"))
+
+        with sock.makefile("r", encoding="utf-8") as reply:
+            for line in reply:
+                message = json.loads(line)
+                if "error" in message:
+                    raise RuntimeError(f"Compile daemon error: {message['error']}")
+                yield message
+                if "output" in message:
+                    return
+
+    raise RuntimeError("Compile daemon closed the connection without a result")
+
+
+def is_running(socket_path: str = DEFAULT_SOCKET_PATH) -> bool:
+    try:
+        connect(socket_path, timeout=1.0).close()
+        return True
+    except DaemonUnavailable:
+        return False
+
+
+# ============================================================
+# Server
+# ============================================================
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            payload = json.loads(self.rfile.readline())
+            for message in self.server.daemon.run(payload):
+                self._send(message)
+        except Exception as e:
+            self._send({"error": f"{type(e).__name__}: {e}"})
+
+    def _send(self, message: Dict) -> None:
+        self.wfile.write((json.dumps(message) + "\n").encode("utf-8"))
+        self.wfile.flush()
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class CompileDaemon:
+    """
+    Keeps LanguageCompiler instances (one per model / precision / backend
+    / cache path) warm
+    and serves requests for them. Compiles run one at a time: they share
+    the same model weights, and interleaving them only adds contention.
+    """
+
+    def __init__(
+        self,
+        model: str = "qwen-mini",
+        cache_path: Optional[str] = None,
+        precision: str = "auto",
+        backend: str = "torch"
+    ):
+        self.default_model = model
+        self.default_cache = cache_path
+        self.default_precision = precision
+        self.default_backend = backend
+        self._compilers: Dict[Tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def compiler(
+        self,
+        model: Optional[str] = None,
+        cache_path: Optional[str] = None,
+        precision: Optional[str] = None,
+        backend: Optional[str] = None
+    ):
+        from .completion_cache import CompletionCache
+        from .pipeline import LanguageCompiler
+
+        model = model or self.default_model
+        cache_path = cache_path or self.default_cache
+        precision = precision or self.default_precision
+        backend = backend or self.default_backend
+
+        key = (model, cache_path, precision, backend)
+        if key not in self._compilers:
+            cache = CompletionCache(cache_path) if cache_path else None
+            self._compilers[key] = LanguageCompiler(
+                model=model, cache=cache, precision=precision, backend=backend
+            )
+        return self._compilers[key]
+
+    def warm_up(self) -> None:
+        """Loads the default model and embedder before the first request."""
+        compiler = self.compiler()
+        compiler.lm.load()
+        compiler.semantic.example_embeddings
+
+    def run(self, payload: Dict) -> Iterator[Dict]:
+        """
+        Reply messages for one request. The compile runs under the lock in
+        its own thread and hands each message over through a queue, so
+        the lock is never held while the caller writes to a slow client.
+        """
+        messages: "queue.Queue" = queue.Queue()
+        threading.Thread(target=self._produce, args=(payload, messages), daemon=True).start()
+
+        while True:
+            message = messages.get()
+            if message is _END:
+                return
+            if isinstance(message, BaseException):
+                raise message
+            yield message
+
+    def _produce(self, payload: Dict, messages: "queue.Queue") -> None:
+        try:
+            with self._lock:
+                for message in self._compile(payload):
+                    messages.put(message)
+        except Exception as e:
+            messages.put(e)
+        finally:
+            messages.put(_END)
+
+    def _compile(self, payload: Dict) -> Iterator[Dict]:
+        instruction = payload["instruction"]
+        kwargs = dict(
+            to_code=bool(payload.get("to_code")),
+            interactive=bool(payload.get("interactive"))
+        )
+
+        compiler = self.compiler(
+            payload.get("model"),
+            payload.get("cache"),
+            payload.get("precision"),
+            payload.get("backend")
+        )
+
+        if payload.get("stream"):
+            for event in compiler.compile_stream(instruction, **kwargs):
+                if event.kind == "done":
+                    yield {"output": event.output.model_dump()}
+                else:
+                    yield {"event": event.model_dump(exclude_none=True)}
+        else:
+            yield {"output": compiler.compile(instruction, **kwargs).model_dump()}
+
+
+def serve(
+    socket_path: str = DEFAULT_SOCKET_PATH,
+    model: str = "qwen-mini",
+    cache_path: Optional[str] = None,
+    precision: str = "auto",
+    backend: str = "torch"
+) -> None:
+    """
+    Runs the daemon in the foreground until interrupted. Refuses to start
+    if another daemon already answers on `socket_path`; a stale socket
+    file left by a crashed daemon is removed.
+    """
+    if is_running(socket_path):
+        raise RuntimeError(f"A compile daemon is already running at {socket_path}")
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    os.makedirs(os.path.dirname(socket_path) or ".", exist_ok=True)
+
+    daemon = CompileDaemon(model=model, cache_path=cache_path, precision=precision, backend=backend)
+    daemon.warm_up()
+
+    # Owner-only from the moment bind() creates the socket file
+    umask = os.umask(0o177)
+    try:
+        server = _Server(socket_path, _Handler)
+    finally:
+        os.umask(umask)
+    server.daemon = daemon
+
+    print(f"[daemon] Listening on {socket_path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
@@ -0,0 +1,93 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+import numpy as np
+
+DEFAULT_EMBEDDING_DIR = os.path.join(
+    os.path.expanduser("~"), ".cache", "language_compiler", "embeddings"
+)
+
+
+def library_hash(texts: List[str]) -> str:
+    """Content hash of the embedded texts, in order."""
+    payload = json.dumps(texts, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def embedding_path(embedder_name: str, texts: List[str], cache_dir: str) -> str:
+    """Where load_or_build() keeps the embeddings of `texts`."""
+    safe_name = embedder_name.replace("/", "--")
+    return os.path.join(cache_dir, f"{safe_name}-{library_hash(texts)}.npy")
+
+
+def save_npy(path: str, array: np.ndarray) -> None:
+    """
+    Writes to a temporary file first so concurrent processes never map
+    a half-written array.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp, path)
+
+
+def load_or_build(
+    embedder_name: str,
+    texts: List[str],
+    encode: Callable[[List[str]], np.ndarray],
+    cache_dir: Optional[str] = DEFAULT_EMBEDDING_DIR
+) -> np.ndarray:
+    """
+    Example embeddings for `texts`, persisted as .npy under `cache_dir`
+    and keyed by embedder name plus library hash, so editing the template
+    library or switching embedders builds a new file. Existing files are
+    memory-mapped instead of read, so startup does not grow with the
+    library. cache_dir=None encodes in memory every time.
+    """
+    if cache_dir is None:
+        return np.asarray(encode(texts), dtype=np.float32)
+
+    path = embedding_path(embedder_name, texts, cache_dir)
+    if not os.path.exists(path):
+        save_npy(path, np.asarray(encode(texts), dtype=np.float32))
+
+    return np.load(path, mmap_mode="r")
+
+
+class QueryCache:
+    """Bounded, thread-safe LRU of query text → embedding."""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        with self._lock:
+            value = self._entries.get(text)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(text)
+            self.hits += 1
+            return value
+
+    def put(self, text: str, embedding: np.ndarray) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[text] = embedding
+            self._entries.move_to_end(text)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
@@ -0,0 +1,493 @@
+"""
+Offline performance benchmark: per-stage and end-to-end latency,
+throughput and memory.
+
+Two LM backends, neither needs the network:
+- fake: canned completions after a configurable delay (per call and per
+  generated token), which isolates the compiler's own overhead
+- tiny: a randomly initialised 2-layer GPT-2 with a BPE tokenizer
+  trained on the prompt templates, built once under --tiny-dir, which
+  exercises the real LMProvider (tokenization, generate(), KV-cache)
+
+The semantic stage uses a hashed bag-of-words embedder in place of
+MiniLM. Each scenario reports p50/p95 latency, instructions/s, generated
+tokens/s and peak RSS (each LM × scenario in its own process, so the
+peaks are comparable); --save-baseline writes the rows and --baseline
+compares against them (exit status 1 on a regression). Usage:
+
+    python -m src.language_compiler.eval.benchmark --lm fake tiny --save-baseline bench.json
+    python -m src.language_compiler.eval.benchmark --lm fake tiny --baseline bench.json
+
+--speculation also times prompt-lookup decoding against plain greedy
+decoding of the same stage prompts on the tiny model and reports the
+measured speedup next to the acceptance statistics.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from ..pipeline import LanguageCompiler
+from ..pseudocode import PseudocodeGenerator
+from ..semantic_preprocessor import SemanticPreprocessor
+from .perf import latency_summary, peak_rss_mb
+
+DEFAULT_TINY_DIR = os.path.join(
+    os.path.expanduser("~"), ".cache", "language_compiler", "tiny-gpt2"
+)
+
+# Precise instructions, so every stage reaches the LM
+INSTRUCTIONS = [
+    "If the temperature is above 30 degrees, turn on the AC.",
+    "If humidity exceeds 70, turn on the dehumidifier.",
+    "When the door opens, turn on the hallway light.",
+    "If CPU usage exceeds 90, send a notification.",
+    "Turn on the heater unless a window is open.",
+    "If the battery level drops below 20, activate power saving mode.",
+    "If motion is detected at night, turn on the porch light and start recording.",
+    "If the air quality index exceeds 150, close the windows.",
+]
+
+
+# ============================================================
+# LMs
+# ============================================================
+
+class FakeLM:
+    """
+    LMProvider stand-in with canned, stage-shaped completions. Each call
+    sleeps `latency_s` plus `per_token_s` per generated (whitespace) token.
+    """
+
+    def __init__(self, latency_s: float = 0.0, per_token_s: float = 0.0):
+        self.latency_s = latency_s
+        self.per_token_s = per_token_s
+
+    def _output(self, prompt: str) -> str:
+        text = prompt.lower()
+        value = (re.findall(r"\d+", prompt) or ["25"])[-1]
+
+        if "extract structured logic" in text:
+            return (
+                '{"steps": ['
+                f'{{"id": "S1", "role": "condition", "text": "value > {value}", "depends_on": []}},'
+                '{"id": "S2", "role": "action", "text": "TURN_ON DEVICE", "depends_on": ["S1"]}'
+                ']}'
+            )
+        if "convert this json logic plan" in text:
+            return f"IF value > {value}:\n    TURN_ON(DEVICE)"
+        return f"if value > {value}:\n    turn_on('DEVICE')"
+
+    def complete(self, prompt: str, max_tokens: int = 256, stage: str = "default") -> str:
+        out = self._output(prompt)
+        delay = self.latency_s + self.per_token_s * len(out.split())
+        if delay:
+            time.sleep(delay)
+        return out
+
+    def complete_batch(self, prompts: List[str], max_tokens: int = 256, stage: str = "default", batch_size: int = 8) -> List[str]:
+        # One "forward pass" per batch: latency once, tokens of the longest row
+        outs = [self._output(p) for p in prompts]
+        delay = self.latency_s + self.per_token_s * max((len(o.split()) for o in outs), default=0)
+        if delay:
+            time.sleep(delay)
+        return outs
+
+    def stream(self, prompt: str, max_tokens: int = 256, stage: str = "default"):
+        yield self.complete(prompt, max_tokens, stage)
+
+
+class CountingLM:
+    """
+    Forwards to `lm` and counts generated tokens: LMProvider's own
+    token_report() when available, else whitespace tokens of the text.
+    With `content`, the generated text is swapped for content's
+    completion of the same prompt: a random model does the real work
+    while the stages downstream still receive parseable plans and
+    pseudocode.
+    """
+
+    def __init__(self, lm, content: Optional[FakeLM] = None):
+        self.lm = lm
+        self.content = content
+        self._text_tokens = 0
+
+    @property
+    def tokens(self) -> int:
+        if hasattr(self.lm, "token_report"):
+            return sum(s["generated_tokens"] for s in self.lm.token_report().values())
+        return self._text_tokens
+
+    def complete(self, prompt: str, **kwargs) -> str:
+        out = self.lm.complete(prompt, **kwargs)
+        self._text_tokens += len(out.split())
+        return self.content._output(prompt) if self.content else out
+
+    def complete_batch(self, prompts: List[str], **kwargs) -> List[str]:
+        outs = self.lm.complete_batch(prompts, **kwargs)
+        self._text_tokens += sum(len(o.split()) for o in outs)
+        return [self.content._output(p) for p in prompts] if self.content else outs
+
+    def __getattr__(self, name):
+        return getattr(self.lm, name)
+
+
+def build_tiny_model(path: str = DEFAULT_TINY_DIR) -> str:
+    """Saves a random tiny GPT-2 and its tokenizer to `path` (once)."""
+    if os.path.exists(os.path.join(path, "config.json")):
+        return path
+
+    import torch
+    from tokenizers import Tokenizer, decoders, models, pre_tokenizers, trainers
+    from transformers import GPT2Config, GPT2LMHeadModel, PreTrainedTokenizerFast
+
+    from .. import prompts
+
+    corpus = [
+        prompts.REASONING_TEMPLATE,
+        prompts.PSEUDOCODE_TEMPLATE,
+        prompts.PYTHON_CODE_TEMPLATE,
+        *INSTRUCTIONS,
+    ] * 20
+
+    bpe = Tokenizer(models.BPE())
+    bpe.pre_tokenizer = pre_tokenizers.ByteLevel(add_prefix_space=False)
+    bpe.decoder = decoders.ByteLevel()
+    bpe.train_from_iterator(corpus, trainers.BpeTrainer(
+        vocab_size=512,
+        special_tokens=["<|endoftext|>"],
+        initial_alphabet=pre_tokenizers.ByteLevel.alphabet()
+    ))
+
+    tokenizer = PreTrainedTokenizerFast(
+        tokenizer_object=bpe,
+        eos_token="<|endoftext|>",
+        bos_token="<|endoftext|>",
+        model_input_names=["input_ids", "attention_mask"]
+    )
+
+    torch.manual_seed(0)
+    config = GPT2Config(
+        vocab_size=len(tokenizer), n_positions=2048, n_embd=64, n_layer=2, n_head=2,
+        eos_token_id=0, bos_token_id=0
+    )
+
+    tokenizer.save_pretrained(path)
+    GPT2LMHeadModel(config).save_pretrained(path)
+    return path
+
+
+# ============================================================
+# Semantic stage
+# ============================================================
+
+class HashingEmbedder:
+    """Hashed bag-of-words embedder with MiniLM's output shape."""
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def encode(self, texts, **kwargs):
+        single = isinstance(texts, str)
+        rows = np.zeros((1 if single else len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate([texts] if single else texts):
+            for word in re.findall(r"[a-z]+", text.lower()):
+                rows[row, zlib.crc32(word.encode()) % self.dim] += 1.0
+        rows /= np.clip(np.linalg.norm(rows, axis=1, keepdims=True), 1e-12, None)
+        return rows[0] if single else rows
+
+
+def build_compiler(lm) -> LanguageCompiler:
+    """LanguageCompiler wired to `lm` and the hashing embedder, no downloads."""
+    semantic = SemanticPreprocessor(
+        model_name="hashing", embedder=HashingEmbedder(), embedding_dir=None, query_cache_size=0
+    )
+    return LanguageCompiler(lm=lm, semantic=semantic)
+
+
+# ============================================================
+# Scenarios
+# ============================================================
+
+def _measure(name: str, calls: List[Callable[[], object]], items_per_call: int, lm: CountingLM) -> Dict:
+    tokens_before = lm.tokens
+    latencies = []
+    for call in calls:
+        start = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - start)
+
+    total = sum(latencies)
+    items = items_per_call * len(calls)
+    return {
+        "scenario": name,
+        "calls": len(calls),
+        **latency_summary(latencies),
+        "instructions_per_s": items / total if total else float("nan"),
+        "tokens_per_s": (lm.tokens - tokens_before) / total if total else float("nan"),
+    }
+
+
+SCENARIOS = ["semantic", "reasoning", "pseudocode", "code", "compile", "compile_batch"]
+
+
+def run_scenarios(
+    lm: CountingLM,
+    instructions: List[str],
+    max_tokens: Optional[int] = None,
+    scenarios: Optional[List[str]] = None
+) -> List[Dict]:
+    compiler = build_compiler(lm)
+
+    # Stage inputs come from the fake LM, so every stage sees well-formed
+    # plans and pseudocode whatever the benchmarked LM returns.
+    reference = build_compiler(FakeLM())
+    plans = [reference.parser.parse(i) for i in instructions]
+    blocks = [reference.pseudo.generate(p) for p in plans]
+
+    # LLM path of the pseudocode stage (the renderer is measured end to end)
+    llm_pseudo = PseudocodeGenerator(lm, use_renderer=False)
+
+    if max_tokens is not None:
+        for stage in (compiler.parser, compiler.pseudo, compiler.codegen, llm_pseudo):
+            stage.MAX_TOKENS = min(stage.MAX_TOKENS, max_tokens)
+
+    # Warm-up: model load, prefix cache, example embeddings
+    compiler.compile(instructions[0], to_code=True)
+
+    calls = {
+        "semantic": ([lambda i=i: compiler.semantic.normalize(i) for i in instructions], 1),
+        "reasoning": ([lambda i=i: compiler.parser.parse(i) for i in instructions], 1),
+        "pseudocode": ([lambda p=p: llm_pseudo.generate(p) for p in plans], 1),
+        "code": ([lambda b=b: compiler.codegen.generate_python(b) for b in blocks], 1),
+        "compile": ([lambda i=i: compiler.compile(i, to_code=True) for i in instructions], 1),
+        "compile_batch": ([lambda: compiler.compile_batch(instructions, to_code=True)], len(instructions)),
+    }
+    return [_measure(name, *calls[name], lm) for name in scenarios or SCENARIOS]
+
+
+def _make_lm(name: str, latency_s: float, per_token_s: float, tiny_dir: str, max_tokens: Optional[int]):
+    """(CountingLM, max_tokens cap) for an --lm choice."""
+    if name == "fake":
+        return CountingLM(FakeLM(latency_s, per_token_s)), None
+    if name == "tiny":
+        from ..lm_provider import LMProvider
+
+        provider = LMProvider(model=build_tiny_model(tiny_dir), precision="float32")
+        return CountingLM(provider, content=FakeLM()), max_tokens
+    raise ValueError(f"Unknown benchmark LM {name!r}; expected 'fake' or 'tiny'")
+
+
+def _run_lm(name: str, scenarios: List[str], repeat: int, latency_s: float, per_token_s: float, tiny_dir: str, max_tokens: Optional[int]) -> List[Dict]:
+    lm, cap = _make_lm(name, latency_s, per_token_s, tiny_dir, max_tokens)
+    rows = run_scenarios(lm, INSTRUCTIONS * repeat, cap, scenarios)
+    return [{"lm": name, **row, "peak_rss_mb": peak_rss_mb()} for row in rows]
+
+
+def run(
+    lms: List[str],
+    repeat: int = 1,
+    latency_s: float = 0.0,
+    per_token_s: float = 0.0,
+    tiny_dir: str = DEFAULT_TINY_DIR,
+    max_tokens: Optional[int] = 64,
+    scenarios: Optional[List[str]] = None,
+    isolate: bool = True
+) -> List[Dict]:
+    """
+    Rows for every LM × scenario. ru_maxrss only ever grows within a
+    process, so with `isolate` each LM × scenario runs in a fresh
+    spawned process and peak_rss_mb is that scenario's own peak
+    (imports, model and warm-up included). isolate=False runs in-process
+    and peak_rss_mb is then cumulative.
+    """
+    scenarios = scenarios or SCENARIOS
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        raise ValueError(f"Unknown scenarios {sorted(unknown)}; expected some of {SCENARIOS}")
+
+    rows = []
+    for name in lms:
+        if not isolate:
+            rows.extend(_run_lm(name, scenarios, repeat, latency_s, per_token_s, tiny_dir, max_tokens))
+            continue
+
+        for scenario in scenarios:
+            with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as pool:
+                rows.extend(pool.submit(
+                    _run_lm, name, [scenario], repeat, latency_s, per_token_s, tiny_dir, max_tokens
+                ).result())
+
+    return rows
+
+
+# ============================================================
+# Speculative decoding
+# ============================================================
+
+SPECULATION_STAGES = ["pseudocode", "code"]
+
+
+def speculation_speedup(
+    model: str,
+    instructions: List[str],
+    max_tokens: int = 64,
+    stages: List[str] = SPECULATION_STAGES
+) -> List[Dict]:
+    """
+    Per stage: every stage prompt decoded by a plain greedy LMProvider
+    and by one with prompt lookup on that stage (same weights through
+    the registry), alternating per prompt. speedup is greedy_s /
+    speculative_s; outputs_match is the share of identical completions.
+    """
+    from ..lm_provider import LMProvider
+
+    plain = LMProvider(model=model, precision="float32")
+    spec = LMProvider(model=model, precision="float32", prompt_lookup_stages=stages)
+
+    reference = build_compiler(FakeLM())
+    plans = [reference.parser.parse(i) for i in instructions]
+    blocks = [reference.pseudo.generate(p) for p in plans]
+    prompts = {
+        "pseudocode": [reference.pseudo.build_prompt(p) for p in plans],
+        "code": [reference.codegen.build_prompt(b) for b in blocks],
+    }
+
+    rows = []
+    for stage in stages:
+        # Warm-up: weights and prefix cache for both providers
+        for lm in (plain, spec):
+            lm.complete(prompts[stage][0], max_tokens=max_tokens, stage=stage)
+        spec.speculation_stats.pop(stage, None)
+
+        seconds = {"greedy": 0.0, "speculative": 0.0}
+        matches = 0
+        for prompt in prompts[stage]:
+            outs = {}
+            for name, lm in (("greedy", plain), ("speculative", spec)):
+                start = time.perf_counter()
+                outs[name] = lm.complete(prompt, max_tokens=max_tokens, stage=stage)
+                seconds[name] += time.perf_counter() - start
+            matches += outs["greedy"] == outs["speculative"]
+
+        report = spec.speculation_report()[stage]
+        rows.append({
+            "stage": stage,
+            "prompts": len(prompts[stage]),
+            "greedy_s": seconds["greedy"],
+            "speculative_s": seconds["speculative"],
+            "speedup": seconds["greedy"] / seconds["speculative"] if seconds["speculative"] else float("nan"),
+            "acceptance_rate": report["acceptance_rate"],
+            "tokens_per_target_pass": report["tokens_per_target_pass"],
+            "outputs_match": matches / len(prompts[stage]),
+        })
+    return rows
+
+
+# ============================================================
+# Baselines
+# ============================================================
+
+# Metric → direction: +1 higher is better, -1 lower is better.
+# tokens_per_s is reported but not tracked: generating fewer tokens
+# (e.g. earlier stopping) lowers it while making compiles faster.
+TRACKED = {
+    "latency_p50_s": -1,
+    "latency_p95_s": -1,
+    "instructions_per_s": 1,
+    "peak_rss_mb": -1,
+}
+
+
+def compare(rows: List[Dict], baseline: List[Dict], tolerance: float = 0.2) -> List[Dict]:
+    """
+    One entry per tracked metric present in both runs, with the relative
+    change and whether it is a regression beyond `tolerance`.
+    """
+    base = {(r["lm"], r["scenario"]): r for r in baseline}
+    changes = []
+    for row in rows:
+        old = base.get((row["lm"], row["scenario"]))
+        if old is None:
+            continue
+        for metric, direction in TRACKED.items():
+            before, after = old.get(metric), row.get(metric)
+            if not before or after is None or np.isnan(before) or np.isnan(after):
+                continue
+            change = (after - before) / before
+            changes.append({
+                "lm": row["lm"],
+                "scenario": row["scenario"],
+                "metric": metric,
+                "baseline": before,
+                "current": after,
+                "change": change,
+                "regression": change * direction < -tolerance,
+            })
+    return changes
+
+
+TABLE_COLUMNS = ["lm", "scenario", "latency_p50_s", "latency_p95_s", "instructions_per_s", "tokens_per_s", "peak_rss_mb"]
+
+
+def format_table(rows: List[Dict], columns: List[str] = TABLE_COLUMNS) -> str:
+    lines = ["\t".join(columns)]
+    for r in rows:
+        lines.append("\t".join(
+            f"{r[c]:.4f}" if isinstance(r[c], float) else str(r[c]) for c in columns
+        ))
+    return "\n".join(lines)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Offline compiler benchmark")
+    ap.add_argument("--lm", nargs="+", default=["fake"], choices=["fake", "tiny"])
+    ap.add_argument("--repeat", type=int, default=1, help="Run the instruction set N times per scenario")
+    ap.add_argument("--latency", type=float, default=0.0, help="Fake LM delay per call (s)")
+    ap.add_argument("--per-token", type=float, default=0.0, help="Fake LM delay per generated token (s)")
+    ap.add_argument("--max-tokens", type=int, default=64, help="Cap on new tokens per stage for the tiny model")
+    ap.add_argument("--tiny-dir", default=DEFAULT_TINY_DIR)
+    ap.add_argument("--scenario", nargs="+", default=SCENARIOS, choices=SCENARIOS)
+    ap.add_argument("--in-process", action="store_true", help="Skip the process per scenario (peak RSS is then cumulative)")
+    ap.add_argument("--speculation", action="store_true", help="Also measure prompt-lookup speedup on the tiny model")
+    ap.add_argument("--baseline", default=None, help="Compare against this baseline JSON")
+    ap.add_argument("--tolerance", type=float, default=0.2, help="Relative change counted as a regression")
+    ap.add_argument("--save-baseline", default=None, help="Write this run's rows as a baseline JSON")
+    args = ap.parse_args()
+
+    rows = run(
+        args.lm, args.repeat, args.latency, args.per_token, args.tiny_dir, args.max_tokens,
+        scenarios=args.scenario, isolate=not args.in_process
+    )
+    print(format_table(rows))
+
+    if args.speculation:
+        spec_rows = speculation_speedup(build_tiny_model(args.tiny_dir), INSTRUCTIONS * args.repeat, args.max_tokens)
+        print()
+        print(format_table(spec_rows, list(spec_rows[0])))
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(rows, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            changes = compare(rows, json.load(f), args.tolerance)
+        for c in changes:
+            flag = "REGRESSION" if c["regression"] else ""
+            print(f"{c['lm']}/{c['scenario']} {c['metric']}: {c['baseline']:.4f} → {c['current']:.4f} ({c['change']:+.1%}) {flag}")
+        if any(c["regression"] for c in changes):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Recall vs latency of the approximate template index against brute force.
+
+By default the library is synthetic (clustered unit vectors, like the
+examples of many paraphrased templates); --templates embeds a real
+library (see intent_templates.load_templates) with the sentence embedder
+and queries it with held-out examples. Usage:
+
+    python -m src.language_compiler.eval.index_benchmark --examples 100000 \
+        --n-probe 1 4 8 16 32
+"""
+
+import argparse
+import json
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from ..template_index import BruteForceIndex, IVFIndex, TemplateIndex
+from .perf import latency_summary
+
+
+def synthetic_library(
+    n_examples: int,
+    dim: int = 384,
+    per_template: int = 8,
+    n_queries: int = 200,
+    seed: int = 0
+) -> Tuple[np.ndarray, np.ndarray]:
+    """(examples, queries): paraphrase clusters around random template centres."""
+    rng = np.random.default_rng(seed)
+    n_templates = max(1, n_examples // per_template)
+    centres = rng.normal(size=(n_templates, dim)).astype(np.float32)
+
+    owner = rng.integers(0, n_templates, size=n_examples)
+    examples = centres[owner] + 0.5 * rng.normal(size=(n_examples, dim)).astype(np.float32)
+
+    query_owner = rng.integers(0, n_templates, size=n_queries)
+    queries = centres[query_owner] + 0.5 * rng.normal(size=(n_queries, dim)).astype(np.float32)
+    return examples, queries
+
+
+def embedded_library(templates_path: str, n_queries: int = 200, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """(examples, queries) from a template library; queries are held-out examples."""
+    from ..intent_templates import load_templates
+    from ..registry import get_registry
+
+    texts = [ex for t in load_templates(templates_path) for ex in t["examples"]]
+    rng = np.random.default_rng(seed)
+    held_out = set(rng.choice(len(texts), min(n_queries, len(texts) // 10 or 1), replace=False).tolist())
+
+    embedder = get_registry().sentence_embedder()
+    examples = embedder.encode([t for i, t in enumerate(texts) if i not in held_out])
+    queries = embedder.encode([texts[i] for i in sorted(held_out)])
+    return np.asarray(examples, dtype=np.float32), np.asarray(queries, dtype=np.float32)
+
+
+def measure(index: TemplateIndex, queries: np.ndarray, exact: np.ndarray, k: int) -> Dict:
+    """Recall@k against `exact` ids plus per-query search latency."""
+    latencies = []
+    found = []
+    for q in queries:
+        start = time.perf_counter()
+        _, ids = index.search(q[None, :], k)
+        latencies.append(time.perf_counter() - start)
+        found.append(ids[0])
+
+    recall = np.mean([len(set(f.tolist()) & set(e.tolist())) / k for f, e in zip(found, exact)])
+    return {"recall_at_k": float(recall), **latency_summary(latencies)}
+
+
+def report(
+    examples: np.ndarray,
+    queries: np.ndarray,
+    k: int = 10,
+    n_probes: Optional[List[int]] = None,
+    n_lists: Optional[int] = None
+) -> List[Dict]:
+    brute = BruteForceIndex().build(examples)
+    _, exact = brute.search(queries, k)
+
+    rows = [{"index": "brute", "build_s": 0.0, **measure(brute, queries, exact, k)}]
+
+    start = time.perf_counter()
+    ivf = IVFIndex(n_lists=n_lists).build(examples)
+    build_s = time.perf_counter() - start
+
+    for n_probe in n_probes or [1, 4, 8, 16, 32]:
+        ivf.n_probe = n_probe
+        rows.append({
+            "index": f"ivf(n_probe={n_probe})",
+            "build_s": build_s,
+            **measure(ivf, queries, exact, k),
+        })
+
+    return rows
+
+
+def format_table(rows: List[Dict]) -> str:
+    columns = ["index", "recall_at_k", "latency_p50_s", "latency_p95_s", "build_s"]
+    lines = ["\t".join(columns)]
+    for r in rows:
+        lines.append("\t".join(
+            f"{r[c]:.6f}" if isinstance(r[c], float) else str(r[c]) for c in columns
+        ))
+    return "\n".join(lines)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Template index recall / latency")
+    ap.add_argument("--templates", default=None, help="Template library (.json, .jsonl or directory)")
+    ap.add_argument("--examples", type=int, default=100_000, help="Synthetic library size")
+    ap.add_argument("--dim", type=int, default=384)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--n-lists", type=int, default=None)
+    ap.add_argument("--n-probe", type=int, nargs="+", default=None)
+    ap.add_argument("--output", default=None, help="Also write the rows as JSON")
+    args = ap.parse_args()
+
+    if args.templates:
+        examples, queries = embedded_library(args.templates, args.queries)
+    else:
+        examples, queries = synthetic_library(args.examples, args.dim, n_queries=args.queries)
+
+    print(f"[index] {len(examples)} examples, {len(queries)} queries, k={args.k}")
+    rows = report(examples, queries, args.k, args.n_probe, args.n_lists)
+    print(format_table(rows))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,108 +1,357 @@
-import re
-from typing import Dict, List, Tuple, Optional
-
-try:
-    from sentence_transformers import SentenceTransformer, util
-except Exception:
-    SentenceTransformer = None
-    util = None
-
-
-# -------------------------
-# Semantic similarity
-# -------------------------
-
-class SemanticScorer:
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
-        if SentenceTransformer is None:
-            raise ImportError("pip install sentence-transformers")
-        self.model = SentenceTransformer(model_name)
-
-    def score(self, instruction: str, rendered: str) -> float:
-        e1 = self.model.encode(instruction, convert_to_tensor=True)
-        e2 = self.model.encode(rendered, convert_to_tensor=True)
-        return float(util.cos_sim(e1, e2))
-
-
-# -------------------------
-# Structural scoring
-# -------------------------
-
-def structural_scores(pred_steps: List[Dict], gold_steps: List[Dict]) -> Dict[str, float]:
-    """
-    pred_steps and gold_steps are lists of dicts (LogicUnit.model_dump()).
-    Order-insensitive matching by (role, operator, value, negated, text coarse).
-    """
-    def key(s):
-        txt = (s.get("text") or "").lower()
-        txt = re.sub(r"\s+", " ", txt).strip()
-        return (
-            s.get("role"),
-            s.get("operator"),
-            str(s.get("value")) if s.get("value") is not None else None,
-            bool(s.get("negated")),
-            txt
-        )
-
-    pred_keys = [key(s) for s in pred_steps]
-    gold_keys = [key(s) for s in gold_steps]
-
-    # multiset match counts
-    matched = 0
-    pred_pool = pred_keys.copy()
-
-    for g in gold_keys:
-        if g in pred_pool:
-            matched += 1
-            pred_pool.remove(g)
-
-    precision = matched / max(len(pred_keys), 1)
-    recall = matched / max(len(gold_keys), 1)
-    f1 = (2 * precision * recall / max(precision + recall, 1e-9)) if (precision + recall) else 0.0
-
-    # dependency correctness (simple): percent of action steps whose depends_on set matches gold (by id mapping is hard)
-    # We compute a coarse dependency score: actions should depend on at least one condition if gold action does.
-    def dep_signature(steps):
-        sig = []
-        for s in steps:
-            if s.get("role") == "action":
-                sig.append(len(s.get("depends_on") or []))
-        return sig
-
-    pred_dep = dep_signature(pred_steps)
-    gold_dep = dep_signature(gold_steps)
-
-    dep_correct = 0
-    for p, g in zip(pred_dep, gold_dep):
-        dep_correct += int((p > 0) == (g > 0))
-    dep_acc = dep_correct / max(len(gold_dep), 1)
-
-    return {
-        "precision": precision,
-        "recall": recall,
-        "f1": f1,
-        "dependency_acc": dep_acc
-    }
-
-
-# -------------------------
-# Behavioral scoring
-# -------------------------
-
-def behavioral_equivalence(pred_pseudocode: str, gold_pseudocode: str) -> Dict[str, float]:
-    """
-    Lightweight behavioral proxy:
-    - compares extracted condition/operator/value/action tokens.
-    Not a full interpreter, but consistent and reportable.
-    """
-    def tokens(p):
-        t = p.lower()
-        t = re.sub(r"[^a-z0-9_><= ]+", " ", t)
-        t = re.sub(r"\s+", " ", t).strip()
-        return set(t.split())
-
-    tp = tokens(pred_pseudocode)
-    tg = tokens(gold_pseudocode)
-
-    jacc = len(tp & tg) / max(len(tp | tg), 1)
-    return {"token_jaccard": jacc}
+import re
+from collections import Counter
+from typing import Dict, List, Tuple, Optional
+
+import numpy as np
+
+from ..registry import ModelRegistry, get_registry
+from ..utils import cos_sim, paired_cos_sim
+
+try:
+    from sentence_transformers import SentenceTransformer
+except Exception:
+    SentenceTransformer = None
+
+
+# -------------------------
+# Semantic similarity
+# -------------------------
+
+class SemanticScorer:
+    """
+    Shares its embedder with SemanticPreprocessor through the model
+    registry, so evaluation keeps a single MiniLM copy in memory.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "all-MiniLM-L6-v2",
+        registry: Optional[ModelRegistry] = None,
+        backend: str = "torch"
+    ):
+        if backend == "torch" and SentenceTransformer is None:
+            raise ImportError("pip install sentence-transformers")
+        self.model_name = model_name
+        self.registry = registry or get_registry()
+        self.backend = backend
+        self._model = None
+
+    @property
+    def model(self):
+        if self._model is None:
+            self._model = self.registry.sentence_embedder(self.model_name, backend=self.backend)
+        return self._model
+
+    def score(self, instruction: str, rendered: str) -> float:
+        e1 = self.model.encode(instruction, convert_to_numpy=True)
+        e2 = self.model.encode(rendered, convert_to_numpy=True)
+        return float(cos_sim(e1, e2)[0, 0])
+
+    def score_batch(
+        self,
+        instructions: List[str],
+        rendered: List[str],
+        instruction_embeddings: Optional[np.ndarray] = None,
+        batch_size: int = 64
+    ) -> np.ndarray:
+        """
+        score() for aligned lists: each side is encoded in batches of
+        `batch_size` and compared row by row. Pass `instruction_embeddings`
+        (e.g. SemanticPreprocessor.embed_queries() with the same embedder)
+        to skip re-encoding the instructions.
+        """
+        if len(instructions) != len(rendered):
+            raise ValueError("instructions and rendered must have the same length")
+        if not instructions:
+            return np.zeros(0, dtype=np.float32)
+
+        if instruction_embeddings is None:
+            instruction_embeddings = self.model.encode(instructions, batch_size=batch_size, convert_to_numpy=True)
+        rendered_embeddings = self.model.encode(rendered, batch_size=batch_size, convert_to_numpy=True)
+
+        return paired_cos_sim(instruction_embeddings, rendered_embeddings)
+
+
+# -------------------------
+# Structural scoring
+# -------------------------
+
+_WS = re.compile(r"\s+")
+
+
+def step_key(s: Dict) -> Tuple:
+    """Coarse identity of a step: (role, operator, value, negated, text)."""
+    return (
+        s.get("role"),
+        s.get("operator"),
+        str(s.get("value")) if s.get("value") is not None else None,
+        bool(s.get("negated")),
+        _WS.sub(" ", (s.get("text") or "").lower()).strip()
+    )
+
+
+def linear_sum_assignment(cost: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Minimum-cost assignment (Hungarian algorithm with potentials, O(n²m))
+    for a (n, m) cost matrix. Returns (rows, cols) like
+    scipy.optimize.linear_sum_assignment, without needing scipy.
+    """
+    cost = np.asarray(cost, dtype=float)
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+    n, m = cost.shape
+    if n == 0:
+        return np.zeros(0, dtype=int), np.zeros(0, dtype=int)
+
+    # 1-based potentials; column 0 is the virtual start
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    owner = np.zeros(m + 1, dtype=int)  # row assigned to each column
+    way = np.zeros(m + 1, dtype=int)
+
+    for i in range(1, n + 1):
+        owner[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = owner[j0]
+            free = ~used[1:]
+            reduced = cost[i0 - 1] - u[i0] - v[1:]
+            better = free & (reduced < minv[1:])
+            minv[1:][better] = reduced[better]
+            way[1:][better] = j0
+
+            candidates = np.where(free, minv[1:], np.inf)
+            j1 = int(np.argmin(candidates)) + 1
+            delta = candidates[j1 - 1]
+
+            u[owner[used]] += delta
+            v[used] -= delta
+            minv[1:][free] -= delta
+
+            j0 = j1
+            if owner[j0] == 0:
+                break
+
+        while j0:
+            j1 = way[j0]
+            owner[j0] = owner[j1]
+            j0 = j1
+
+    cols = np.nonzero(owner[1:])[0]
+    rows = owner[1:][cols] - 1
+    order = np.argsort(rows)
+    rows, cols = rows[order], cols[order]
+    return (cols, rows) if transposed else (rows, cols)
+
+
+def _step_similarity(pred_keys: List[Tuple], gold_keys: List[Tuple]) -> np.ndarray:
+    """(n_pred, n_gold) in [0, 1]: 0 across roles, else field agreement plus text overlap."""
+    sim = np.zeros((len(pred_keys), len(gold_keys)))
+    gold_tokens = [set(g[4].split()) for g in gold_keys]
+    for i, p in enumerate(pred_keys):
+        p_tokens = set(p[4].split())
+        for j, g in enumerate(gold_keys):
+            if p[0] != g[0]:
+                continue
+            fields = (p[1] == g[1]) + (p[2] == g[2]) + (p[3] == g[3])
+            text = len(p_tokens & gold_tokens[j]) / max(len(p_tokens | gold_tokens[j]), 1)
+            sim[i, j] = (1 + fields + 2 * text) / 6
+    return sim
+
+
+def _f1(precision: float, recall: float) -> float:
+    return (2 * precision * recall / max(precision + recall, 1e-9)) if (precision + recall) else 0.0
+
+
+def structural_scores(pred_steps: List[Dict], gold_steps: List[Dict]) -> Dict[str, float]:
+    """
+    pred_steps and gold_steps are lists of dicts (LogicUnit.model_dump()).
+    Order-insensitive matching by (role, operator, value, negated, text coarse).
+
+    Dependencies are compared as edges: predicted steps are aligned to
+    gold steps by optimal assignment on step similarity, predicted
+    depends_on ids are translated through that alignment, and the edge
+    sets are scored with precision/recall/F1.
+    """
+    pred_keys = [step_key(s) for s in pred_steps]
+    gold_keys = [step_key(s) for s in gold_steps]
+
+    # multiset match counts
+    matched = sum((Counter(pred_keys) & Counter(gold_keys)).values())
+
+    precision = matched / max(len(pred_keys), 1)
+    recall = matched / max(len(gold_keys), 1)
+    f1 = _f1(precision, recall)
+
+    # coarse dependency score: actions should depend on at least one
+    # condition if the gold action (same position) does
+    pred_dep = [len(s.get("depends_on") or []) for s in pred_steps if s.get("role") == "action"]
+    gold_dep = [len(s.get("depends_on") or []) for s in gold_steps if s.get("role") == "action"]
+    dep_correct = sum(int((p > 0) == (g > 0)) for p, g in zip(pred_dep, gold_dep))
+    dep_acc = dep_correct / max(len(gold_dep), 1)
+
+    # edge-level dependency score through the optimal step alignment
+    sim = _step_similarity(pred_keys, gold_keys)
+    rows, cols = linear_sum_assignment(-sim)
+    to_gold = {
+        pred_steps[r].get("id"): gold_steps[c].get("id")
+        for r, c in zip(rows, cols) if sim[r, c] > 0
+    }
+
+    # Unmatched predicted steps keep their own identity, so their edges
+    # stay distinct (and wrong) instead of collapsing into one
+    def translate(step_id):
+        return to_gold.get(step_id, ("pred", step_id))
+
+    pred_edges = {
+        (translate(dep), translate(s.get("id")))
+        for s in pred_steps for dep in (s.get("depends_on") or [])
+    }
+    gold_edges = {
+        (dep, s.get("id"))
+        for s in gold_steps for dep in (s.get("depends_on") or [])
+    }
+    correct = len(pred_edges & gold_edges)
+    if pred_edges or gold_edges:
+        edge_p = correct / max(len(pred_edges), 1)
+        edge_r = correct / max(len(gold_edges), 1)
+        edge_f1 = _f1(edge_p, edge_r)
+    else:
+        edge_f1 = 1.0
+
+    return {
+        "precision": precision,
+        "recall": recall,
+        "f1": f1,
+        "dependency_acc": dep_acc,
+        "dependency_f1": edge_f1
+    }
+
+
+# -------------------------
+# Behavioral scoring
+# -------------------------
+
+_TOKEN = re.compile(r"[a-z0-9_><=]+")
+
+
+def pseudocode_tokens(p: str) -> List[str]:
+    """Lower-cased condition/operator/value/action tokens of a pseudocode string."""
+    return _TOKEN.findall(p.lower())
+
+
+def behavioral_equivalence(pred_pseudocode: str, gold_pseudocode: str) -> Dict[str, float]:
+    """
+    Lightweight behavioral proxy:
+    - compares extracted condition/operator/value/action tokens.
+    Not a full interpreter, but consistent and reportable.
+    """
+    tp = set(pseudocode_tokens(pred_pseudocode))
+    tg = set(pseudocode_tokens(gold_pseudocode))
+
+    jacc = len(tp & tg) / max(len(tp | tg), 1)
+    return {"token_jaccard": jacc}
+
+
+def token_jaccard_bulk(preds: List[str], golds: List[str]) -> np.ndarray:
+    """
+    behavioral_equivalence()["token_jaccard"] for aligned lists. Every
+    text is tokenized once; intersections for all items come from one
+    sorted-array intersection over (item, token id) keys.
+    """
+    vocab: Dict[str, int] = {}
+
+    def keys(texts: List[str]) -> np.ndarray:
+        out = []
+        for item, text in enumerate(texts):
+            ids = {vocab.setdefault(t, len(vocab)) for t in pseudocode_tokens(text)}
+            out.extend((item, i) for i in ids)
+        return np.array(out, dtype=np.int64).reshape(-1, 2)
+
+    pred_keys, gold_keys = keys(preds), keys(golds)
+    n, width = len(preds), max(len(vocab), 1)
+
+    pred_flat = pred_keys[:, 0] * width + pred_keys[:, 1]
+    gold_flat = gold_keys[:, 0] * width + gold_keys[:, 1]
+    common = np.intersect1d(pred_flat, gold_flat, assume_unique=True)
+
+    inter = np.bincount(common // width, minlength=n)
+    union = np.bincount(pred_keys[:, 0], minlength=n) + np.bincount(gold_keys[:, 0], minlength=n) - inter
+    return inter / np.maximum(union, 1)
+
+
+# -------------------------
+# Per-item scoring
+# -------------------------
+
+def score_output(item: Dict, out, semantic: SemanticScorer) -> Dict:
+    """
+    Scores one CompilerOutput against a gold item
+    ({"instruction", "gold_steps", "gold_pseudocode"}).
+    """
+    pred_steps = [s.model_dump() for s in out.reasoning.steps]
+    pred_pseudo = out.pseudocode.code
+
+    sem = semantic.score(item["instruction"], pred_pseudo)
+    struct = structural_scores(pred_steps, item["gold_steps"])
+    beh = behavioral_equivalence(pred_pseudo, item["gold_pseudocode"])
+
+    return {
+        "semantic_similarity": sem,
+        **{f"struct_{k}": v for k, v in struct.items()},
+        **{f"beh_{k}": v for k, v in beh.items()},
+    }
+
+
+# -------------------------
+# Bulk scoring
+# -------------------------
+
+def score_run(
+    items: List[Dict],
+    outs: List,
+    semantic: Optional[SemanticScorer] = None,
+    instruction_embeddings: Optional[np.ndarray] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Scores a whole run at once; returns one array per metric (same names
+    as score_output()), aligned with `items`. Semantic similarity is a
+    single score_batch() call and is skipped when `semantic` is None.
+    """
+    pred_pseudo = [out.pseudocode.code for out in outs]
+
+    columns: Dict[str, np.ndarray] = {}
+    if semantic is not None:
+        columns["semantic_similarity"] = np.asarray(semantic.score_batch(
+            [item["instruction"] for item in items],
+            pred_pseudo,
+            instruction_embeddings=instruction_embeddings
+        ), dtype=float)
+
+    structs = [
+        structural_scores([s.model_dump() for s in out.reasoning.steps], item["gold_steps"])
+        for item, out in zip(items, outs)
+    ]
+    for name in structs[0] if structs else []:
+        columns[f"struct_{name}"] = np.array([s[name] for s in structs], dtype=float)
+
+    columns["beh_token_jaccard"] = token_jaccard_bulk(pred_pseudo, [item["gold_pseudocode"] for item in items])
+    return columns
+
+
+def score_outputs(
+    items: List[Dict],
+    outs: List,
+    semantic: SemanticScorer,
+    instruction_embeddings: Optional[np.ndarray] = None
+) -> List[Dict]:
+    """score_output() for a whole run, computed through score_run()."""
+    columns = score_run(items, outs, semantic, instruction_embeddings)
+    return [
+        {name: float(values[row]) for name, values in columns.items()}
+        for row in range(len(items))
+    ]
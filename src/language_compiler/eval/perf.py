@@ -0,0 +1,38 @@
+import math
+import resource
+import sys
+from typing import Dict, List
+
+
+# -------------------------
+# Memory
+# -------------------------
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far, in MiB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS reports bytes
+    if sys.platform == "darwin":
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+# -------------------------
+# Latency
+# -------------------------
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile, q in [0, 100]."""
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    rank = max(math.ceil(q / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def latency_summary(seconds: List[float]) -> Dict[str, float]:
+    return {
+        "latency_mean_s": sum(seconds) / len(seconds) if seconds else float("nan"),
+        "latency_p50_s": percentile(seconds, 50),
+        "latency_p95_s": percentile(seconds, 95),
+    }
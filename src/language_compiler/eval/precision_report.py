@@ -0,0 +1,135 @@
+"""
+Compares LMProvider precision modes on a gold set: model load time,
+per-instruction latency, peak RSS and the eval/metrics.py quality scores.
+
+The rule parser and the pseudocode renderer are switched off, so every
+precise instruction goes through the LM for reasoning and pseudocode and
+the numbers reflect the precision mode rather than the fast paths (only
+vague instructions still stop at the ambiguity check). Each mode runs in
+its own subprocess, so peak RSS is measured per mode rather than
+accumulated across them. Usage:
+
+    python -m src.language_compiler.eval.precision_report data/gold_house.json \
+        --model phi-mini --precisions float32 bfloat16 int8 int4
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+from .perf import latency_summary, peak_rss_mb
+
+WORKER_MODULE = "src.language_compiler.eval.precision_report"
+
+
+def measure(gold_path: str, model_name: str, precision: str, limit: Optional[int] = None) -> Dict:
+    """Runs the gold set in this process with one precision mode."""
+    from ..pipeline import LanguageCompiler
+    from .metrics import SemanticScorer, score_output
+
+    with open(gold_path, "r") as f:
+        gold = json.load(f)[:limit]
+
+    # No completion cache, rules or renderer: every stage must hit the model
+    compiler = LanguageCompiler(model=model_name, precision=precision)
+    compiler.parser.rules = None
+    compiler.pseudo.renderer = None
+    semantic = SemanticScorer()
+
+    start = time.perf_counter()
+    compiler.lm.load()
+    load_s = time.perf_counter() - start
+
+    latencies = []
+    scores: Dict[str, List[float]] = {}
+    for item in gold:
+        start = time.perf_counter()
+        out = compiler.compile(item["instruction"], to_code=False, interactive=True)
+        latencies.append(time.perf_counter() - start)
+
+        for name, value in score_output(item, out, semantic).items():
+            scores.setdefault(name, []).append(value)
+
+    calls = compiler.lm.token_report().values()
+    total = sum(latencies)
+    return {
+        "precision": precision,
+        "items": len(gold),
+        "lm_calls": sum(s["calls"] for s in calls),
+        "load_s": load_s,
+        **latency_summary(latencies),
+        "tokens_per_s": sum(s["generated_tokens"] for s in calls) / total if total else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+        **{name: sum(values) / len(values) for name, values in scores.items()},
+    }
+
+
+def report(
+    gold_path: str,
+    model_name: str = "qwen-mini",
+    precisions: Optional[List[str]] = None,
+    limit: Optional[int] = None
+) -> List[Dict]:
+    """One subprocess per precision mode; failed modes report their error."""
+    rows = []
+    for precision in precisions or ["float32", "bfloat16", "int8", "int4"]:
+        cmd = [
+            sys.executable, "-m", WORKER_MODULE, gold_path,
+            "--model", model_name, "--worker", precision
+        ]
+        if limit is not None:
+            cmd += ["--limit", str(limit)]
+
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        lines = proc.stdout.strip().splitlines()
+
+        if proc.returncode == 0 and lines:
+            rows.append(json.loads(lines[-1]))
+        else:
+            error = (proc.stderr.strip().splitlines() or ["unknown error"])[-1]
+            rows.append({"precision": precision, "error": error})
+
+    return rows
+
+
+def format_table(rows: List[Dict]) -> str:
+    columns = ["precision"] + sorted({k for r in rows for k in r if k not in ("precision", "error")})
+    lines = ["\t".join(columns)]
+    for r in rows:
+        if "error" in r:
+            lines.append(f"{r['precision']}\terror: {r['error']}")
+            continue
+        lines.append("\t".join(
+            f"{r[c]:.3f}" if isinstance(r.get(c), float) else str(r.get(c, ""))
+            for c in columns
+        ))
+    return "\n".join(lines)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Latency / memory / quality per precision mode")
+    ap.add_argument("gold_path")
+    ap.add_argument("--model", default="qwen-mini")
+    ap.add_argument("--precisions", nargs="+", default=None)
+    ap.add_argument("--limit", type=int, default=None, help="Only use the first N gold items")
+    ap.add_argument("--output", default=None, help="Also write the rows as JSON")
+    ap.add_argument("--worker", default=None, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.worker:
+        print(json.dumps(measure(args.gold_path, args.model, args.worker, args.limit)))
+        return
+
+    rows = report(args.gold_path, args.model, args.precisions, args.limit)
+    print(format_table(rows))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,45 +1,183 @@
-import json
-import pandas as pd
-
-from ..pipeline import LanguageCompiler
-from .metrics import SemanticScorer, structural_scores, behavioral_equivalence
-
-
-def run(gold_path: str, model_name: str = "microsoft/Phi-3-mini-4k-instruct"):
-    compiler = LanguageCompiler(model=model_name)
-    semantic = SemanticScorer()
-
-    with open(gold_path, "r") as f:
-        gold = json.load(f)
-
-    rows = []
-    for item in gold:
-        instr = item["instruction"]
-        out = compiler.compile(instr, to_code=False, interactive=True)
-
-        pred_steps = [s.model_dump() for s in out.reasoning.steps]
-        gold_steps = item["gold_steps"]
-
-        pred_pseudo = out.pseudocode.code
-        gold_pseudo = item["gold_pseudocode"]
-
-        sem = semantic.score(instr, pred_pseudo)
-        struct = structural_scores(pred_steps, gold_steps)
-        beh = behavioral_equivalence(pred_pseudo, gold_pseudo)
-
-        rows.append({
-            "instruction": instr,
-            "semantic_similarity": sem,
-            **{f"struct_{k}": v for k, v in struct.items()},
-            **{f"beh_{k}": v for k, v in beh.items()},
-            "clarifications_needed": out.clarifications_needed
-        })
-
-    df = pd.DataFrame(rows)
-    return df
-
-
-if __name__ == "__main__":
-    df = run("data/gold_house.json")
-    print(df.describe(include="all"))
-    df.to_csv("eval_results.csv", index=False)
+"""
+Gold-set evaluation.
+
+- run(): whole gold JSON in one compile_batch() pass → pandas DataFrame
+- run_sharded(): streams gold JSONL across worker processes (each with a
+  warm compiler) and appends one JSON line per scored item as results
+  arrive. Restarting with the same output skips finished items, so an
+  overnight 10k run survives crashes. Usage:
+
+    python -m src.language_compiler.eval.run_eval data/gold.jsonl \
+        --output eval_results.jsonl --workers 8
+"""
+
+import argparse
+import json
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from ..pipeline import LanguageCompiler
+from ..completion_cache import CompletionCache
+from ..jsonl_runner import WORKER, Key, init_compiler, key_fields, run_jsonl
+from .metrics import SemanticScorer, score_outputs
+
+
+def run(
+    gold_path: str,
+    model_name: str = "microsoft/Phi-3-mini-4k-instruct",
+    cache_path: Optional[str] = None,
+    precision: str = "auto",
+    backend: str = "torch"
+):
+    import pandas as pd
+
+    cache = CompletionCache(cache_path) if cache_path else None
+    compiler = LanguageCompiler(model=model_name, cache=cache, precision=precision, backend=backend)
+    semantic = SemanticScorer(backend=backend)
+
+    with open(gold_path, "r") as f:
+        gold = json.load(f)
+
+    # One batched pass per stage, including semantic normalization
+    instructions = [item["instruction"] for item in gold]
+    outputs = compiler.compile_batch(instructions, to_code=False, interactive=True)
+    scores = score_outputs(gold, outputs, semantic, _instruction_embeddings(compiler, semantic, instructions))
+
+    rows = []
+    for item, out, score in zip(gold, outputs, scores):
+        rows.append({
+            "instruction": item["instruction"],
+            **score,
+            "clarifications_needed": out.clarifications_needed
+        })
+
+    df = pd.DataFrame(rows)
+    return df
+
+
+def _instruction_embeddings(compiler, semantic: SemanticScorer, instructions: List[str]):
+    """
+    The preprocessor already embedded every instruction during
+    compile_batch(); reuse its LRU when it runs the scorer's embedder.
+    """
+    pre = getattr(compiler, "semantic", None)
+    if pre is None or (pre.model_name, pre.backend) != (semantic.model_name, semantic.backend):
+        return None
+    return pre.embed_queries(instructions)
+
+
+# ============================================================
+# Sharded, resumable evaluation
+# ============================================================
+
+def iter_gold(gold_path: str) -> Iterator[Tuple[Key, Dict]]:
+    """
+    (("index", position), item) pairs; .jsonl is streamed line by line.
+    Keyed by position, so resuming assumes the gold set was only appended to.
+    """
+    if not gold_path.endswith(".jsonl"):
+        with open(gold_path, "r") as f:
+            for position, item in enumerate(json.load(f)):
+                yield ("index", position), item
+        return
+
+    with open(gold_path, "r") as f:
+        position = 0
+        for line in f:
+            if line.strip():
+                yield ("index", position), json.loads(line)
+                position += 1
+
+
+def _init_worker(model_name: str, cache_path: Optional[str], precision: str, backend: str, threads: int = 0) -> None:
+    init_compiler(model_name, cache_path, precision, backend, threads=threads)
+    WORKER["semantic"] = SemanticScorer(backend=backend)
+
+
+def _eval_chunk(chunk: List[Tuple[Key, Dict]]) -> List[Dict]:
+    compiler, semantic = WORKER["compiler"], WORKER["semantic"]
+    items = [item for _, item in chunk]
+    instructions = [item["instruction"] for item in items]
+    outputs = compiler.compile_batch(instructions, to_code=False, interactive=True)
+    scores = score_outputs(items, outputs, semantic, _instruction_embeddings(compiler, semantic, instructions))
+
+    return [
+        {
+            **key_fields(key),
+            "instruction": item["instruction"],
+            **score,
+            "clarifications_needed": out.clarifications_needed
+        }
+        for (key, item), out, score in zip(chunk, outputs, scores)
+    ]
+
+
+def run_sharded(
+    gold_path: str,
+    output_path: str,
+    model_name: str = "microsoft/Phi-3-mini-4k-instruct",
+    cache_path: Optional[str] = None,
+    precision: str = "auto",
+    backend: str = "torch",
+    workers: int = 1,
+    chunk_size: int = 8,
+    progress_every: float = 10.0
+) -> Dict[str, float]:
+    """
+    Evaluates every gold item not yet in `output_path` and appends its
+    row (with the item's position as "index") as soon as its chunk is
+    scored, in completion order. See jsonl_runner.run_jsonl for workers.
+    """
+    summary = run_jsonl(
+        iter_gold(gold_path),
+        output_path,
+        process=_eval_chunk,
+        init=_init_worker,
+        init_args=(model_name, cache_path, precision, backend),
+        workers=workers,
+        chunk_size=chunk_size,
+        label="eval",
+        progress_every=progress_every
+    )
+    summary["evaluated"] = summary.pop("written")
+    return summary
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Evaluate the compiler on a gold set")
+    ap.add_argument("gold_path", nargs="?", default="data/gold_house.json")
+    ap.add_argument("--model", default="microsoft/Phi-3-mini-4k-instruct")
+    ap.add_argument("--cache", default=None, help="SQLite completion cache path")
+    ap.add_argument("--precision", default="auto")
+    ap.add_argument("--backend", default="torch")
+    ap.add_argument("--output", default=None, help="Append rows to this JSONL file and resume from it")
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--chunk-size", type=int, default=8)
+    ap.add_argument("--parquet", default=None, help="After a --output run, also write all rows as Parquet")
+    args = ap.parse_args()
+
+    if args.output is None:
+        df = run(args.gold_path, args.model, args.cache, args.precision, args.backend)
+        print(df.describe(include="all"))
+        df.to_csv("eval_results.csv", index=False)
+        return
+
+    summary = run_sharded(
+        args.gold_path,
+        args.output,
+        model_name=args.model,
+        cache_path=args.cache,
+        precision=args.precision,
+        backend=args.backend,
+        workers=args.workers,
+        chunk_size=args.chunk_size
+    )
+    print(json.dumps(summary))
+
+    if args.parquet:
+        import pandas as pd
+        df = pd.read_json(args.output, lines=True).sort_values("index")
+        df.to_parquet(args.parquet, index=False)
+
+
+if __name__ == "__main__":
+    main()
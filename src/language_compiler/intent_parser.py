@@ -1,89 +1,143 @@
-import re
-import uuid
-import json
-from typing import List
-from .schemas import LogicUnit, LogicPlan
-from .prompts import REASONING_TEMPLATE
-from .lm_provider import LMProvider
-from .utils import safe_json_loads
-
-
-VAGUE_PHRASES = {
-    "too long": "queue_length_threshold",
-    "after a while": "time_window",
-    "a bit": "rate_adjustment",
-    "quickly": "speed_value",
-    "soon": "time_window",
-    "busy": "load_threshold",
-    "overloaded": "load_threshold"
-}
-
-
-class IntentParser:
-    def __init__(self, lm: LMProvider):
-        self.lm = lm
-
-    def parse(self, instruction: str) -> LogicPlan:
-        # ------------------------------------------------
-        # STEP 0 — HARD ambiguity short-circuit
-        # ------------------------------------------------
-        inst_lower = instruction.lower()
-        missing = [
-            field for phrase, field in VAGUE_PHRASES.items()
-            if phrase in inst_lower
-        ]
-
-        if missing:
-            return LogicPlan(
-                steps=[
-                    LogicUnit(
-                        id="S1",
-                        role="note",
-                        text="Ambiguous instruction",
-                        clarification_needed=True,
-                        clarification_field=missing[0]
-                    )
-                ]
-            )
-
-        # ------------------------------------------------
-        # STEP 1 — LLM reasoning
-        # ------------------------------------------------
-        prompt = REASONING_TEMPLATE.format(instruction=instruction)
-        raw = self.lm.complete(prompt)
-        data = safe_json_loads(raw)
-
-        # ------------------------------------------------
-        # STEP 2 — Controlled error response
-        # ------------------------------------------------
-        if "error" in data:
-            return LogicPlan(
-                steps=[
-                    LogicUnit(
-                        id="S1",
-                        role="note",
-                        text="Clarification required",
-                        clarification_needed=True,
-                        clarification_field=(
-                            data.get("fields") or [None]
-                        )[0]
-                    )
-                ]
-            )
-
-        # ------------------------------------------------
-        # STEP 3 — Build LogicPlan safely
-        # ------------------------------------------------
-        steps = []
-        seen_ids = set()
-
-        for s in data.get("steps", []):
-            u = LogicUnit(**s)
-
-            if u.id in seen_ids:
-                u.id = f"{u.id}_{uuid.uuid4().hex[:4]}"
-            seen_ids.add(u.id)
-
-            steps.append(u)
-
-        return LogicPlan(steps=steps)
+import re
+import uuid
+import json
+from typing import List, Optional
+from .schemas import LogicUnit, LogicPlan
+from .prompts import REASONING_TEMPLATE
+from .lm_provider import LMProvider
+from . import tracing
+from .phrase_scanner import VAGUE_PHRASES, vague_phrases
+from .rule_parser import RuleBasedParser
+from .semantic_preprocessor import SemanticResult
+from .utils import safe_json_loads
+
+
+class IntentParser:
+    MAX_TOKENS = 256
+    STAGE = "reasoning"
+
+    def __init__(self, lm: LMProvider, use_rules: bool = True):
+        self.lm = lm
+        self.rules = RuleBasedParser() if use_rules else None
+
+    def parse(self, instruction: str, semantic: Optional[SemanticResult] = None) -> LogicPlan:
+        # ------------------------------------------------
+        # STEP 0 — HARD ambiguity short-circuit and
+        #          deterministic template fast path
+        # ------------------------------------------------
+        plan = self.precheck(instruction, semantic)
+        if plan is not None:
+            return plan
+
+        # ------------------------------------------------
+        # STEP 1 — LLM reasoning
+        # ------------------------------------------------
+        tracing.annotate(source="llm")
+        raw = self.lm.complete(self.build_prompt(instruction), max_tokens=self.MAX_TOKENS, stage=self.STAGE)
+        return self.plan_from_output(raw)
+
+    def parse_batch(
+        self,
+        instructions: List[str],
+        semantics: Optional[List[SemanticResult]] = None,
+        batch_size: int = 8
+    ) -> List[LogicPlan]:
+        """
+        Same as parse() for many instructions: every instruction that
+        needs the LLM is sent through a single complete_batch() call.
+        """
+        semantics = semantics or [None] * len(instructions)
+        plans = [self.precheck(i, sem) for i, sem in zip(instructions, semantics)]
+        pending = [i for i, plan in enumerate(plans) if plan is None]
+
+        if pending:
+            raws = self.lm.complete_batch(
+                [self.build_prompt(instructions[i]) for i in pending],
+                max_tokens=self.MAX_TOKENS,
+                stage=self.STAGE,
+                batch_size=batch_size
+            )
+            for i, raw in zip(pending, raws):
+                plans[i] = self.plan_from_output(raw)
+
+        return plans
+
+    def precheck(self, instruction: str, semantic: Optional[SemanticResult] = None) -> Optional[LogicPlan]:
+        """
+        Returns a LogicPlan when the instruction can be resolved without
+        the LLM, otherwise None:
+        - vague phrasing → clarification note
+        - a confident template match whose slots all parse → rule-built plan
+        """
+        missing = [
+            VAGUE_PHRASES[phrase] for phrase in vague_phrases(instruction)
+            if VAGUE_PHRASES[phrase]
+        ]
+
+        if missing:
+            tracing.annotate(source="clarification")
+            return LogicPlan(
+                steps=[
+                    LogicUnit(
+                        id="S1",
+                        role="note",
+                        text="Ambiguous instruction",
+                        clarification_needed=True,
+                        clarification_field=missing[0]
+                    )
+                ]
+            )
+
+        if (
+            self.rules is not None
+            and semantic is not None
+            and semantic.matched_intent
+            and not semantic.missing_slots
+        ):
+            plan = self.rules.parse(instruction, semantic.matched_intent)
+            if plan is not None:
+                tracing.annotate(source="rules")
+            return plan
+
+        return None
+
+    def build_prompt(self, instruction: str) -> str:
+        return REASONING_TEMPLATE.format(instruction=instruction)
+
+    def plan_from_output(self, raw: str) -> LogicPlan:
+        data = safe_json_loads(raw)
+
+        # ------------------------------------------------
+        # STEP 2 — Controlled error response
+        # ------------------------------------------------
+        if "error" in data:
+            return LogicPlan(
+                steps=[
+                    LogicUnit(
+                        id="S1",
+                        role="note",
+                        text="Clarification required",
+                        clarification_needed=True,
+                        clarification_field=(
+                            data.get("fields") or [None]
+                        )[0]
+                    )
+                ]
+            )
+
+        # ------------------------------------------------
+        # STEP 3 — Build LogicPlan safely
+        # ------------------------------------------------
+        steps = []
+        seen_ids = set()
+
+        for s in data.get("steps", []):
+            u = LogicUnit(**s)
+
+            if u.id in seen_ids:
+                u.id = f"{u.id}_{uuid.uuid4().hex[:4]}"
+            seen_ids.add(u.id)
+
+            steps.append(u)
+
+        return LogicPlan(steps=steps)
@@ -1,48 +1,96 @@
-INTENT_TEMPLATES = [
-    {
-        "name": "threshold_action",
-        "examples": [
-            "If temperature exceeds 30, turn on the AC.",
-            "Turn on the AC when temperature is above 30.",
-            "Close the windows when the air quality index exceeds 150.",
-            "If humidity is greater than 70, dehumidify the room.",
-            "Notify me when CPU usage goes above 90 percent."
-        ],
-        "canonical_form": "IF <metric> <operator> <threshold> THEN <action>",
-        "slots": ["metric", "operator", "threshold", "action"],
-        "slot_hints": {
-            "threshold": "numeric threshold is missing",
-            "operator": "comparison operator is missing",
-            "metric": "metric/variable is unclear",
-            "action": "action is unclear"
-        },
-    },
-    {
-        "name": "event_action",
-        "examples": [
-            "When the door opens, turn on the hallway light.",
-            "If motion is detected, start recording.",
-            "When the kettle finishes, send a notification."
-        ],
-        "canonical_form": "WHEN <event> THEN <action>",
-        "slots": ["event", "action"],
-        "slot_hints": {
-            "event": "event trigger is unclear",
-            "action": "action is unclear"
-        },
-    },
-    {
-        "name": "unless_negation",
-        "examples": [
-            "Turn on the heater unless a window is open.",
-            "Water the garden unless it is raining.",
-            "Lock the door unless someone is inside."
-        ],
-        "canonical_form": "<action> UNLESS <condition>",
-        "slots": ["action", "condition"],
-        "slot_hints": {
-            "condition": "exception/negation condition is unclear",
-            "action": "action is unclear"
-        },
-    },
-]
+import json
+import os
+from typing import Dict, List
+
+INTENT_TEMPLATES = [
+    {
+        "name": "threshold_action",
+        "examples": [
+            "If temperature exceeds 30, turn on the AC.",
+            "Turn on the AC when temperature is above 30.",
+            "Close the windows when the air quality index exceeds 150.",
+            "If humidity is greater than 70, dehumidify the room.",
+            "Notify me when CPU usage goes above 90 percent."
+        ],
+        "canonical_form": "IF <metric> <operator> <threshold> THEN <action>",
+        "slots": ["metric", "operator", "threshold", "action"],
+        "slot_hints": {
+            "threshold": "numeric threshold is missing",
+            "operator": "comparison operator is missing",
+            "metric": "metric/variable is unclear",
+            "action": "action is unclear"
+        },
+    },
+    {
+        "name": "event_action",
+        "examples": [
+            "When the door opens, turn on the hallway light.",
+            "If motion is detected, start recording.",
+            "When the kettle finishes, send a notification."
+        ],
+        "canonical_form": "WHEN <event> THEN <action>",
+        "slots": ["event", "action"],
+        "slot_hints": {
+            "event": "event trigger is unclear",
+            "action": "action is unclear"
+        },
+    },
+    {
+        "name": "unless_negation",
+        "examples": [
+            "Turn on the heater unless a window is open.",
+            "Water the garden unless it is raining.",
+            "Lock the door unless someone is inside."
+        ],
+        "canonical_form": "<action> UNLESS <condition>",
+        "slots": ["action", "condition"],
+        "slot_hints": {
+            "condition": "exception/negation condition is unclear",
+            "action": "action is unclear"
+        },
+    },
+]
+
+
+# ============================================================
+# External template libraries
+# ============================================================
+
+REQUIRED_KEYS = ("name", "examples", "canonical_form")
+
+
+def _check_template(t: Dict, source: str) -> Dict:
+    missing = [k for k in REQUIRED_KEYS if k not in t]
+    if missing:
+        raise ValueError(f"Template in {source} is missing {missing}: {t.get('name', t)}")
+    if not isinstance(t["examples"], list):
+        raise ValueError(f"Template {t['name']!r} in {source}: 'examples' must be a list")
+
+    t.setdefault("slots", [])
+    t.setdefault("slot_hints", {})
+    return t
+
+
+def load_templates(path: str) -> List[Dict]:
+    """
+    Reads templates in the INTENT_TEMPLATES format from a .json file
+    (a list of templates), a .jsonl file (one template per line) or a
+    directory containing such files (read in name order).
+    """
+    if os.path.isdir(path):
+        templates = []
+        for name in sorted(os.listdir(path)):
+            if name.endswith((".json", ".jsonl")):
+                templates.extend(load_templates(os.path.join(path, name)))
+        return templates
+
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            items = [json.loads(line) for line in f if line.strip()]
+        else:
+            items = json.load(f)
+
+    if isinstance(items, dict):
+        items = [items]
+
+    return [_check_template(t, path) for t in items]
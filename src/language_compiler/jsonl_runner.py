@@ -0,0 +1,183 @@
+"""
+Resumable JSONL runs across worker processes.
+
+run_jsonl() feeds (key, item) pairs in chunks to a `process` function
+and appends the rows it returns to a JSONL file. A key is ("id", id)
+for items with an explicit id, which the row carries as "id", or
+("index", position) otherwise, carried as "index"; the two never
+collide. A restarted run skips the items whose key is already written:
+id-keyed items survive edits and reordering of the input, positional
+ones only appends. Used by eval/run_eval.py (gold-set scoring, keyed by
+position) and bulk.py (file compilation).
+
+workers > 1 starts that many spawned processes, each set up once by
+`init` (e.g. init_compiler) with cpu_count // workers torch threads; at
+most two chunks per worker are in flight, so neither the input nor the
+results are ever fully in memory.
+"""
+
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import get_context
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Set, Tuple
+
+from .pipeline import LanguageCompiler
+from .completion_cache import CompletionCache
+
+Key = Tuple[str, Hashable]
+Chunk = List[Tuple[Key, Any]]
+
+# Per-process state (compiler, scorer, ...), filled by the init function
+WORKER: Dict = {}
+
+
+def init_compiler(model_name: str, cache_path: Optional[str], precision: str, backend: str, threads: int = 0) -> None:
+    """Worker init: one LanguageCompiler per process in WORKER["compiler"]."""
+    if threads:
+        import torch
+        torch.set_num_threads(threads)
+
+    cache = CompletionCache(cache_path) if cache_path else None
+    WORKER["compiler"] = LanguageCompiler(model=model_name, cache=cache, precision=precision, backend=backend)
+
+
+def row_key(row: Dict) -> Key:
+    """Resume key of an output row: ("id", id) if it has one, else ("index", position)."""
+    return ("id", row["id"]) if "id" in row else ("index", row["index"])
+
+
+def key_fields(key: Key) -> Dict:
+    """The row fields that carry `key` (inverse of row_key)."""
+    return {key[0]: key[1]}
+
+
+def completed_keys(output_path: str) -> Set[Key]:
+    """
+    Key of every row already in `output_path`. A torn last line
+    (crash mid-write) is cut off so the next append starts on a fresh line.
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+
+    with open(output_path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                done.add(row_key(json.loads(line)))
+            except (ValueError, KeyError, TypeError):
+                continue
+    return done
+
+
+def chunks(items: Iterator[Tuple[Key, Any]], size: int) -> Iterator[Chunk]:
+    chunk = []
+    for entry in items:
+        chunk.append(entry)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def run_jsonl(
+    items: Iterator[Tuple[Key, Any]],
+    output_path: str,
+    process: Callable[[Chunk], List[Dict]],
+    init: Callable[..., None],
+    init_args: Tuple = (),
+    workers: int = 1,
+    chunk_size: int = 8,
+    ordered: bool = False,
+    label: str = "run",
+    progress_every: float = 10.0
+) -> Dict[str, float]:
+    """
+    Appends process(chunk) rows for every item whose key is not yet in
+    `output_path`, flushing after each chunk. `process` and `init` must
+    be module-level functions (they are pickled for spawned workers);
+    init(*init_args, threads=n) runs once per process.
+
+    ordered=True writes chunks in input order (a slow chunk holds back
+    the ones behind it); otherwise rows are written as chunks finish.
+    """
+    done = completed_keys(output_path)
+    pending = chunks(((key, item) for key, item in items if key not in done), chunk_size)
+
+    written = 0
+    started = time.perf_counter()
+    last_report = started
+
+    def report(final: bool = False) -> None:
+        elapsed = time.perf_counter() - started
+        rate = written / elapsed if elapsed else 0.0
+        stage = "done" if final else "progress"
+        print(
+            f"[{label}] {stage}: {written} new, {len(done) + written} total, {rate:.2f} items/s",
+            file=sys.stderr,
+            flush=True
+        )
+
+    with open(output_path, "a", encoding="utf-8") as out:
+        def write(rows: List[Dict]) -> None:
+            nonlocal written, last_report
+            out.write("".join(json.dumps(row) + "\n" for row in rows))
+            out.flush()
+            written += len(rows)
+
+            if time.perf_counter() - last_report >= progress_every:
+                last_report = time.perf_counter()
+                report()
+
+        if workers <= 1:
+            init(*init_args, threads=0)
+            for chunk in pending:
+                write(process(chunk))
+        else:
+            threads = max(1, (os.cpu_count() or 1) // workers)
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=get_context("spawn"),
+                initializer=_init_process,
+                initargs=(init, init_args, threads)
+            ) as pool:
+                if ordered:
+                    in_order = deque()
+                    for chunk in pending:
+                        in_order.append(pool.submit(process, chunk))
+                        if len(in_order) >= 2 * workers:
+                            write(in_order.popleft().result())
+                    while in_order:
+                        write(in_order.popleft().result())
+                else:
+                    in_flight = set()
+                    for chunk in pending:
+                        in_flight.add(pool.submit(process, chunk))
+                        if len(in_flight) >= 2 * workers:
+                            finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                            for future in finished:
+                                write(future.result())
+                    for future in wait(in_flight).done:
+                        write(future.result())
+
+    report(final=True)
+    elapsed = time.perf_counter() - started
+    return {
+        "skipped": len(done),
+        "written": written,
+        "seconds": elapsed,
+        "items_per_s": written / elapsed if elapsed else 0.0,
+    }
+
+
+def _init_process(init: Callable[..., None], init_args: Tuple, threads: int) -> None:
+    init(*init_args, threads=threads)
@@ -1,94 +1,624 @@
-import torch
-from transformers import AutoTokenizer, AutoModelForCausalLM, pipeline
-
-# Maps friendly names → lightweight local models
-MODEL_MAP = {
-    "qwen-mini": "Qwen/Qwen2.5-0.5B-Instruct",
-    "phi-mini": "microsoft/Phi-3.5-mini-instruct"
-}
-
-class LMProvider:
-    """
-    Lightweight LM interface for local, CPU/GPU-friendly open-source models.
-
-    - Uses GPU automatically if available
-    - Falls back to CPU on laptops without VRAM
-    - No paid API, no HF authentication needed
-    """
-
-    def __init__(self, model: str = "qwen-mini"):
-        # Map friendly names to HF paths
-        if model in MODEL_MAP:
-            self.model_name = MODEL_MAP[model]
-        else:
-            self.model_name = model       
-
-        print(f"[LMProvider] Loading local model: {self.model_name}")
-
-        # ----------------------------------------------------
-        # Device Selection (Hybrid: GPU if available, else CPU)
-        # ----------------------------------------------------
-        if torch.cuda.is_available():
-            device = "cuda"
-            torch_dtype = torch.float16
-            print("[LMProvider] CUDA detected → using GPU acceleration.")
-        else:
-            device = "cpu"
-            torch_dtype = torch.float32
-            print("[LMProvider] No GPU detected → using CPU.")
-
-        # --- FIX #1: Assign device to the class instance (Fixes AttributeError) ---
-        self.device = device 
-        
-        # --------------------------------------------------------------------------
-
-        # ----------------------------------------------------
-        # Load tokenizer
-        # ----------------------------------------------------
-        self.tokenizer = AutoTokenizer.from_pretrained(
-            self.model_name,
-            trust_remote_code=False # <-- FIX #2: Prevents loading of outdated code
-        )
-
-        # ----------------------------------------------------
-        # Load model (GPU/CPU automatically)
-        # ----------------------------------------------------
-        self.model = AutoModelForCausalLM.from_pretrained(
-            self.model_name,
-            trust_remote_code=False, # <-- FIX #2: Prevents loading of outdated code
-            torch_dtype=torch_dtype
-            # ...
-        ).to(device)
-
-        # ----------------------------------------------------
-        # Generation Pipeline
-        # ----------------------------------------------------
-        self.pipe = pipeline(
-            "text-generation",
-            model=self.model,
-            tokenizer=self.tokenizer,
-            device=self.device, # This line now works
-            do_sample=False,
-            temperature=0.1,
-            max_new_tokens=256
-        )
-
-    def complete(self, prompt: str, **kwargs) -> str:
-        """
-        Generate text from the local model with deterministic output.
-        """
-
-        max_tokens = kwargs.get("max_tokens", 256)
-
-        output = self.pipe(
-            prompt,
-            max_new_tokens=max_tokens,
-            do_sample=False,
-            temperature=0.1
-        )[0]["generated_text"]
-
-        # Remove prompt echo (common on small models)
-        if output.startswith(prompt):
-            output = output[len(prompt):]
-
-        return output.strip()
\ No newline at end of file
+import contextvars
+import threading
+from typing import Dict, Iterable, Iterator, List, Optional
+
+import torch
+from transformers import (
+    AutoTokenizer,
+    AutoModelForCausalLM,
+    DynamicCache,
+    StoppingCriteriaList,
+    TextIteratorStreamer,
+)
+
+from . import tracing
+from .completion_cache import CompletionCache
+from .onnx_backend import BACKENDS
+from .prompts import STATIC_PREFIXES
+from .registry import ModelRegistry, get_registry
+from .speculative import (
+    DraftModelProposer,
+    PromptLookupProposer,
+    Proposer,
+    SpeculationStats,
+    speculative_generate,
+    tokenizers_compatible,
+)
+from .stopping import StructuralStop, make_stopping
+
+# Maps friendly names → lightweight local models
+MODEL_MAP = {
+    "qwen-mini": "Qwen/Qwen2.5-0.5B-Instruct",
+    "phi-mini": "microsoft/Phi-3.5-mini-instruct"
+}
+
+# Weight precision modes:
+#   auto      float16 on GPU, float32 on CPU
+#   float32   full precision
+#   bfloat16  half the memory of float32, fast matmuls on recent CPUs
+#   int8      dynamic int8 quantization of every nn.Linear (CPU only)
+#   int4      4-bit weight-only quantization through torchao, if installed
+PRECISIONS = ("auto", "float32", "bfloat16", "int8", "int4")
+
+class LMProvider:
+    """
+    Lightweight LM interface for local, CPU/GPU-friendly open-source models.
+
+    - Uses GPU automatically if available
+    - Falls back to CPU on laptops without VRAM
+    - No paid API, no HF authentication needed
+    - Optional on-disk CompletionCache (decoding is greedy, so a
+      completion is fully determined by model, prompt and max_tokens)
+    - Weights are loaded lazily on first use and shared through the
+      process-wide ModelRegistry
+    - The KV-cache of each prompt template's fixed instruction block is
+      prefilled once at load time, so a call only prefills its suffix
+    - Reduced-precision and quantized weights (see PRECISIONS) for
+      hosts without a GPU
+    - backend="onnx" runs generation on ONNX Runtime (CPU), exporting
+      the locally cached checkpoint on first use
+    - draft_model="qwen-mini" turns on speculative decoding: the draft
+      proposes tokens, this model verifies them, greedy output unchanged
+    - prompt_lookup_stages=("pseudocode", "code") drafts tokens by n-gram
+      lookup in the prompt instead, for stages that copy from it
+    """
+
+    def __init__(
+        self,
+        model: str = "qwen-mini",
+        cache: Optional[CompletionCache] = None,
+        registry: Optional[ModelRegistry] = None,
+        prefix_cache: bool = True,
+        precision: str = "auto",
+        backend: str = "torch",
+        draft_model: Optional[str] = None,
+        speculative_stages: Optional[Iterable[str]] = None,
+        num_speculative_tokens: int = 5,
+        prompt_lookup_stages: Iterable[str] = (),
+        prompt_lookup_ngram: int = 3
+    ):
+        # Map friendly names to HF paths
+        if model in MODEL_MAP:
+            self.model_name = MODEL_MAP[model]
+        else:
+            self.model_name = model       
+
+        self.cache = cache
+        self.registry = registry or get_registry()
+
+        # ----------------------------------------------------
+        # Device Selection (Hybrid: GPU if available, else CPU)
+        # ----------------------------------------------------
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend {backend!r}; expected one of {BACKENDS}")
+
+        if torch.cuda.is_available() and backend == "torch":
+            device = "cuda"
+            torch_dtype = torch.float16
+        else:
+            device = "cpu"
+            torch_dtype = torch.float32
+
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown precision {precision!r}; expected one of {PRECISIONS}")
+        if precision == "int8" and device != "cpu":
+            raise ValueError("int8 dynamic quantization only runs on CPU")
+        if backend == "onnx" and precision not in ("auto", "float32"):
+            raise ValueError("The ONNX backend runs the float32 export; use precision='auto' or 'float32'")
+        if backend == "onnx" and (draft_model is not None or prompt_lookup_stages):
+            raise ValueError("Speculative decoding needs the torch backend")
+
+        # int8 quantizes float32 weights; torchao's int4 kernels expect bfloat16
+        if precision in ("bfloat16", "int4"):
+            torch_dtype = torch.bfloat16
+        elif precision in ("float32", "int8"):
+            torch_dtype = torch.float32
+
+        # --- FIX #1: Assign device to the class instance (Fixes AttributeError) ---
+        self.device = device 
+        self.torch_dtype = torch_dtype
+        self.precision = precision
+        self.backend = backend
+        
+        # --------------------------------------------------------------------------
+
+        self._tokenizer = None
+        self._model = None
+        self._load_lock = threading.Lock()
+
+        # ORT sessions take the KV-cache as graph inputs of a fixed
+        # layout; prefix reuse is only wired up for the torch backend.
+        self.prefix_cache = prefix_cache and backend == "torch"
+        self._prefixes: List[tuple] = []
+
+        # ----------------------------------------------------
+        # Speculative decoding (single-sequence calls only)
+        # ----------------------------------------------------
+        self.draft = None
+        if draft_model is not None:
+            self.draft = LMProvider(
+                model=draft_model,
+                registry=self.registry,
+                prefix_cache=False,
+                precision=precision
+            )
+        # None → every stage
+        self.speculative_stages = set(speculative_stages) if speculative_stages is not None else None
+        self.num_speculative_tokens = num_speculative_tokens
+        self._draft_same_vocab: Optional[bool] = None
+
+        # Prompt lookup takes precedence over the draft model for its stages
+        self.prompt_lookup_stages = set(prompt_lookup_stages)
+        self.prompt_lookup_ngram = prompt_lookup_ngram
+
+        self.token_stats: Dict[str, Dict[str, int]] = {}
+        self.speculation_stats: Dict[str, Dict[str, float]] = {}
+        self._stats_lock = threading.Lock()
+
+    # ------------------------------------------------------
+    # Lazy loading through the ModelRegistry
+    # ------------------------------------------------------
+    def load(self) -> "LMProvider":
+        """
+        Fetches tokenizer and weights from the registry, loading them if
+        no other component in this process has done so yet.
+        """
+        if self._model is not None:
+            return self
+
+        with self._load_lock:
+            if self._model is None:
+                key = self.weights_key
+                tokenizer, model = self.registry.get_or_load(key, self._load_weights)
+                self._tokenizer = tokenizer
+                if self.prefix_cache:
+                    self._prefixes = self._load_prefixes(key, tokenizer, model)
+                self._model = model
+
+        return self
+
+    def _load_weights(self):
+        print(f"[LMProvider] Loading local model: {self.model_name}")
+
+        if self.device == "cuda":
+            print("[LMProvider] CUDA detected → using GPU acceleration.")
+        else:
+            print("[LMProvider] No GPU detected → using CPU.")
+
+        # ----------------------------------------------------
+        # Load tokenizer
+        # ----------------------------------------------------
+        tokenizer = AutoTokenizer.from_pretrained(
+            self.model_name,
+            trust_remote_code=False # <-- FIX #2: Prevents loading of outdated code
+        )
+
+        # Batched generation needs a pad token and left padding so every
+        # row's continuation starts at the same position.
+        if tokenizer.pad_token is None:
+            tokenizer.pad_token = tokenizer.eos_token
+        tokenizer.padding_side = "left"
+
+        if self.backend == "onnx":
+            from .onnx_backend import load_causal_lm
+            return tokenizer, load_causal_lm(self.model_name)
+
+        # ----------------------------------------------------
+        # Load model (GPU/CPU automatically)
+        # ----------------------------------------------------
+        model = AutoModelForCausalLM.from_pretrained(
+            self.model_name,
+            trust_remote_code=False, # <-- FIX #2: Prevents loading of outdated code
+            torch_dtype=self.torch_dtype
+            # ...
+        ).to(self.device)
+
+        model = self._quantize(model)
+        model.eval()
+
+        return tokenizer, model
+
+    @property
+    def weights_key(self) -> tuple:
+        """Registry key of the loaded weights."""
+        return ("causal_lm", self.model_name, self.backend, self.precision, str(self.torch_dtype), self.device)
+
+    def _quantize(self, model):
+        if self.precision == "int8":
+            print("[LMProvider] Applying dynamic int8 quantization to Linear layers.")
+            return torch.ao.quantization.quantize_dynamic(
+                model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+
+        if self.precision == "int4":
+            try:
+                from torchao.quantization import int4_weight_only, quantize_
+            except ImportError:
+                raise ImportError(
+                    "torchao is required for int4 precision. Install with: pip install torchao"
+                )
+
+            print("[LMProvider] Applying int4 weight-only quantization (torchao).")
+            kwargs = {}
+            if self.device == "cpu":
+                # CPU kernels need their own packed layout (torchao >= 0.8)
+                try:
+                    from torchao.dtypes import Int4CPULayout
+                except ImportError:
+                    raise ImportError(
+                        "int4 on CPU needs torchao >= 0.8. Install with: pip install -U torchao"
+                    )
+                kwargs["layout"] = Int4CPULayout()
+
+            quantize_(model, int4_weight_only(**kwargs))
+
+        return model
+
+    # ------------------------------------------------------
+    # Prefix KV-cache for the static prompt templates
+    # ------------------------------------------------------
+    def _load_prefixes(self, weights_key, tokenizer, model) -> List[tuple]:
+        """
+        Prefills every template prefix once and returns (ids, past) pairs.
+        The last prefix token is dropped: BPE may merge it with the start
+        of the variable suffix, and the ids must match the full prompt's
+        tokenization exactly for the reuse to be valid.
+        """
+        prefixes = []
+        for text in STATIC_PREFIXES:
+            ids = tokenizer(text)["input_ids"][:-1]
+            if not ids:
+                continue
+            past = self.registry.get_or_load(
+                ("prefix_kv", weights_key, text),
+                lambda ids=ids: self._prefill(model, ids)
+            )
+            prefixes.append((ids, past))
+
+        # Longest first, so the most specific prefix wins
+        prefixes.sort(key=lambda p: len(p[0]), reverse=True)
+        return prefixes
+
+    def _prefill(self, model, ids: List[int]):
+        kwargs = {}
+        if getattr(model, "_supports_cache_class", False):
+            kwargs["past_key_values"] = DynamicCache()
+
+        with torch.no_grad():
+            out = model(torch.tensor([ids], device=self.device), use_cache=True, **kwargs)
+
+        past = out.past_key_values
+        if hasattr(past, "to_legacy_cache"):
+            past = past.to_legacy_cache()
+        return past
+
+    def _prefix_past(self, input_ids, attention_mask):
+        """
+        Returns past_key_values for the longest cached prefix shared by
+        every row, or None. Padded batches are skipped: left padding
+        shifts the prefix to a different position in each row.
+        """
+        if not self._prefixes or not bool(attention_mask.all()):
+            return None
+
+        batch, length = input_ids.shape
+        for ids, past in self._prefixes:
+            # The suffix must keep at least one token to prefill
+            if len(ids) >= length:
+                continue
+
+            head = torch.tensor(ids, device=input_ids.device)
+            if not bool((input_ids[:, :len(ids)] == head).all()):
+                continue
+
+            legacy = tuple(
+                tuple(t.expand(batch, *t.shape[1:]) for t in layer)
+                for layer in past
+            )
+            if getattr(self._model, "_supports_cache_class", False):
+                return DynamicCache.from_legacy_cache(legacy)
+            return legacy
+
+        return None
+
+    @property
+    def tokenizer(self):
+        return self.load()._tokenizer
+
+    @property
+    def model(self):
+        return self.load()._model
+
+    def complete(self, prompt: str, **kwargs) -> str:
+        """
+        Generate text from the local model with deterministic output.
+        """
+
+        max_tokens = kwargs.get("max_tokens", 256)
+        stage = kwargs.get("stage")
+
+        return self.complete_batch([prompt], max_tokens=max_tokens, stage=stage)[0]
+
+    def complete_batch(
+        self,
+        prompts: List[str],
+        max_tokens: int = 256,
+        batch_size: int = 8,
+        stage: Optional[str] = None
+    ) -> List[str]:
+        """
+        Batched counterpart of complete().
+
+        `stage` ("reasoning", "pseudocode", "code") enables that stage's
+        structural stopping criterion, so generation ends once the
+        output is complete instead of running to max_tokens.
+
+        Cached prompts are answered from the CompletionCache. The rest are
+        sorted by token length and generated in buckets of `batch_size`,
+        so each padded generate() call carries as little padding as
+        possible. Results are returned in input order.
+        """
+
+        if not prompts:
+            return []
+
+        with tracing.span("lm", stage=stage or "default", prompts=len(prompts)):
+            return self._complete_batch(prompts, max_tokens, batch_size, stage)
+
+    def _complete_batch(self, prompts: List[str], max_tokens: int, batch_size: int, stage: Optional[str]) -> List[str]:
+        outputs: List[Optional[str]] = [None] * len(prompts)
+
+        keys = []
+        if self.cache is not None:
+            keys = [self._cache_key(p, max_tokens, stage) for p in prompts]
+            for i, key in enumerate(keys):
+                outputs[i] = self.cache.get(key)
+
+        pending = [i for i, out in enumerate(outputs) if out is None]
+        tracing.count(lm_calls=1, cache_hits=len(prompts) - len(pending))
+        if not pending:
+            return outputs
+
+        lengths = [len(ids) for ids in self.tokenizer([prompts[i] for i in pending])["input_ids"]]
+        tracing.count(prompt_tokens=sum(lengths))
+        order = [pending[j] for j in sorted(range(len(pending)), key=lambda j: lengths[j])]
+
+        # Speculation verifies one sequence at a time
+        if self._speculates(stage):
+            batch_size = 1
+
+        for start in range(0, len(order), batch_size):
+            bucket = order[start:start + batch_size]
+            texts = self._generate([prompts[i] for i in bucket], max_tokens, stage)
+            for i, text in zip(bucket, texts):
+                outputs[i] = text
+                if self.cache is not None:
+                    self.cache.put(keys[i], text)
+
+        return outputs
+
+    def _cache_key(self, prompt: str, max_tokens: int, stage: Optional[str] = None) -> str:
+        return CompletionCache.make_key(
+            self.model_name,
+            prompt,
+            max_tokens=max_tokens,
+            do_sample=False,
+            stop=stage,
+            precision=self.precision,
+            backend=self.backend
+        )
+
+    def _generate(self, prompts: List[str], max_tokens: int, stage: Optional[str] = None) -> List[str]:
+        """
+        One padded, greedy generate() call over a bucket of prompts.
+        Only the newly generated tokens are decoded, so there is no
+        prompt echo to strip.
+        """
+
+        enc = self.tokenizer(prompts, return_tensors="pt", padding=True).to(self.device)
+        prompt_length = enc["input_ids"].shape[1]
+        stopper = make_stopping(stage, self.tokenizer, prompt_length)
+
+        out = self._run_generate(enc, max_tokens, stopper, stage)
+
+        new_tokens = out[:, prompt_length:]
+        tracing.count(generated_tokens=self._record_tokens(stage, new_tokens, stopper, max_tokens))
+        texts = self.tokenizer.batch_decode(new_tokens, skip_special_tokens=True)
+
+        return [t.strip() for t in texts]
+
+    def _run_generate(self, enc, max_tokens: int, stopper: Optional[StructuralStop], stage: Optional[str], streamer=None):
+        """
+        model.generate(), or the speculative loop when the stage has a
+        proposer and the call carries a single sequence.
+        """
+        proposer = self._proposer(stage) if enc["input_ids"].shape[0] == 1 else None
+
+        if proposer is None:
+            kwargs = self._generation_kwargs(max_tokens, stopper, enc)
+            if streamer is not None:
+                kwargs["streamer"] = streamer
+            with torch.no_grad():
+                return self.model.generate(**enc, **kwargs)
+
+        stats = SpeculationStats()
+        out = speculative_generate(
+            self.model,
+            enc["input_ids"],
+            proposer,
+            max_new_tokens=max_tokens,
+            eos_token_id=self.model.generation_config.eos_token_id,
+            stopper=stopper,
+            streamer=streamer,
+            num_speculative_tokens=self.num_speculative_tokens,
+            past_key_values=self._prefix_past(enc["input_ids"], enc["attention_mask"]),
+            stats=stats
+        )
+        self._record_speculation(stage, proposer, stats)
+        return out
+
+    # ------------------------------------------------------
+    # Speculative decoding
+    # ------------------------------------------------------
+    def _speculates(self, stage: Optional[str]) -> bool:
+        return stage in self.prompt_lookup_stages or self._uses_draft(stage)
+
+    def _uses_draft(self, stage: Optional[str]) -> bool:
+        return self.draft is not None and (
+            self.speculative_stages is None or stage in self.speculative_stages
+        )
+
+    def _proposer(self, stage: Optional[str]) -> Optional[Proposer]:
+        """A fresh proposer for one generation, or None to decode normally."""
+        if stage in self.prompt_lookup_stages:
+            return PromptLookupProposer(max_ngram=self.prompt_lookup_ngram)
+
+        if not self._uses_draft(stage):
+            return None
+
+        if self._draft_same_vocab is None:
+            # Different vocabularies (e.g. Qwen vs Phi) are bridged through text
+            self._draft_same_vocab = tokenizers_compatible(self.draft.tokenizer, self.tokenizer)
+
+        return DraftModelProposer(
+            self.draft.model,
+            self.draft.tokenizer,
+            self.tokenizer,
+            same_vocab=self._draft_same_vocab
+        )
+
+    def _record_speculation(self, stage: Optional[str], proposer: Proposer, stats: SpeculationStats) -> None:
+        with self._stats_lock:
+            totals = self.speculation_stats.setdefault(stage or "default", {"proposer": proposer.name, "calls": 0})
+            totals["calls"] += 1
+            for name, value in stats.as_dict().items():
+                totals[name] = totals.get(name, 0) + value
+
+    def speculation_report(self) -> Dict[str, Dict[str, float]]:
+        """
+        Per-stage speculation counters plus:
+        - acceptance_rate: accepted / proposed tokens
+        - tokens_per_target_pass: generated tokens per forward pass of
+          this model (1.0 without speculation). An upper bound, not a
+          speedup: proposer cost and verification overhead are not in
+          it; `benchmark --speculation` measures the wall-clock ratio
+        """
+        with self._stats_lock:
+            report = {}
+            for stage, totals in self.speculation_stats.items():
+                row = dict(totals)
+                row["acceptance_rate"] = row["accepted"] / row["proposed"] if row["proposed"] else 0.0
+                row["tokens_per_target_pass"] = (
+                    row["generated_tokens"] / row["target_passes"] if row["target_passes"] else 0.0
+                )
+                report[stage] = row
+            return report
+
+    def _generation_kwargs(self, max_tokens: int, stopper: Optional[StructuralStop] = None, enc=None) -> dict:
+        kwargs = dict(
+            max_new_tokens=max_tokens,
+            do_sample=False,
+            pad_token_id=self.tokenizer.pad_token_id
+        )
+        if stopper is not None:
+            kwargs["stopping_criteria"] = StoppingCriteriaList([stopper])
+        if enc is not None:
+            past = self._prefix_past(enc["input_ids"], enc["attention_mask"])
+            if past is not None:
+                kwargs["past_key_values"] = past
+        return kwargs
+
+    # ------------------------------------------------------
+    # Token accounting for structural early stopping
+    # ------------------------------------------------------
+    def _record_tokens(self, stage: Optional[str], new_tokens, stopper: Optional[StructuralStop], max_tokens: int) -> int:
+        """Adds one generate() call to token_stats; returns its generated tokens."""
+        eos = self.tokenizer.eos_token_id
+        pad = self.tokenizer.pad_token_id
+        total = 0
+
+        with self._stats_lock:
+            stats = self.token_stats.setdefault(
+                stage or "default",
+                {"calls": 0, "early_stops": 0, "generated_tokens": 0, "saved_tokens": 0}
+            )
+
+            for row, ids in enumerate(new_tokens.tolist()):
+                stopped = stopper.stopped_at[row] if stopper is not None and row < len(stopper.stopped_at) else None
+
+                if stopped is not None:
+                    generated = stopped
+                    stats["early_stops"] += 1
+                    stats["saved_tokens"] += max_tokens - generated
+                else:
+                    generated = len(ids)
+                    for n, tok in enumerate(ids):
+                        if tok in (eos, pad):
+                            generated = n + 1
+                            break
+
+                stats["calls"] += 1
+                stats["generated_tokens"] += generated
+                total += generated
+
+        return total
+
+    def token_report(self) -> Dict[str, Dict[str, int]]:
+        """
+        Per-stage token counts. saved_tokens is the upper bound of
+        tokens skipped by early stopping (max_tokens minus generated).
+        """
+        with self._stats_lock:
+            return {stage: dict(stats) for stage, stats in self.token_stats.items()}
+
+    # ------------------------------------------------------
+    # Token streaming
+    # ------------------------------------------------------
+    def stream(self, prompt: str, **kwargs) -> Iterator[str]:
+        """
+        Same greedy generation as complete(), but yields decoded text
+        chunks while the model is still generating. The concatenated
+        chunks equal complete(prompt) up to surrounding whitespace.
+        """
+
+        max_tokens = kwargs.get("max_tokens", 256)
+        stage = kwargs.get("stage")
+
+        key = None
+        if self.cache is not None:
+            key = self._cache_key(prompt, max_tokens, stage)
+            cached = self.cache.get(key)
+            if cached is not None:
+                yield cached
+                return
+
+        enc = self.tokenizer([prompt], return_tensors="pt").to(self.device)
+        prompt_length = enc["input_ids"].shape[1]
+        stopper = make_stopping(stage, self.tokenizer, prompt_length)
+        streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True)
+        errors = []
+
+        def run():
+            try:
+                out = self._run_generate(enc, max_tokens, stopper, stage, streamer=streamer)
+                tracing.count(generated_tokens=self._record_tokens(stage, out[:, prompt_length:], stopper, max_tokens))
+            except Exception as e:
+                errors.append(e)
+                streamer.end()
+
+        # The caller's context (e.g. the current tracing span) carries over
+        thread = threading.Thread(target=contextvars.copy_context().run, args=(run,), daemon=True)
+        thread.start()
+
+        chunks = []
+        for chunk in streamer:
+            if chunk:
+                chunks.append(chunk)
+                yield chunk
+
+        thread.join()
+        if errors:
+            raise errors[0]
+
+        if key is not None:
+            self.cache.put(key, "".join(chunks).strip())
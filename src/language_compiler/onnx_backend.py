@@ -0,0 +1,144 @@
+"""
+ONNX Runtime backend for the causal LM and the sentence embedder.
+
+Checkpoints are exported once from the local Hugging Face cache (no
+network access) into DEFAULT_ONNX_DIR and reused from there:
+
+- causal LMs run through optimum's ORTModelForCausalLM, which plugs
+  into transformers' generate() (stopping criteria, streaming)
+- the sentence embedder runs on onnxruntime + tokenizers + numpy only,
+  so embedding never touches torch
+
+Export needs `optimum[exporters]` (and torch, once); running needs
+`onnxruntime`, plus `optimum` for the causal LM.
+"""
+
+import os
+from typing import List, Union
+
+import numpy as np
+
+DEFAULT_ONNX_DIR = os.path.join(
+    os.path.expanduser("~"), ".cache", "language_compiler", "onnx"
+)
+
+BACKENDS = ("torch", "onnx")
+
+
+def export_dir(model_name: str, root: str = DEFAULT_ONNX_DIR) -> str:
+    return os.path.join(root, model_name.replace("/", "--"))
+
+
+def export(model_name: str, task: str, root: str = DEFAULT_ONNX_DIR) -> str:
+    """
+    Exports `model_name` to ONNX unless a previous export exists, and
+    returns the export directory. Only locally cached weights are used.
+    """
+    out_dir = export_dir(model_name, root)
+    if os.path.exists(os.path.join(out_dir, "model.onnx")):
+        return out_dir
+
+    try:
+        from optimum.exporters.onnx import main_export
+    except ImportError:
+        raise ImportError(
+            "optimum is required to export ONNX models. Install with: pip install optimum[exporters]"
+        )
+
+    print(f"[onnx] Exporting {model_name} → {out_dir} (one-time)")
+    main_export(
+        model_name,
+        output=out_dir,
+        task=task,
+        device="cpu",
+        local_files_only=True
+    )
+    return out_dir
+
+
+# ============================================================
+# Causal LM
+# ============================================================
+
+def load_causal_lm(model_name: str, root: str = DEFAULT_ONNX_DIR):
+    """ORTModelForCausalLM with KV-cache, exported on first use."""
+    out_dir = export(model_name, task="text-generation-with-past", root=root)
+
+    try:
+        from optimum.onnxruntime import ORTModelForCausalLM
+    except ImportError:
+        raise ImportError(
+            "optimum is required for the ONNX causal LM. Install with: pip install optimum[onnxruntime]"
+        )
+
+    return ORTModelForCausalLM.from_pretrained(
+        out_dir,
+        use_cache=True,
+        provider="CPUExecutionProvider"
+    )
+
+
+# ============================================================
+# Sentence embedder
+# ============================================================
+
+class OnnxSentenceEmbedder:
+    """
+    Drop-in for the parts of SentenceTransformer the compiler uses:
+    encode() returns L2-normalised, mean-pooled embeddings as numpy
+    arrays, matching all-MiniLM-L6-v2's Pooling + Normalize modules.
+    """
+
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", root: str = DEFAULT_ONNX_DIR, max_length: int = 256):
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+        except ImportError:
+            raise ImportError(
+                "onnxruntime and tokenizers are required. Install with: pip install onnxruntime tokenizers"
+            )
+
+        # Bare sentence-transformers names live under that org on the Hub
+        hub_name = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+        out_dir = export(hub_name, task="feature-extraction", root=root)
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(out_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length)
+        self.tokenizer.enable_padding()
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            os.path.join(out_dir, "model.onnx"),
+            sess_options=options,
+            providers=["CPUExecutionProvider"]
+        )
+        self._input_names = {i.name for i in self.session.get_inputs()}
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32, **kwargs) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+
+        chunks = [
+            self._encode_batch(texts[start:start + batch_size])
+            for start in range(0, len(texts), batch_size)
+        ]
+        embeddings = np.concatenate(chunks) if chunks else np.zeros((0, 0), dtype=np.float32)
+
+        return embeddings[0] if single else embeddings
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+
+        feeds = {"input_ids": ids, "attention_mask": mask}
+        if "token_type_ids" in self._input_names:
+            feeds["token_type_ids"] = np.zeros_like(ids)
+
+        hidden = self.session.run(None, feeds)[0]
+
+        # Mean pooling over real tokens, then L2 normalisation
+        weights = mask[..., None].astype(hidden.dtype)
+        pooled = (hidden * weights).sum(axis=1) / np.clip(weights.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
@@ -0,0 +1,100 @@
+"""
+Single-pass scanner for the cue phrases used by ambiguity detection.
+
+Every phrase list (vague wording, action verbs, trigger phrases) lives
+here and is compiled once into one case-insensitive alternation with
+word boundaries, longest phrases first. One finditer() over an
+instruction reports every phrase hit and every number, so:
+- "soon" no longer fires inside "sooner", "high" inside "highlight"
+- "as soon as the door opens" is a trigger, not vague wording, because
+  the longer phrase wins at that position
+- cost grows with the instruction, not with phrases × instruction
+"""
+
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+
+# ------------------------------------------------------
+# Vague wording → clarification field (None: vague, but
+# IntentParser does not short-circuit on it)
+# ------------------------------------------------------
+VAGUE_PHRASES: Dict[str, Optional[str]] = {
+    "too long": "queue_length_threshold",
+    "after a while": "time_window",
+    "a bit": "rate_adjustment",
+    "quickly": "speed_value",
+    "soon": "time_window",
+    "as soon as possible": "time_window",
+    "busy": "load_threshold",
+    "overloaded": "load_threshold",
+    "high": None,
+    "low": None,
+}
+
+# Verbs whose presence counts as "the instruction names an action"
+ACTION_VERBS = [
+    "turn on", "turn off", "open", "close", "notify", "send", "set",
+    "activate", "deactivate", "lock", "unlock", "start", "stop",
+]
+
+# Not cues themselves; listed so their words are not read as vague
+# ("as soon as the door opens" is precise)
+TRIGGER_PHRASES = ["as soon as", "whenever", "when", "once", "if", "unless"]
+
+NUMBER_PATTERN = r"-?\d+(?:\.\d+)?"
+
+
+@dataclass
+class PhraseHit:
+    kind: str  # "vague", "verb", "trigger" or "number"
+    phrase: str  # canonical phrase (or the number as written)
+    start: int
+    end: int
+
+
+class PhraseScanner:
+    """Compiled matcher over {phrase: kind}; see scan()."""
+
+    def __init__(self, phrases: Dict[str, str]):
+        self.phrases = {self._key(p): kind for p, kind in phrases.items()}
+        alternation = "|".join(
+            re.escape(p).replace(r"\ ", r"\s+")
+            for p in sorted(self.phrases, key=len, reverse=True)
+        )
+        self.pattern = re.compile(
+            rf"(?P<number>{NUMBER_PATTERN})|\b(?P<phrase>{alternation})\b",
+            re.I
+        )
+
+    @staticmethod
+    def _key(phrase: str) -> str:
+        return " ".join(phrase.lower().split())
+
+    def scan(self, text: str) -> List[PhraseHit]:
+        """Every non-overlapping phrase and number in `text`, left to right."""
+        hits = []
+        for m in self.pattern.finditer(text):
+            if m.group("number") is not None:
+                hits.append(PhraseHit("number", m.group(), m.start(), m.end()))
+            else:
+                phrase = self._key(m.group())
+                hits.append(PhraseHit(self.phrases[phrase], phrase, m.start(), m.end()))
+        return hits
+
+
+SCANNER = PhraseScanner({
+    **{p: "trigger" for p in TRIGGER_PHRASES},
+    **{p: "verb" for p in ACTION_VERBS},
+    **{p: "vague" for p in VAGUE_PHRASES},
+})
+
+
+def scan(text: str) -> List[PhraseHit]:
+    return SCANNER.scan(text)
+
+
+def vague_phrases(text: str) -> List[str]:
+    """Vague phrases in `text`, in order of appearance."""
+    return [h.phrase for h in scan(text) if h.kind == "vague"]
@@ -1,42 +1,285 @@
-from .schemas import CompilerOutput
-from .intent_parser import IntentParser
-from .pseudocode import PseudocodeGenerator
-from .codegen import CodeGenerator
-from .lm_provider import LMProvider
-from .semantic_preprocessor import SemanticPreprocessor 
-
-
-class LanguageCompiler:
-    """
-    Main orchestrator:
-    - Parse natural language → LogicPlan
-    - Convert LogicPlan → pseudocode (with TODOs if ambiguous)
-    - Optionally generate Python code
-
-    Supports hybrid clarification mode:
-        compile(instruction, interactive=True)
-    returns missing clarifications in CompilerOutput.clarifications_needed.
-    """
-
-    def __init__(self, model: str = "microsoft/Phi-3-mini-4k-instruct"):
-        self.lm = LMProvider(model=model)
-        self.parser = IntentParser(self.lm)
-        self.pseudo = PseudocodeGenerator(self.lm)
-        self.codegen = CodeGenerator(self.lm)
-        self.semantic = SemanticPreprocessor()
-
-    def compile(self, instruction: str, to_code: bool = False, interactive: bool = False) -> CompilerOutput:
-        sem = self.semantic.normalize(instruction)
-        instruction_norm = sem.normalized_instruction
-
-        plan = self.parser.parse(instruction_norm)
-        pseudo = self.pseudo.generate(plan, interactive=interactive)
-
-        clarifications = (pseudo.missing_clarifications if interactive else None)
-
-        return CompilerOutput(
-            reasoning=plan,
-            pseudocode=pseudo,
-            code=None if not to_code else self.codegen.generate_python(pseudo),
-            clarifications_needed=clarifications
-        )
+import asyncio
+from typing import Iterable, Iterator, List, Optional
+
+from . import tracing
+from .schemas import CodeBlock, CompileMetrics, CompilerOutput, CompileEvent, StageMetrics
+from .intent_parser import IntentParser
+from .pseudocode import PseudocodeGenerator
+from .codegen import CodeGenerator
+from .lm_provider import LMProvider
+from .completion_cache import CompletionCache
+from .registry import ModelRegistry
+from .scheduler import MicroBatchScheduler
+from .semantic_preprocessor import SemanticPreprocessor 
+from .utils import clean_code
+
+
+class LanguageCompiler:
+    """
+    Main orchestrator:
+    - Parse natural language → LogicPlan
+    - Convert LogicPlan → pseudocode (with TODOs if ambiguous)
+    - Optionally generate Python code
+
+    Supports hybrid clarification mode:
+        compile(instruction, interactive=True)
+    returns missing clarifications in CompilerOutput.clarifications_needed.
+
+    compile_batch(instructions) runs the same stages over a whole list,
+    one batched LLM pass per stage.
+
+    compile_stream(instruction) yields CompileEvents (plan, pseudocode and
+    code tokens, clarifications) as soon as each piece is available.
+
+    await acompile(instruction) is the asyncio entry point: LLM calls from
+    concurrent acompile() calls are micro-batched per stage, waiting at
+    most `max_wait` seconds for up to `max_batch_size` prompts.
+
+    collect_metrics=True attaches per-stage timings, token counts, cache
+    hits and repair/fallback flags to CompilerOutput.metrics; each
+    compile's spans also go to `span_exporters` (see tracing.py).
+
+    `lm` and `semantic` replace the LMProvider and SemanticPreprocessor
+    built from the model arguments (tests, benchmarks, custom backends);
+    `lm` needs complete(), complete_batch() and stream().
+    """
+
+    def __init__(
+        self,
+        model: str = "microsoft/Phi-3-mini-4k-instruct",
+        cache: Optional[CompletionCache] = None,
+        registry: Optional[ModelRegistry] = None,
+        max_batch_size: int = 8,
+        max_wait: float = 0.01,
+        precision: str = "auto",
+        backend: str = "torch",
+        draft_model: Optional[str] = None,
+        prompt_lookup_stages: Iterable[str] = (),
+        collect_metrics: bool = False,
+        span_exporters: Optional[List[tracing.SpanExporter]] = None,
+        lm=None,
+        semantic: Optional[SemanticPreprocessor] = None
+    ):
+        # Models load on first compile and are shared through the
+        # process-wide registry, so constructing a compiler is cheap.
+        self.lm = lm or LMProvider(
+            model=model,
+            cache=cache,
+            registry=registry,
+            precision=precision,
+            backend=backend,
+            draft_model=draft_model,
+            prompt_lookup_stages=prompt_lookup_stages
+        )
+        self.parser = IntentParser(self.lm)
+        self.pseudo = PseudocodeGenerator(self.lm)
+        self.codegen = CodeGenerator(self.lm)
+        self.semantic = semantic or SemanticPreprocessor(registry=registry, backend=backend)
+        self.scheduler = MicroBatchScheduler(self.lm, max_batch_size=max_batch_size, max_wait=max_wait)
+        self.collect_metrics = collect_metrics
+        self.span_exporters = list(span_exporters or [])
+
+    def compile(self, instruction: str, to_code: bool = False, interactive: bool = False) -> CompilerOutput:
+        if not (self.collect_metrics or self.span_exporters):
+            return self._compile(instruction, to_code, interactive)
+
+        with tracing.trace(self.span_exporters) as t:
+            out = self._compile(instruction, to_code, interactive)
+
+        if self.collect_metrics:
+            out.metrics = compile_metrics(t.spans)
+        return out
+
+    def _compile(self, instruction: str, to_code: bool, interactive: bool) -> CompilerOutput:
+        with tracing.span("compile"):
+            with tracing.span("semantic"):
+                sem = self.semantic.normalize(instruction)
+            instruction_norm = sem.normalized_instruction
+
+            with tracing.span("reasoning"):
+                plan = self.parser.parse(instruction_norm, semantic=sem)
+            with tracing.span("pseudocode"):
+                pseudo = self.pseudo.generate(plan, interactive=interactive)
+
+            clarifications = (pseudo.missing_clarifications if interactive else None)
+
+            code = None
+            if to_code:
+                with tracing.span("code"):
+                    code = self.codegen.generate_python(pseudo)
+
+        return CompilerOutput(
+            reasoning=plan,
+            pseudocode=pseudo,
+            code=code,
+            clarifications_needed=clarifications
+        )
+
+    async def acompile(self, instruction: str, to_code: bool = False, interactive: bool = False) -> CompilerOutput:
+        """
+        Same result as compile(), without blocking the event loop. Each
+        LLM call goes through the scheduler and shares a batched
+        generate() with concurrent acompile() calls at the same stage.
+        """
+        loop = asyncio.get_running_loop()
+        sem = await loop.run_in_executor(None, self.semantic.normalize, instruction)
+        instruction_norm = sem.normalized_instruction
+
+        plan = self.parser.precheck(instruction_norm, sem)
+        if plan is None:
+            raw = await self.scheduler.complete(
+                self.parser.build_prompt(instruction_norm),
+                max_tokens=self.parser.MAX_TOKENS,
+                stage=self.parser.STAGE
+            )
+            plan = self.parser.plan_from_output(raw)
+
+        raw = self.pseudo.render(plan)
+        if raw is None:
+            raw = await self.scheduler.complete(
+                self.pseudo.build_prompt(plan),
+                max_tokens=self.pseudo.MAX_TOKENS,
+                stage=self.pseudo.STAGE
+            )
+        pseudo = self.pseudo.block_from_output(raw, plan, interactive=interactive)
+
+        code = None
+        if to_code:
+            raw = await self.scheduler.complete(
+                self.codegen.build_prompt(pseudo),
+                max_tokens=self.codegen.MAX_TOKENS,
+                stage=self.codegen.STAGE
+            )
+            text = clean_code(raw)
+
+            repair = self.codegen.repair_prompt(text, pseudo)
+            if repair is not None:
+                text = clean_code(await self.scheduler.complete(
+                    repair,
+                    max_tokens=self.codegen.MAX_TOKENS,
+                    stage=self.codegen.STAGE
+                ))
+
+            code = CodeBlock(language="python", code=text)
+
+        return CompilerOutput(
+            reasoning=plan,
+            pseudocode=pseudo,
+            code=code,
+            clarifications_needed=(pseudo.missing_clarifications if interactive else None)
+        )
+
+    def compile_stream(
+        self,
+        instruction: str,
+        to_code: bool = False,
+        interactive: bool = False
+    ) -> Iterator[CompileEvent]:
+        sem = self.semantic.normalize(instruction)
+        instruction_norm = sem.normalized_instruction
+
+        plan = self.parser.parse(instruction_norm, semantic=sem)
+        yield CompileEvent(kind="plan", plan=plan)
+
+        chunks = []
+        for chunk in self.pseudo.stream(plan):
+            chunks.append(chunk)
+            yield CompileEvent(kind="pseudocode_token", text=chunk)
+
+        pseudo = self.pseudo.block_from_output("".join(chunks), plan, interactive=interactive)
+        yield CompileEvent(kind="pseudocode", pseudocode=pseudo)
+
+        clarifications = (pseudo.missing_clarifications if interactive else None)
+        if clarifications:
+            yield CompileEvent(kind="clarifications", clarifications=clarifications)
+
+        code = None
+        if to_code:
+            chunks = []
+            for chunk in self.codegen.stream(pseudo):
+                chunks.append(chunk)
+                yield CompileEvent(kind="code_token", text=chunk)
+
+            code = self.codegen.block_from_output("".join(chunks), pseudo)
+            yield CompileEvent(kind="code", code=code)
+
+        yield CompileEvent(
+            kind="done",
+            output=CompilerOutput(
+                reasoning=plan,
+                pseudocode=pseudo,
+                code=code,
+                clarifications_needed=clarifications
+            )
+        )
+
+    def compile_batch(
+        self,
+        instructions: List[str],
+        to_code: bool = False,
+        interactive: bool = False,
+        batch_size: int = 8
+    ) -> List[CompilerOutput]:
+        sems = self.semantic.normalize_batch(instructions)
+        instructions_norm = [sem.normalized_instruction for sem in sems]
+
+        plans = self.parser.parse_batch(instructions_norm, semantics=sems, batch_size=batch_size)
+        pseudos = self.pseudo.generate_batch(plans, interactive=interactive, batch_size=batch_size)
+
+        codes = [None] * len(pseudos)
+        if to_code:
+            codes = self.codegen.generate_python_batch(pseudos, batch_size=batch_size)
+
+        return [
+            CompilerOutput(
+                reasoning=plan,
+                pseudocode=pseudo,
+                code=code,
+                clarifications_needed=(pseudo.missing_clarifications if interactive else None)
+            )
+            for plan, pseudo, code in zip(plans, pseudos, codes)
+        ]
+
+
+def compile_metrics(spans: List[tracing.Span]) -> CompileMetrics:
+    """CompileMetrics from the spans of one compile() (see _compile)."""
+    root = next(s for s in reversed(spans) if s.name == "compile")
+    by_id = {s.span_id: s for s in spans}
+
+    def stage_of(span: tracing.Span) -> Optional[str]:
+        """Id of the root's child that `span` sits under."""
+        while span.parent_id is not None and span.parent_id != root.span_id:
+            span = by_id[span.parent_id]
+        return span.span_id if span.parent_id == root.span_id else None
+
+    # Tokens/s counts LM time only, not parsing or rendering around it
+    lm_seconds = {}
+    for s in spans:
+        if s.name == "lm":
+            stage_id = stage_of(s)
+            lm_seconds[stage_id] = lm_seconds.get(stage_id, 0.0) + s.duration_s
+
+    stages = []
+    for s in spans:
+        if s.parent_id != root.span_id:
+            continue
+        generated = int(s.counters.get("generated_tokens", 0))
+        seconds = lm_seconds.get(s.span_id, 0.0)
+        stages.append(StageMetrics(
+            stage=s.name,
+            wall_s=s.duration_s,
+            lm_calls=int(s.counters.get("lm_calls", 0)),
+            prompt_tokens=int(s.counters.get("prompt_tokens", 0)),
+            generated_tokens=generated,
+            tokens_per_s=generated / seconds if generated and seconds else None,
+            cache_hits=int(s.counters.get("cache_hits", 0)),
+            source=s.attributes.get("source"),
+            repaired=bool(s.attributes.get("repaired", False))
+        ))
+
+    return CompileMetrics(
+        wall_s=root.duration_s,
+        stages=stages,
+        repaired=any(st.repaired for st in stages),
+        fallback=any(st.stage == "pseudocode" and st.source == "llm" for st in stages)
+    )
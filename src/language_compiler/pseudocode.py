@@ -1,62 +1,135 @@
-import json
-from typing import List
-from .schemas import LogicPlan, PseudocodeBlock
-from .prompts import PSEUDOCODE_TEMPLATE
-from .lm_provider import LMProvider
-
-
-class PseudocodeGenerator:
-    """
-    Generates pseudocode from a LogicPlan using:
-    1. LLM formatting guided by PSEUDOCODE_TEMPLATE
-    2. Clarification-aware TODO marker insertion
-    """
-
-    def __init__(self, lm: LMProvider):
-        self.lm = lm
-
-    # ------------------------------------------------------
-    # Extract missing clarifications from the logic plan
-    # ------------------------------------------------------
-    def _collect_missing_fields(self, plan: LogicPlan) -> List[str]:
-        missing = []
-        for step in plan.steps:
-            if step.clarification_needed and step.clarification_field:
-                missing.append(step.clarification_field)
-        return missing
-
-    # ------------------------------------------------------
-    # Produce pseudocode using the LLM
-    # ------------------------------------------------------
-    def generate(self, plan: LogicPlan, interactive: bool = False) -> PseudocodeBlock:
-        """
-        interactive=False  → pseudocode contains TODO(field)
-        interactive=True   → same pseudocode, but CompilerOutput will
-                             return clarifications_needed list so caller
-                             can ask the user for missing values.
-
-        This generator itself NEVER asks the user — that is handled
-        by the pipeline.
-        """
-
-        logic_json = plan.model_dump()
-        logic_str = json.dumps(logic_json, indent=2)
-
-        prompt = PSEUDOCODE_TEMPLATE.format(logic_json=logic_str)
-
-        pseudo = self.lm.complete(prompt, max_tokens=500).strip()
-
-        # Gather missing clarification fields
-        missing_fields = self._collect_missing_fields(plan)
-        
-        lines = []
-        for line in pseudo.split("\n"):
-            if not line.lower().startswith(("note:", "explanation:", "clarification")):
-                lines.append(line)
-
-        pseudo = "\n".join(lines).strip()
-
-        return PseudocodeBlock(
-            code=pseudo,
-            missing_clarifications=missing_fields if interactive else None
-        )
+import json
+from typing import Iterator, List, Optional
+from .schemas import LogicPlan, PseudocodeBlock
+from .prompts import PSEUDOCODE_TEMPLATE
+from .lm_provider import LMProvider
+from .pseudocode_renderer import PseudocodeRenderer
+from . import tracing
+
+
+class PseudocodeGenerator:
+    """
+    Generates pseudocode from a LogicPlan using:
+    1. Deterministic rendering of the plan (PseudocodeRenderer)
+    2. LLM formatting guided by PSEUDOCODE_TEMPLATE, as a fallback for
+       plans the renderer cannot express
+    3. Clarification-aware TODO marker insertion
+    """
+
+    MAX_TOKENS = 500
+    STAGE = "pseudocode"
+
+    def __init__(self, lm: LMProvider, use_renderer: bool = True, llm_fallback: bool = True):
+        self.lm = lm
+        self.renderer = PseudocodeRenderer() if use_renderer else None
+        self.llm_fallback = llm_fallback
+
+    # ------------------------------------------------------
+    # Extract missing clarifications from the logic plan
+    # ------------------------------------------------------
+    def _collect_missing_fields(self, plan: LogicPlan) -> List[str]:
+        missing = []
+        for step in plan.steps:
+            if step.clarification_needed and step.clarification_field:
+                missing.append(step.clarification_field)
+        return missing
+
+    # ------------------------------------------------------
+    # Produce pseudocode (renderer first, LLM as fallback)
+    # ------------------------------------------------------
+    def generate(self, plan: LogicPlan, interactive: bool = False) -> PseudocodeBlock:
+        """
+        interactive=False  → pseudocode contains TODO(field)
+        interactive=True   → same pseudocode, but CompilerOutput will
+                             return clarifications_needed list so caller
+                             can ask the user for missing values.
+
+        This generator itself NEVER asks the user — that is handled
+        by the pipeline.
+        """
+
+        pseudo = self.render(plan)
+        if pseudo is None:
+            tracing.annotate(source="llm")
+            pseudo = self.lm.complete(self.build_prompt(plan), max_tokens=self.MAX_TOKENS, stage=self.STAGE)
+        else:
+            tracing.annotate(source="renderer")
+
+        return self.block_from_output(pseudo, plan, interactive=interactive)
+
+    def generate_batch(
+        self,
+        plans: List[LogicPlan],
+        interactive: bool = False,
+        batch_size: int = 8
+    ) -> List[PseudocodeBlock]:
+        """
+        Same as generate() for many plans; plans the renderer cannot
+        handle share one complete_batch() call.
+        """
+        raws = [self.render(plan) for plan in plans]
+        pending = [i for i, raw in enumerate(raws) if raw is None]
+
+        if pending:
+            outputs = self.lm.complete_batch(
+                [self.build_prompt(plans[i]) for i in pending],
+                max_tokens=self.MAX_TOKENS,
+                stage=self.STAGE,
+                batch_size=batch_size
+            )
+            for i, out in zip(pending, outputs):
+                raws[i] = out
+
+        return [
+            self.block_from_output(raw, plan, interactive=interactive)
+            for raw, plan in zip(raws, plans)
+        ]
+
+    def stream(self, plan: LogicPlan) -> Iterator[str]:
+        """
+        Yields raw pseudocode text as it is produced: the rendered plan
+        in one chunk, or LLM tokens when falling back. Pass the joined
+        chunks to block_from_output() for the final block.
+        """
+        rendered = self.render(plan)
+        if rendered is not None:
+            yield rendered
+            return
+
+        yield from self.lm.stream(self.build_prompt(plan), max_tokens=self.MAX_TOKENS, stage=self.STAGE)
+
+    def render(self, plan: LogicPlan) -> Optional[str]:
+        """
+        Deterministic pseudocode for the plan, or None when the LLM has
+        to take over.
+        """
+        rendered = self.renderer.render(plan) if self.renderer is not None else None
+
+        if rendered is None and not self.llm_fallback:
+            raise ValueError("LogicPlan cannot be rendered without the LLM fallback")
+
+        return rendered
+
+    def build_prompt(self, plan: LogicPlan) -> str:
+        logic_json = plan.model_dump()
+        logic_str = json.dumps(logic_json, indent=2)
+
+        return PSEUDOCODE_TEMPLATE.format(logic_json=logic_str)
+
+    def block_from_output(self, raw: str, plan: LogicPlan, interactive: bool = False) -> PseudocodeBlock:
+        pseudo = raw.strip()
+
+        # Gather missing clarification fields
+        missing_fields = self._collect_missing_fields(plan)
+        
+        lines = []
+        for line in pseudo.split("\n"):
+            if not line.lower().startswith(("note:", "explanation:", "clarification")):
+                lines.append(line)
+
+        pseudo = "\n".join(lines).strip()
+
+        return PseudocodeBlock(
+            code=pseudo,
+            missing_clarifications=missing_fields if interactive else None
+        )
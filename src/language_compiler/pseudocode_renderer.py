@@ -0,0 +1,242 @@
+import re
+from typing import Dict, List, Optional, Tuple
+
+from .phrase_scanner import ACTION_VERBS
+from .schemas import LogicPlan, LogicUnit
+from .rule_parser import OPERATOR_PATTERN
+
+INDENT = "    "
+
+_ARTICLES = {"a", "an", "the"}
+_CALL = re.compile(r"^([A-Z][A-Z0-9_]*)\s*\((.*)\)$")
+_VERB_ARG = re.compile(r"^([A-Z][A-Z0-9_]+)\s+(.+)$")
+# "TURN_ON AC" is a call; "AC off" / "TV on" are not
+_KNOWN_VERBS = {"_".join(v.upper().split()) for v in ACTION_VERBS}
+_TRAILING_ARG = re.compile(
+    r"^(?P<head>.+?)\s+(?:to|by|at)\s+(?P<arg>-?\d+(?:\.\d+)?)"
+    r"(?:\s*(?:%|percent|degrees?|minutes?|seconds?|hours?))?$",
+    re.I
+)
+
+
+class PseudocodeRenderer:
+    """
+    Compiles a LogicPlan straight into IF / AND / NOT pseudocode.
+
+    - depends_on is sorted topologically
+    - conditions become (nested) IF guards; conditions that depend on
+      other conditions open a nested block
+    - actions become UPPER_SNAKE calls, clarification steps become
+      TODO(<field>) markers
+
+    render() returns None for plans it cannot express faithfully
+    (cycles, unknown ids, conditions that follow actions, dangling
+    conditions, loops); the caller falls back to the LLM.
+    """
+
+    def render(self, plan: LogicPlan) -> Optional[str]:
+        steps = {s.id: s for s in plan.steps}
+        if len(steps) != len(plan.steps):
+            return None
+
+        order = self._topological_order(plan.steps)
+        if order is None:
+            return None
+
+        conditions = {sid for sid, s in steps.items() if s.role == "condition"}
+
+        # A condition that waits on an action is sequencing, not nesting
+        for sid in conditions:
+            if any(dep not in conditions for dep in steps[sid].depends_on):
+                return None
+
+        # Every condition must guard something
+        guarding = set()
+        for s in plan.steps:
+            if s.role != "condition":
+                guarding |= self._ancestors(s.id, steps)
+        if conditions - guarding:
+            return None
+
+        lines: List[str] = []
+        open_path: List[Tuple[str, ...]] = []
+
+        for sid in order:
+            step = steps[sid]
+            if step.role == "condition":
+                continue
+
+            statement = self._statement(step)
+            if statement is None:
+                continue
+
+            path = self._guard_path(step, steps, conditions)
+
+            common = 0
+            while common < min(len(path), len(open_path)) and path[common] == open_path[common]:
+                common += 1
+            open_path = open_path[:common]
+
+            for level in path[common:]:
+                guard = self._guard(level, steps)
+                if guard is None:
+                    return None
+                lines.append(f"{INDENT * len(open_path)}IF {guard}:")
+                open_path.append(level)
+
+            lines.append(f"{INDENT * len(open_path)}{statement}")
+
+        if not lines:
+            return None
+
+        return "\n".join(lines)
+
+    # ------------------------------------------------------
+    # Graph helpers
+    # ------------------------------------------------------
+    def _topological_order(self, steps: List[LogicUnit]) -> Optional[List[str]]:
+        """Kahn's algorithm, stable with respect to plan order."""
+        ids = [s.id for s in steps]
+        known = set(ids)
+        indegree: Dict[str, int] = {sid: 0 for sid in ids}
+        children: Dict[str, List[str]] = {sid: [] for sid in ids}
+
+        for s in steps:
+            for dep in s.depends_on:
+                if dep not in known:
+                    return None
+                indegree[s.id] += 1
+                children[dep].append(s.id)
+
+        ready = [sid for sid in ids if indegree[sid] == 0]
+        order = []
+        while ready:
+            sid = ready.pop(0)
+            order.append(sid)
+            for child in children[sid]:
+                indegree[child] -= 1
+                if indegree[child] == 0:
+                    ready.append(child)
+            ready.sort(key=ids.index)
+
+        return order if len(order) == len(ids) else None
+
+    def _ancestors(self, sid: str, steps: Dict[str, LogicUnit]) -> set:
+        seen = set()
+        stack = [sid]
+        while stack:
+            cur = stack.pop()
+            if cur in seen:
+                continue
+            seen.add(cur)
+            stack.extend(steps[cur].depends_on)
+        return seen
+
+    def _guard_path(self, step: LogicUnit, steps: Dict[str, LogicUnit], conditions: set) -> List[Tuple[str, ...]]:
+        """
+        Groups every condition a statement (transitively, also through
+        the actions it follows) waits on by nesting depth: depth 0 are
+        conditions with no condition parents.
+        """
+        closure = self._ancestors(step.id, steps) & conditions
+
+        depth: Dict[str, int] = {}
+
+        def level(sid: str) -> int:
+            if sid not in depth:
+                parents = steps[sid].depends_on
+                depth[sid] = 1 + max((level(p) for p in parents), default=-1)
+            return depth[sid]
+
+        levels: Dict[int, List[str]] = {}
+        for sid in closure:
+            levels.setdefault(level(sid), []).append(sid)
+
+        ids = list(steps)
+        return [tuple(sorted(levels[d], key=ids.index)) for d in sorted(levels)]
+
+    # ------------------------------------------------------
+    # Text helpers
+    # ------------------------------------------------------
+    def _guard(self, level: Tuple[str, ...], steps: Dict[str, LogicUnit]) -> Optional[str]:
+        parts = []
+        for sid in level:
+            expr = self._condition(steps[sid])
+            if expr is None:
+                return None
+            parts.append(expr)
+        return " AND ".join(parts)
+
+    def _condition(self, step: LogicUnit) -> Optional[str]:
+        text = re.sub(r"\s+", " ", step.text).strip().rstrip(":")
+        if re.match(r"(?i)^(for each|for every|while|loop)\b", text):
+            return None
+
+        negated = bool(step.negated)
+        if text.upper().startswith("NOT "):
+            negated = True
+            text = text[4:].strip()
+
+        todo = None
+        if step.clarification_needed and step.clarification_field:
+            todo = f"TODO({step.clarification_field})"
+
+        if step.operator:
+            m = OPERATOR_PATTERN.search(text)
+            if not m and step.value and re.search(rf"(?<![\w.]){re.escape(step.value)}(?![\w.])", text):
+                # "temperature greater than 30": an unknown comparison phrase
+                # we cannot split off; the LLM renders it instead
+                return None
+            lhs = text[:m.start()].strip() if m else text
+            rhs = todo or step.value
+            if rhs is None:
+                if not m:
+                    return None
+                rhs = text[m.end():].strip()
+            expr = f"{lhs} {step.operator} {rhs}"
+        elif todo:
+            # Without an operator there is nowhere to put the placeholder
+            return None
+        else:
+            expr = text
+
+        return f"NOT {expr}" if negated else expr
+
+    def _statement(self, step: LogicUnit) -> Optional[str]:
+        todo = None
+        if step.clarification_needed and step.clarification_field:
+            todo = f"TODO({step.clarification_field})"
+
+        if step.role == "note":
+            # plain notes are commentary and never reach the pseudocode
+            return todo
+
+        call = self._call(step.text)
+        if todo:
+            name, args = call[:-1].split("(", 1)
+            call = f"{name}({', '.join(a for a in (args, todo) if a)})"
+        return call
+
+    def _call(self, text: str) -> str:
+        text = re.sub(r"\s+", " ", text).strip().rstrip(".")
+
+        m = _CALL.match(text)
+        if m:
+            return f"{m.group(1)}({m.group(2)})"
+
+        m = _VERB_ARG.match(text)
+        if m and m.group(1) in _KNOWN_VERBS:
+            return f"{m.group(1)}({m.group(2)})"
+
+        arg = ""
+        m = _TRAILING_ARG.match(text)
+        if m:
+            text, arg = m.group("head"), m.group("arg")
+
+        words = [
+            re.sub(r"[^A-Za-z0-9]", "", w)
+            for w in text.split()
+            if w.lower() not in _ARTICLES
+        ]
+        name = "_".join(w.upper() for w in words if w) or "ACTION"
+        return f"{name}({arg})"
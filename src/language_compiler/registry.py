@@ -0,0 +1,65 @@
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+
+class ModelRegistry:
+    """
+    Process-wide store of loaded models (tokenizers, causal LMs, sentence
+    embedders).
+
+    Components ask the registry for their weights on first use, so each
+    model is loaded at most once per process and shared by every
+    LMProvider, SemanticPreprocessor and SemanticScorer that needs it.
+    Concurrent requests for the same key wait for a single load.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._models: Dict[Hashable, Any] = {}
+        self._key_locks: Dict[Hashable, threading.Lock] = {}
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        with self._lock:
+            if key in self._models:
+                return self._models[key]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                if key in self._models:
+                    return self._models[key]
+
+            value = loader()
+
+            with self._lock:
+                self._models[key] = value
+
+        return value
+
+    def sentence_embedder(self, model_name: str = "all-MiniLM-L6-v2", backend: str = "torch"):
+        def load():
+            if backend == "onnx":
+                from .onnx_backend import OnnxSentenceEmbedder
+                return OnnxSentenceEmbedder(model_name)
+
+            from sentence_transformers import SentenceTransformer
+            return SentenceTransformer(model_name)
+
+        return self.get_or_load(("sentence_embedder", model_name, backend), load)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._models
+
+    def clear(self) -> None:
+        with self._lock:
+            self._models.clear()
+            self._key_locks.clear()
+
+
+_DEFAULT_REGISTRY = ModelRegistry()
+
+
+def get_registry() -> ModelRegistry:
+    """Returns the registry shared by the whole process."""
+    return _DEFAULT_REGISTRY
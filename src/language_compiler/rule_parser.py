@@ -0,0 +1,191 @@
+import re
+from typing import Callable, Dict, Optional
+
+from .schemas import LogicUnit, LogicPlan
+
+
+# ------------------------------------------------------
+# Comparison phrases → operators
+# (longer phrases first so "at least" wins over "is")
+# ------------------------------------------------------
+OPERATOR_PHRASES = {
+    "is greater than or equal to": ">=",
+    "is at least": ">=",
+    ">=": ">=",
+    "is less than or equal to": "<=",
+    "is at most": "<=",
+    "<=": "<=",
+    "exceeds": ">",
+    "is above": ">",
+    "is over": ">",
+    "goes above": ">",
+    "goes over": ">",
+    "rises above": ">",
+    "is greater than": ">",
+    "is more than": ">",
+    "is higher than": ">",
+    ">": ">",
+    "is below": "<",
+    "is under": "<",
+    "goes below": "<",
+    "drops below": "<",
+    "falls below": "<",
+    "is less than": "<",
+    "is lower than": "<",
+    "<": "<",
+    "is equal to": "==",
+    "equals": "==",
+    "==": "==",
+}
+
+_OPS = "|".join(
+    re.escape(p).replace(r"\ ", r"\s+")
+    for p in sorted(OPERATOR_PHRASES, key=len, reverse=True)
+)
+OPERATOR_PATTERN = re.compile(rf"\s*(?:{_OPS})\s*", re.I)
+
+_NUMBER = r"-?\d+(?:\.\d+)?"
+_UNIT = r"(?:\s*(?:%|percent|degrees?(?:\s+(?:celsius|fahrenheit))?|°\s*[cf]?))?"
+_TRIGGER = r"(?:if|when|whenever|once|as\s+soon\s+as)"
+
+_THRESHOLD_CLAUSE = (
+    rf"(?P<metric>[a-z][a-z \-]*?)\s+(?P<op>{_OPS})\s+(?P<value>{_NUMBER}){_UNIT}"
+)
+
+THRESHOLD_PATTERNS = [
+    # The value must be followed by "," or "then": anything else after it
+    # ("at night", "for ten minutes") qualifies the condition
+    re.compile(rf"^{_TRIGGER}\s+{_THRESHOLD_CLAUSE}\s*(?:,\s*(?:then\s+)?|\s+then\s+)(?P<action>.+)$", re.I),
+    re.compile(rf"^(?P<action>.+?)\s*,?\s+{_TRIGGER}\s+{_THRESHOLD_CLAUSE}$", re.I),
+]
+
+EVENT_PATTERNS = [
+    re.compile(rf"^{_TRIGGER}\s+(?P<event>[^,]+?)\s*,\s*(?:then\s+)?(?P<action>.+)$", re.I),
+    re.compile(r"^(?P<action>[^,]+?)\s*,?\s+(?:when|whenever|once|as\s+soon\s+as)\s+(?P<event>.+)$", re.I),
+]
+
+UNLESS_PATTERNS = [
+    re.compile(r"^unless\s+(?P<condition>[^,]+?)\s*,\s*(?:then\s+)?(?P<action>.+)$", re.I),
+    re.compile(r"^(?P<action>.+?)\s*,?\s+unless\s+(?P<condition>.+)$", re.I),
+]
+
+# A slot containing any of these is a compound clause → leave it to the LLM
+_COMPOUND = re.compile(
+    r"\b(and|or|but|unless|otherwise|else|if|when|whenever|then|except)\b|[;:,]", re.I
+)
+
+# Timing qualifiers change the condition, which the shapes cannot express
+_TIMING = re.compile(
+    r"\b(for|during|after|before|until|while|within|every|at\s+(?:night|noon|midnight)|tonight|"
+    r"in\s+the\s+(?:morning|afternoon|evening)|daily|hourly|weekly|"
+    r"(?:seconds?|minutes?|hours?|days?|weeks?))\b",
+    re.I
+)
+
+# "Do not water the garden ..." has no rendering as a plain call
+_NEGATED_ACTION = re.compile(r"^(?:do\s+not|don['’]?t|never|not)\b", re.I)
+
+# "pressure never exceeds 5" is not "pressure > 5"
+_NEGATED_METRIC = re.compile(
+    r"\b(?:never|not|no|no\s+longer|doesn['’]?t|does\s+not|isn['’]?t|is\s+not)\b", re.I
+)
+
+
+def _clean(part: str) -> str:
+    return re.sub(r"\s+", " ", part).strip(" ,.!")
+
+
+def _simple(*parts: str) -> bool:
+    return all(p and not _COMPOUND.search(p) and not _TIMING.search(p) for p in parts)
+
+
+def _plain_action(action: str) -> bool:
+    return not _NEGATED_ACTION.match(action)
+
+
+class RuleBasedParser:
+    """
+    Deterministic LogicPlan builder for the shapes in INTENT_TEMPLATES:
+
+        threshold_action   "If humidity is greater than 70, dehumidify the room."
+        event_action       "When the door opens, turn on the hallway light."
+        unless_negation    "Water the garden unless it is raining."
+
+    Returns None whenever the instruction does not fit the matched
+    shape exactly; the caller then falls back to the LLM.
+    """
+
+    def __init__(self):
+        self._parsers: Dict[str, Callable[[str], Optional[LogicPlan]]] = {
+            "threshold_action": self._threshold_action,
+            "event_action": self._event_action,
+            "unless_negation": self._unless_negation,
+        }
+
+    def parse(self, instruction: str, intent: Optional[str]) -> Optional[LogicPlan]:
+        parser = self._parsers.get(intent)
+        if parser is None:
+            return None
+        return parser(instruction.strip().rstrip(".!").strip())
+
+    # ------------------------------------------------------
+    # Shapes
+    # ------------------------------------------------------
+    def _threshold_action(self, text: str) -> Optional[LogicPlan]:
+        for pattern in THRESHOLD_PATTERNS:
+            m = pattern.match(text)
+            if not m:
+                continue
+
+            metric = re.sub(r"(?i)^the\s+", "", _clean(m.group("metric")))
+            action = _clean(m.group("action"))
+            if not _simple(metric, action) or not _plain_action(action) or re.search(r"\d", action):
+                continue
+            if _NEGATED_METRIC.search(metric):
+                continue
+
+            op = OPERATOR_PHRASES[re.sub(r"\s+", " ", m.group("op").lower())]
+            value = m.group("value")
+
+            return LogicPlan(steps=[
+                LogicUnit(id="S1", role="condition", text=f"{metric} {op} {value}", operator=op, value=value),
+                LogicUnit(id="S2", role="action", text=action, depends_on=["S1"]),
+            ])
+
+        return None
+
+    def _event_action(self, text: str) -> Optional[LogicPlan]:
+        for pattern in EVENT_PATTERNS:
+            m = pattern.match(text)
+            if not m:
+                continue
+
+            event = _clean(m.group("event"))
+            action = _clean(m.group("action"))
+            if not _simple(event, action) or not _plain_action(action) or re.search(r"\d", event):
+                continue
+
+            return LogicPlan(steps=[
+                LogicUnit(id="S1", role="condition", text=event),
+                LogicUnit(id="S2", role="action", text=action, depends_on=["S1"]),
+            ])
+
+        return None
+
+    def _unless_negation(self, text: str) -> Optional[LogicPlan]:
+        for pattern in UNLESS_PATTERNS:
+            m = pattern.match(text)
+            if not m:
+                continue
+
+            condition = _clean(m.group("condition"))
+            action = _clean(m.group("action"))
+            if not _simple(condition, action) or not _plain_action(action):
+                continue
+
+            return LogicPlan(steps=[
+                LogicUnit(id="S1", role="condition", text=condition, negated=True),
+                LogicUnit(id="S2", role="action", text=action, depends_on=["S1"]),
+            ])
+
+        return None
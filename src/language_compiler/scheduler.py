@@ -0,0 +1,122 @@
+import asyncio
+import functools
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Set, Tuple
+
+from .lm_provider import LMProvider
+
+
+class MicroBatchScheduler:
+    """
+    Collects concurrent completion requests and runs them as batched
+    generate() calls, for async callers such as LanguageCompiler.acompile().
+
+    - Requests are grouped by (stage, max_tokens), since one batched
+      generate() call shares both
+    - A group is flushed when it reaches `max_batch_size` prompts or
+      `max_wait` seconds after its first prompt arrived, whichever
+      comes first (`max_wait` is the latency added in the worst case)
+    - Identical prompts that are already queued or running share one
+      generation
+    - Batches run on a single worker thread, so the event loop never
+      blocks and the model only runs one batch at a time
+    """
+
+    def __init__(
+        self,
+        lm: LMProvider,
+        max_batch_size: int = 8,
+        max_wait: float = 0.01,
+        executor: Optional[Executor] = None
+    ):
+        self.lm = lm
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.executor = executor or ThreadPoolExecutor(max_workers=1, thread_name_prefix="lm-batch")
+
+        self.stats = {"requests": 0, "deduplicated": 0, "batches": 0, "batched_prompts": 0}
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._reset()
+
+    def _reset(self) -> None:
+        self._queues: Dict[Tuple, List[str]] = {}
+        self._timers: Dict[Tuple, asyncio.TimerHandle] = {}
+        self._inflight: Dict[Tuple, asyncio.Future] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def complete(self, prompt: str, max_tokens: int = 256, stage: Optional[str] = None) -> str:
+        """
+        Async counterpart of LMProvider.complete(); resolves once the
+        batch containing this prompt has been generated.
+        """
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # Futures and timers belong to one event loop
+            self._loop = loop
+            self._reset()
+
+        self.stats["requests"] += 1
+        group = (stage, max_tokens)
+        key = (stage, max_tokens, prompt)
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self.stats["deduplicated"] += 1
+        else:
+            future = loop.create_future()
+            self._inflight[key] = future
+
+            queue = self._queues.setdefault(group, [])
+            queue.append(prompt)
+
+            if len(queue) >= self.max_batch_size:
+                self._flush(group)
+            elif group not in self._timers:
+                self._timers[group] = loop.call_later(self.max_wait, self._flush, group)
+
+        # A cancelled caller must not cancel the generation other
+        # callers are waiting on.
+        return await asyncio.shield(future)
+
+    def _flush(self, group: Tuple) -> None:
+        timer = self._timers.pop(group, None)
+        if timer is not None:
+            timer.cancel()
+
+        prompts = self._queues.pop(group, [])
+        if not prompts:
+            return
+
+        task = self._loop.create_task(self._run(group, prompts))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, group: Tuple, prompts: List[str]) -> None:
+        stage, max_tokens = group
+
+        self.stats["batches"] += 1
+        self.stats["batched_prompts"] += len(prompts)
+
+        try:
+            outputs = await self._loop.run_in_executor(
+                self.executor,
+                functools.partial(
+                    self.lm.complete_batch,
+                    prompts,
+                    max_tokens=max_tokens,
+                    batch_size=self.max_batch_size,
+                    stage=stage
+                )
+            )
+        except Exception as e:
+            for prompt in prompts:
+                future = self._inflight.pop((stage, max_tokens, prompt))
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for prompt, output in zip(prompts, outputs):
+            future = self._inflight.pop((stage, max_tokens, prompt))
+            if not future.done():
+                future.set_result(output)
@@ -1,40 +1,80 @@
-from typing import List, Optional, Literal
-from pydantic import BaseModel, Field
-
-Role = Literal["condition", "action", "note"]
-
-class LogicUnit(BaseModel):
-    id: str
-    role: Role
-    text: str
-
-    depends_on: List[str] = Field(default_factory=list)
-
-    operator: Optional[str] = None
-    value: Optional[str] = None
-    negated: Optional[bool] = False
-
-    clarification_needed: Optional[bool] = False
-    clarification_field: Optional[str] = None
-
-
-class LogicPlan(BaseModel):
-    steps: List[LogicUnit]
-
-
-class PseudocodeBlock(BaseModel):
-    language: str = "pseudocode"
-    code: str
-    missing_clarifications: Optional[List[str]] = None
-
-
-class CodeBlock(BaseModel):
-    language: str = "python"
-    code: str
-
-
-class CompilerOutput(BaseModel):
-    reasoning: LogicPlan
-    pseudocode: PseudocodeBlock
-    code: Optional[CodeBlock] = None
-    clarifications_needed: Optional[List[str]] = None
+from typing import List, Optional, Literal
+from pydantic import BaseModel, Field
+
+Role = Literal["condition", "action", "note"]
+
+class LogicUnit(BaseModel):
+    id: str
+    role: Role
+    text: str
+
+    depends_on: List[str] = Field(default_factory=list)
+
+    operator: Optional[str] = None
+    value: Optional[str] = None
+    negated: Optional[bool] = False
+
+    clarification_needed: Optional[bool] = False
+    clarification_field: Optional[str] = None
+
+
+class LogicPlan(BaseModel):
+    steps: List[LogicUnit]
+
+
+class PseudocodeBlock(BaseModel):
+    language: str = "pseudocode"
+    code: str
+    missing_clarifications: Optional[List[str]] = None
+
+
+class CodeBlock(BaseModel):
+    language: str = "python"
+    code: str
+
+
+class StageMetrics(BaseModel):
+    stage: str
+    wall_s: float
+    lm_calls: int = 0
+    prompt_tokens: int = 0
+    generated_tokens: int = 0
+    tokens_per_s: Optional[float] = None
+    cache_hits: int = 0
+    source: Optional[str] = None  # "rules", "clarification", "renderer", "llm"
+    repaired: bool = False
+
+
+class CompileMetrics(BaseModel):
+    wall_s: float
+    stages: List[StageMetrics]
+    repaired: bool = False  # code needed the second-pass repair prompt
+    fallback: bool = False  # pseudocode came from the LLM, not the renderer
+
+
+class CompilerOutput(BaseModel):
+    reasoning: LogicPlan
+    pseudocode: PseudocodeBlock
+    code: Optional[CodeBlock] = None
+    clarifications_needed: Optional[List[str]] = None
+    metrics: Optional[CompileMetrics] = None
+
+
+EventKind = Literal[
+    "plan",              # LogicPlan is ready
+    "pseudocode_token",  # streamed pseudocode text chunk
+    "pseudocode",        # final PseudocodeBlock
+    "clarifications",    # missing clarification fields (interactive mode)
+    "code_token",        # streamed Python text chunk
+    "code",              # final CodeBlock
+    "done",              # complete CompilerOutput
+]
+
+class CompileEvent(BaseModel):
+    kind: EventKind
+    text: Optional[str] = None
+    plan: Optional[LogicPlan] = None
+    pseudocode: Optional[PseudocodeBlock] = None
+    clarifications: Optional[List[str]] = None
+    code: Optional[CodeBlock] = None
+    output: Optional[CompilerOutput] = None
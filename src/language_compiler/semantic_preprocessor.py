@@ -1,111 +1,240 @@
-# src/language_compiler/semantic_preprocessor.py
-
-import re
-from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple
-
-from .intent_templates import INTENT_TEMPLATES
-
-try:
-    from sentence_transformers import SentenceTransformer, util
-except Exception:
-    SentenceTransformer = None
-    util = None
-
-
-@dataclass
-class SemanticResult:
-    normalized_instruction: str
-    matched_intent: Optional[str]
-    similarity: float
-    missing_slots: List[str]
-
-
-class SemanticPreprocessor:
-    """
-    Maps raw instructions onto a small template library using embeddings.
-    Does NOT invent thresholds. Only normalizes structure and surfaces missing slots.
-    """
-
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2", min_similarity: float = 0.72):
-        if SentenceTransformer is None:
-            raise ImportError(
-                "sentence-transformers is required. Install with: pip install sentence-transformers"
-            )
-        self.embedder = SentenceTransformer(model_name)
-        self.min_similarity = min_similarity
-
-        # Build flattened example index
-        self._example_texts: List[str] = []
-        self._example_to_template: List[Dict] = []
-        for t in INTENT_TEMPLATES:
-            for ex in t["examples"]:
-                self._example_texts.append(ex)
-                self._example_to_template.append(t)
-
-        self._example_embs = self.embedder.encode(self._example_texts, convert_to_tensor=True)
-
-    def normalize(self, instruction: str) -> SemanticResult:
-        # Embed and retrieve best matching template example
-        q = self.embedder.encode(instruction, convert_to_tensor=True)
-        sims = util.cos_sim(q, self._example_embs)[0]
-        best_idx = int(sims.argmax())
-        best_score = float(sims[best_idx])
-        template = self._example_to_template[best_idx]
-
-        # If similarity too low, leave instruction unchanged
-        if best_score < self.min_similarity:
-            return SemanticResult(
-                normalized_instruction=instruction,
-                matched_intent=None,
-                similarity=best_score,
-                missing_slots=[]
-            )
-
-        # Light normalization: standardize spacing/casing; do NOT change meaning.
-        normalized = self._light_normalize(instruction)
-
-        # Detect missing slots (heuristic: vague phrases & missing numbers where expected)
-        missing_slots = self._infer_missing_slots(normalized, template)
-
-        # If missing slots exist, return canonical form to constrain downstream parsing
-        if missing_slots:
-            normalized = template["canonical_form"]
-
-        return SemanticResult(
-            normalized_instruction=normalized,
-            matched_intent=template["name"],
-            similarity=best_score,
-            missing_slots=missing_slots
-        )
-
-    def _light_normalize(self, text: str) -> str:
-        t = text.strip()
-        t = re.sub(r"\s+", " ", t)
-        return t
-
-    def _infer_missing_slots(self, text: str, template: Dict) -> List[str]:
-        t = text.lower()
-
-        # If canonical expects threshold/operator, try to detect numeric comparison presence
-        missing = []
-
-        vague = ["too long", "after a while", "a bit", "quickly", "soon", "busy", "overloaded", "high", "low"]
-        if any(v in t for v in vague):
-            # vague language usually implies missing threshold/operator
-            if "threshold" in template.get("slots", []):
-                missing.append("threshold")
-            if "operator" in template.get("slots", []):
-                missing.append("operator")
-
-        # numeric detection
-        has_number = re.search(r"\d+(\.\d+)?", t) is not None
-        if "threshold" in template.get("slots", []) and not has_number:
-            missing.append("threshold")
-
-        # crude action detection: presence of common verbs
-        if "action" in template.get("slots", []):
-            if not re.search(r"\b(turn on|turn off|open|close|notify|send|set|activate|deactivate|lock|unlock|start|stop)\b", t):
-                missing.append("action")
-
-        return sorted(set(missing))
+# src/language_compiler/semantic_preprocessor.py
+
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from .embedding_cache import DEFAULT_EMBEDDING_DIR, QueryCache, embedding_path, load_or_build
+from .intent_templates import INTENT_TEMPLATES
+from .phrase_scanner import scan
+from .registry import ModelRegistry, get_registry
+from .template_index import TemplateIndex, load_or_build_index, make_index, normalize_rows
+
+try:
+    from sentence_transformers import SentenceTransformer
+except Exception:
+    SentenceTransformer = None
+
+
+@dataclass
+class SemanticResult:
+    normalized_instruction: str
+    matched_intent: Optional[str]
+    similarity: float
+    missing_slots: List[str]
+    # (intent name, similarity) of the best templates, best first
+    top_matches: List[Tuple[str, float]] = field(default_factory=list)
+
+
+SLOT_COLUMNS = ["action", "operator", "threshold"]  # sorted, like the reported missing_slots
+
+
+class SemanticPreprocessor:
+    """
+    Maps raw instructions onto a small template library using embeddings.
+    Does NOT invent thresholds. Only normalizes structure and surfaces missing slots.
+
+    backend="onnx" embeds with ONNX Runtime instead of sentence-transformers.
+
+    Example embeddings are persisted unit-length under `embedding_dir`
+    (keyed by embedder and template-library hash) and memory-mapped on
+    load, and so is a built IVF index; query embeddings are kept in an
+    LRU of `query_cache_size` entries.
+
+    `templates` replaces the built-in library (see load_templates());
+    `index` is "auto", "brute", "ivf" or a TemplateIndex instance.
+    `embedder` (anything with SentenceTransformer's encode()) replaces
+    the registry's model; `model_name` then only keys the embedding files.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "all-MiniLM-L6-v2",
+        min_similarity: float = 0.72,
+        registry: Optional[ModelRegistry] = None,
+        backend: str = "torch",
+        embedding_dir: Optional[str] = DEFAULT_EMBEDDING_DIR,
+        query_cache_size: int = 1024,
+        templates: Optional[List[Dict]] = None,
+        index: Union[str, TemplateIndex] = "auto",
+        embedder=None
+    ):
+        if embedder is None and backend == "torch" and SentenceTransformer is None:
+            raise ImportError(
+                "sentence-transformers is required. Install with: pip install sentence-transformers"
+            )
+        self.model_name = model_name
+        self.min_similarity = min_similarity
+        self.registry = registry or get_registry()
+        self.backend = backend
+        self.embedding_dir = embedding_dir
+        self.query_cache = QueryCache(query_cache_size)
+
+        # Build flattened example index
+        self._templates: List[Dict] = list(INTENT_TEMPLATES if templates is None else templates)
+        self._example_texts: List[str] = []
+        example_template: List[int] = []
+        for i, t in enumerate(self._templates):
+            self._example_texts.extend(t["examples"])
+            example_template.extend([i] * len(t["examples"]))
+        self._example_template = np.array(example_template, dtype=np.int64)
+
+        # Which of SLOT_COLUMNS each template expects
+        self._template_slots = np.array(
+            [[slot in t.get("slots", []) for slot in SLOT_COLUMNS] for t in self._templates],
+            dtype=bool
+        )
+
+        # Embedder, example embeddings and the index are built on first use
+        self._embedder = embedder
+        self._example_embs = None
+        self._index_kind = index
+        self._index: Optional[TemplateIndex] = None
+
+    @property
+    def embedder(self):
+        if self._embedder is None:
+            self._embedder = self.registry.sentence_embedder(self.model_name, backend=self.backend)
+        return self._embedder
+
+    @property
+    def _embedding_key(self) -> str:
+        # "unit": rows are stored L2-normalized, so indexes use them as is
+        return f"{self.model_name}-{self.backend}-unit"
+
+    @property
+    def example_embeddings(self):
+        if self._example_embs is None:
+            self._example_embs = load_or_build(
+                self._embedding_key,
+                self._example_texts,
+                lambda texts: normalize_rows(self.embedder.encode(texts, convert_to_numpy=True)),
+                cache_dir=self.embedding_dir
+            )
+        return self._example_embs
+
+    @property
+    def index(self) -> TemplateIndex:
+        if self._index is None:
+            kind = self._index_kind
+            index = kind if isinstance(kind, TemplateIndex) else make_index(kind, len(self._example_texts))
+
+            prefix = None
+            if self.embedding_dir is not None:
+                prefix = embedding_path(self._embedding_key, self._example_texts, self.embedding_dir)[:-len(".npy")]
+            self._index = load_or_build_index(index, self.example_embeddings, prefix, normalized=True)
+        return self._index
+
+    def embed_query(self, text: str):
+        return self.embed_queries([text])[0]
+
+    def embed_queries(self, texts: List[str]) -> np.ndarray:
+        """Query embeddings; texts missing from the LRU share one encode() call."""
+        cached = [self.query_cache.get(t) for t in texts]
+        missing = list(dict.fromkeys(t for t, q in zip(texts, cached) if q is None))
+
+        if missing:
+            encoded = dict(zip(missing, self.embedder.encode(missing, convert_to_numpy=True)))
+            for t, q in encoded.items():
+                self.query_cache.put(t, q)
+            cached = [q if q is not None else encoded[t] for t, q in zip(texts, cached)]
+
+        return np.stack(cached) if cached else np.zeros((0, 0), dtype=np.float32)
+
+    def normalize(self, instruction: str) -> SemanticResult:
+        return self.normalize_batch([instruction])[0]
+
+    def normalize_batch(self, instructions: List[str], top_k: int = 3) -> List[SemanticResult]:
+        """
+        normalize() for many instructions at once: one encode() call for
+        the uncached queries, one batched index search, and slot
+        inference as boolean array operations over the batch. Each
+        result lists its `top_k` best templates in `top_matches`.
+        """
+        if not instructions:
+            return []
+
+        # Nearest examples per query; a template scores its best example.
+        # Examples cluster by template, so fetch a few per wanted template.
+        k = min(top_k, len(self._templates))
+        scores, ids = self.index.search(self.embed_queries(instructions), max(4 * k, 16))
+
+        top_matches = []
+        for row_scores, row_ids in zip(scores, ids):
+            matches = {}
+            for score, idx in zip(row_scores, row_ids):
+                if idx < 0:
+                    break
+                matches.setdefault(int(self._example_template[idx]), float(score))
+                if len(matches) == max(k, 1):
+                    break
+            top_matches.append(list(matches.items()))
+
+        best = np.array([m[0][0] if m else -1 for m in top_matches], dtype=np.int64)
+        best_scores = np.array([m[0][1] if m else 0.0 for m in top_matches])
+        matched = (best >= 0) & (best_scores >= self.min_similarity)
+
+        # Light normalization: standardize spacing/casing; do NOT change meaning.
+        normalized = [self._light_normalize(i) for i in instructions]
+
+        # Detect missing slots (heuristic: vague phrases & missing numbers where expected)
+        missing = self._infer_missing_slots_batch(normalized, np.maximum(best, 0)) & matched[:, None]
+
+        results = []
+        for row, instruction in enumerate(instructions):
+            score = float(best_scores[row])
+            names = [(self._templates[t]["name"], s) for t, s in top_matches[row][:k]]
+
+            # If similarity too low, leave instruction unchanged
+            if not matched[row]:
+                results.append(SemanticResult(
+                    normalized_instruction=instruction,
+                    matched_intent=None,
+                    similarity=score,
+                    missing_slots=[],
+                    top_matches=names
+                ))
+                continue
+
+            template = self._templates[best[row]]
+            missing_slots = [slot for slot, flag in zip(SLOT_COLUMNS, missing[row]) if flag]
+
+            # If missing slots exist, return canonical form to constrain downstream parsing
+            results.append(SemanticResult(
+                normalized_instruction=template["canonical_form"] if missing_slots else normalized[row],
+                matched_intent=template["name"],
+                similarity=score,
+                missing_slots=missing_slots,
+                top_matches=names
+            ))
+
+        return results
+
+    def _light_normalize(self, text: str) -> str:
+        t = text.strip()
+        t = re.sub(r"\s+", " ", t)
+        return t
+
+    def _slot_features(self, texts: List[str]) -> np.ndarray:
+        """(n, 3) booleans per text: vague wording, no number, no action verb."""
+        rows = []
+        for text in texts:
+            kinds = {hit.kind for hit in scan(text)}
+            rows.append(("vague" in kinds, "number" not in kinds, "verb" not in kinds))
+        return np.array(rows, dtype=bool).reshape(len(texts), 3)
+
+    def _infer_missing_slots_batch(self, texts: List[str], template_idx: np.ndarray) -> np.ndarray:
+        """(n, len(SLOT_COLUMNS)) booleans: slot expected by the matched template but missing."""
+        vague, no_number, no_action = self._slot_features(texts).T
+        slots = self._template_slots[template_idx]
+
+        missing = np.zeros_like(slots)
+        # vague language usually implies missing threshold/operator
+        missing[:, SLOT_COLUMNS.index("operator")] = vague
+        missing[:, SLOT_COLUMNS.index("threshold")] = vague | no_number
+        # crude action detection: presence of common verbs
+        missing[:, SLOT_COLUMNS.index("action")] = no_action
+
+        return missing & slots
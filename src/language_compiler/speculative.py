@@ -0,0 +1,299 @@
+"""
+Greedy speculative decoding for a single sequence.
+
+A Proposer guesses the next few tokens cheaply; the target model checks
+all of them in one forward pass and keeps the longest prefix that
+matches its own argmax, plus the token it would have produced at the
+first mismatch. Every kept token is the target's greedy choice, so the
+output is identical to plain greedy decoding with the target alone.
+
+Proposers:
+- DraftModelProposer: a smaller LM. If its vocabulary differs from the
+  target's (e.g. Qwen drafting for Phi), draft tokens are bridged
+  through text and re-tokenized with the target tokenizer.
+- PromptLookupProposer: no model at all; copies the tokens that followed
+  the latest occurrence of the current n-gram, which suits stages that
+  mostly copy identifiers and conditions from their prompt.
+"""
+
+import time
+from typing import Dict, Iterable, List, Optional, Union
+
+import torch
+from transformers import DynamicCache
+
+
+# ============================================================
+# KV-cache helpers (legacy tuples and Cache objects)
+# ============================================================
+
+def new_cache(model):
+    """Empty KV-cache in the format `model` expects, or None for legacy tuples."""
+    return DynamicCache() if getattr(model, "_supports_cache_class", False) else None
+
+
+def crop_cache(past, length: int):
+    """Keeps the first `length` positions of a KV-cache."""
+    if past is None:
+        return None
+    if hasattr(past, "crop"):
+        past.crop(length)
+        return past
+    return tuple(tuple(t[:, :, :length] for t in layer) for layer in past)
+
+
+def cache_length(past) -> int:
+    if past is None:
+        return 0
+    if hasattr(past, "get_seq_length"):
+        return past.get_seq_length()
+    return past[0][0].shape[2]
+
+
+def tokenizers_compatible(a, b) -> bool:
+    """True when token ids mean the same thing in both tokenizers."""
+    return a is b or a.get_vocab() == b.get_vocab()
+
+
+def _common_prefix(a: List[int], b: List[int]) -> int:
+    n = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        n += 1
+    return n
+
+
+# ============================================================
+# Proposers
+# ============================================================
+
+class Proposer:
+    """Guesses up to k next tokens (target vocabulary) for a sequence."""
+
+    name = "proposer"
+
+    def start(self, prompt_ids: List[int]) -> None:
+        """Called once per generation, before the first propose()."""
+
+    def propose(self, ids: List[int], k: int) -> List[int]:
+        raise NotImplementedError
+
+
+class DraftModelProposer(Proposer):
+    """
+    Greedy continuation from a smaller causal LM. The draft keeps its
+    own KV-cache between rounds and only re-feeds the tokens that
+    changed since the last proposal.
+    """
+
+    name = "draft_model"
+
+    def __init__(self, model, tokenizer, target_tokenizer, same_vocab: Optional[bool] = None):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.target_tokenizer = target_tokenizer
+        if same_vocab is None:
+            same_vocab = tokenizers_compatible(tokenizer, target_tokenizer)
+        self.same_vocab = same_vocab
+
+        self._ids: List[int] = []
+        self._past = None
+
+    def start(self, prompt_ids: List[int]) -> None:
+        self._ids = []
+        self._past = None
+
+    def propose(self, ids: List[int], k: int) -> List[int]:
+        if self.same_vocab:
+            draft_ids = list(ids)
+        else:
+            text = self.target_tokenizer.decode(ids, skip_special_tokens=False)
+            draft_ids = self.tokenizer(text, add_special_tokens=False)["input_ids"]
+        if not draft_ids:
+            return []
+
+        # Reuse the draft KV-cache for the unchanged prefix; at least one
+        # token has to be fed to get fresh logits.
+        keep = min(_common_prefix(self._ids, draft_ids), len(draft_ids) - 1)
+        past = crop_cache(self._past, keep) if keep else new_cache(self.model)
+        feed = draft_ids[keep:]
+
+        eos = self.tokenizer.eos_token_id
+        new: List[int] = []
+        with torch.no_grad():
+            for _ in range(k):
+                out = self.model(
+                    torch.tensor([feed], device=self.model.device),
+                    past_key_values=past,
+                    use_cache=True
+                )
+                past = out.past_key_values
+                token = int(out.logits[0, -1].argmax())
+                new.append(token)
+                feed = [token]
+                if token == eos:
+                    break
+
+        # The last proposed token has not been fed to the draft yet
+        self._ids = draft_ids + new[:-1]
+        self._past = past
+
+        if self.same_vocab:
+            return new
+
+        text = self.tokenizer.decode(new, skip_special_tokens=True)
+        return self.target_tokenizer(text, add_special_tokens=False)["input_ids"]
+
+
+class PromptLookupProposer(Proposer):
+    """
+    N-gram prompt lookup: finds the most recent earlier occurrence of the
+    sequence's last `max_ngram` tokens (falling back to shorter n-grams
+    down to `min_ngram`) and proposes the tokens that followed it.
+    """
+
+    name = "prompt_lookup"
+
+    def __init__(self, max_ngram: int = 3, min_ngram: int = 1):
+        self.max_ngram = max_ngram
+        self.min_ngram = min_ngram
+
+    def propose(self, ids: List[int], k: int) -> List[int]:
+        for n in range(min(self.max_ngram, len(ids) - 1), self.min_ngram - 1, -1):
+            tail = ids[-n:]
+            # Latest match first; the match must leave room for a continuation
+            for start in range(len(ids) - n - 1, -1, -1):
+                if ids[start:start + n] == tail:
+                    follow = ids[start + n:start + n + k]
+                    if follow:
+                        return follow
+        return []
+
+
+# ============================================================
+# Verification loop
+# ============================================================
+
+class SpeculationStats:
+    """Per-call counters, merged into LMProvider's per-stage report."""
+
+    def __init__(self):
+        self.proposed = 0
+        self.accepted = 0
+        self.target_passes = 0
+        self.generated = 0
+        self.seconds = 0.0
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "proposed": self.proposed,
+            "accepted": self.accepted,
+            "target_passes": self.target_passes,
+            "generated_tokens": self.generated,
+            "seconds": self.seconds,
+        }
+
+
+def speculative_generate(
+    model,
+    input_ids: torch.LongTensor,
+    proposer: Proposer,
+    max_new_tokens: int,
+    eos_token_id: Optional[Union[int, Iterable[int]]] = None,
+    stopper=None,
+    streamer=None,
+    num_speculative_tokens: int = 5,
+    past_key_values=None,
+    stats: Optional[SpeculationStats] = None
+) -> torch.LongTensor:
+    """
+    Greedy generation of one sequence (batch size 1) with speculation.
+    Returns prompt + generated ids, like model.generate().
+
+    `past_key_values` may hold a KV-cache for a prefix of `input_ids`
+    (e.g. a prefilled prompt template). `stopper` is a StructuralStop and
+    is fed one token at a time, so stopping matches generate() exactly.
+    """
+    stats = stats or SpeculationStats()
+    started = time.perf_counter()
+
+    if eos_token_id is None:
+        eos = set()
+    elif isinstance(eos_token_id, int):
+        eos = {eos_token_id}
+    else:
+        eos = set(eos_token_id)
+
+    ids = input_ids[0].tolist()
+    prompt_length = len(ids)
+    proposer.start(ids)
+
+    if streamer is not None:
+        streamer.put(input_ids.cpu())
+
+    def emit(token: int) -> bool:
+        """Appends one token; True when generation ends after it."""
+        ids.append(token)
+        stats.generated += 1
+        if streamer is not None:
+            streamer.put(torch.tensor([token]))
+
+        return (
+            token in eos
+            or len(ids) - prompt_length >= max_new_tokens
+            or (stopper is not None and bool(stopper(torch.tensor([ids]), None)[0]))
+        )
+
+    past = past_key_values if past_key_values is not None else new_cache(model)
+    feed = ids[cache_length(past):]
+
+    with torch.no_grad():
+        # Prefill: logits for the first new token
+        out = model(torch.tensor([feed], device=model.device), past_key_values=past, use_cache=True)
+        past = out.past_key_values
+        stats.target_passes += 1
+        pending = int(out.logits[0, -1].argmax())
+
+        # `pending` is the target's next token; it is not in the cache yet
+        while not emit(pending):
+            budget = min(num_speculative_tokens, max_new_tokens - (len(ids) - prompt_length))
+            proposal = proposer.propose(ids, budget)[:budget]
+            stats.proposed += len(proposal)
+
+            out = model(
+                torch.tensor([[pending] + proposal], device=model.device),
+                past_key_values=past,
+                use_cache=True
+            )
+            past = out.past_key_values
+            stats.target_passes += 1
+            greedy = out.logits[0].argmax(dim=-1).tolist()
+
+            accepted = 0
+            for token, choice in zip(proposal, greedy):
+                if token != choice:
+                    break
+                accepted += 1
+            stats.accepted += accepted
+
+            # Accepted tokens are emitted one by one so EOS, max_new_tokens
+            # and the stopper cut exactly where plain decoding would.
+            done = False
+            for token in proposal[:accepted]:
+                if emit(token):
+                    done = True
+                    break
+            if done:
+                break
+
+            # Drop the KV of rejected proposals; the target's own choice
+            # at the first mismatch becomes the next pending token.
+            past = crop_cache(past, len(ids))
+            pending = greedy[accepted]
+
+    if streamer is not None:
+        streamer.end()
+
+    stats.seconds += time.perf_counter() - started
+    return torch.tensor([ids], device=input_ids.device)
@@ -0,0 +1,228 @@
+import codeop
+import re
+import warnings
+from typing import Dict, List, Optional, Type
+
+import torch
+from transformers import StoppingCriteria
+
+
+class StructuralStop(StoppingCriteria):
+    """
+    Stops each row of a (batched) generate() call as soon as its output
+    is structurally complete, instead of running to max_new_tokens.
+
+    New tokens are decoded incrementally per row and fed to `_feed()`,
+    which subclasses implement as a small state machine. `stopped_at[row]`
+    records how many new tokens the row had when it stopped.
+
+    Tokens are never decoded on their own: SentencePiece tokenizers
+    (Llama, Phi-3) drop the leading space of the first piece and a lone
+    byte-fallback token is half a character. Each step decodes the ids
+    from `prefix` (one step back) onwards and feeds only the text past
+    the decoded prefix, holding back text that ends in an incomplete
+    character.
+    """
+
+    # Prompt tokens used as left context for the first new token
+    CONTEXT_TOKENS = 5
+
+    def __init__(self, tokenizer, prompt_length: int):
+        self.tokenizer = tokenizer
+        self.prompt_length = prompt_length
+        self.stopped_at: List[Optional[int]] = []
+        self._prefix: List[int] = []
+        self._read: List[int] = []
+        self._state: List[Dict] = []
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs) -> torch.BoolTensor:
+        batch = input_ids.shape[0]
+        while len(self._read) < batch:
+            self._prefix.append(max(self.prompt_length - self.CONTEXT_TOKENS, 0))
+            self._read.append(self.prompt_length)
+            self._state.append(self._initial_state())
+            self.stopped_at.append(None)
+
+        total = input_ids.shape[1]
+        done = []
+        for row in range(batch):
+            if self.stopped_at[row] is not None:
+                done.append(True)
+                continue
+
+            text = self._new_text(row, input_ids[row])
+            if text and self._feed(self._state[row], text):
+                self.stopped_at[row] = total - self.prompt_length
+                done.append(True)
+            else:
+                done.append(False)
+
+        return torch.tensor(done, dtype=torch.bool, device=input_ids.device)
+
+    def _new_text(self, row: int, ids: torch.LongTensor) -> str:
+        """Text added by ids[_read[row]:], as TextStreamer would print it."""
+        prefix, read = self._prefix[row], self._read[row]
+        prefix_text = self.tokenizer.decode(ids[prefix:read].tolist(), skip_special_tokens=True)
+        full_text = self.tokenizer.decode(ids[prefix:].tolist(), skip_special_tokens=True)
+
+        if len(full_text) <= len(prefix_text) or full_text.endswith("\ufffd"):
+            return ""
+
+        self._prefix[row], self._read[row] = read, len(ids)
+        return full_text[len(prefix_text):]
+
+    def _initial_state(self) -> Dict:
+        return {}
+
+    def _feed(self, state: Dict, text: str) -> bool:
+        raise NotImplementedError
+
+
+class _LineStop(StructuralStop):
+    """Helper base: hands complete lines to `_line()`."""
+
+    def _initial_state(self) -> Dict:
+        return {"buffer": "", "started": False, "blank_run": 0}
+
+    def _feed(self, state: Dict, text: str) -> bool:
+        state["buffer"] += text
+        *lines, state["buffer"] = state["buffer"].split("\n")
+        return any(self._line(state, line) for line in lines)
+
+    def _line(self, state: Dict, line: str) -> bool:
+        raise NotImplementedError
+
+
+class JsonStop(StructuralStop):
+    """Reasoning stage: stop once the first JSON object's braces balance."""
+
+    def _initial_state(self) -> Dict:
+        return {"depth": 0, "started": False, "in_string": False, "escape": False}
+
+    def _feed(self, state: Dict, text: str) -> bool:
+        for ch in text:
+            if state["in_string"]:
+                if state["escape"]:
+                    state["escape"] = False
+                elif ch == "\\":
+                    state["escape"] = True
+                elif ch == '"':
+                    state["in_string"] = False
+            elif ch == '"' and state["started"]:
+                state["in_string"] = True
+            elif ch == "{":
+                state["depth"] += 1
+                state["started"] = True
+            elif ch == "}" and state["started"]:
+                state["depth"] -= 1
+                if state["depth"] == 0:
+                    return True
+        return False
+
+
+_NARRATION = re.compile(
+    r"(?i)^(here is\b|here's\b|this (code|function|script|program)\b|the (code|function) above\b|"
+    r"(note|explanation|output|example usage)\s*:(?![^=]*=))"
+)
+
+# Unindented lines that only parse as part of the statement above them
+_CONTINUATION = re.compile(r"^(elif|else|except|finally|case)\b|^[)\]}]")
+
+_STRINGS_AND_COMMENTS = re.compile(r"'(?:\\.|[^'\\])*'|\"(?:\\.|[^\"\\])*\"|#.*")
+
+
+def is_prose_line(line: str) -> bool:
+    """
+    True for an unindented line that is clearly not Python: narration
+    ("Here is...", "This code...", "Note:") or text that does not even
+    parse as the start of a statement. Valid top-level code of any shape
+    (x += 1, obj.attr = 1, with ..., pass, assert ...) is never prose.
+    """
+    stripped = line.strip()
+    if _NARRATION.match(stripped):
+        return True
+    if _CONTINUATION.match(stripped):
+        return False
+
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            codeop.compile_command(stripped, symbol="exec")  # None: incomplete, e.g. "def f():"
+    except (SyntaxError, ValueError, OverflowError):
+        return True
+    return False
+
+
+def _bracket_depth(line: str) -> int:
+    code = _STRINGS_AND_COMMENTS.sub("", line)
+    return sum(code.count(c) for c in "([{") - sum(code.count(c) for c in ")]}")
+
+
+class CodeStop(_LineStop):
+    """
+    Code stage: once code has started, stop at a closing ``` fence or
+    at the first unindented line that is clearly prose (see
+    is_prose_line). Lines inside open brackets, indented lines, comments
+    and blank lines never stop it.
+    """
+
+    def _initial_state(self) -> Dict:
+        return {**super()._initial_state(), "depth": 0}
+
+    def _line(self, state: Dict, line: str) -> bool:
+        stripped = line.strip()
+
+        if stripped.startswith("```"):
+            return state["started"]
+
+        if state["depth"] > 0 or not stripped or stripped.startswith(("#", "@")) or line[:1].isspace():
+            if state["started"]:
+                state["depth"] = max(state["depth"] + _bracket_depth(line), 0)
+            return False
+
+        if not is_prose_line(line):
+            state["started"] = True
+            state["depth"] = max(_bracket_depth(line), 0)
+            return False
+
+        return state["started"]
+
+
+_PSEUDO_EPILOGUE = re.compile(r"(?i)^(note|explanation|clarification|this pseudocode|the above)\b")
+
+
+class PseudocodeStop(_LineStop):
+    """
+    Pseudocode stage: once the block has started, stop at a closing
+    fence, at commentary (Note:/Explanation: ...) or after two blank
+    lines in a row.
+    """
+
+    def _line(self, state: Dict, line: str) -> bool:
+        stripped = line.strip()
+
+        if stripped.startswith("```"):
+            return state["started"]
+
+        if not stripped:
+            state["blank_run"] += 1
+            return state["started"] and state["blank_run"] >= 2
+        state["blank_run"] = 0
+
+        if _PSEUDO_EPILOGUE.match(stripped):
+            return state["started"]
+
+        state["started"] = True
+        return False
+
+
+STAGE_STOPPING: Dict[str, Type[StructuralStop]] = {
+    "reasoning": JsonStop,
+    "pseudocode": PseudocodeStop,
+    "code": CodeStop,
+}
+
+
+def make_stopping(stage: Optional[str], tokenizer, prompt_length: int) -> Optional[StructuralStop]:
+    cls = STAGE_STOPPING.get(stage)
+    return cls(tokenizer, prompt_length) if cls is not None else None
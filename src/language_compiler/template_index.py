@@ -0,0 +1,220 @@
+"""
+Nearest-neighbour indexes over template example embeddings.
+
+- BruteForceIndex: exact cosine scan, the right choice for small
+  libraries (the built-in INTENT_TEMPLATES)
+- IVFIndex: inverted-file index (spherical k-means lists, search probes
+  the `n_probe` closest lists) for libraries with tens of thousands of
+  examples. Pure NumPy.
+
+make_index("auto", n) picks brute force below AUTO_IVF_THRESHOLD examples.
+load_or_build_index() persists a built IVF index next to the example
+embeddings and memory-maps it on later starts.
+"""
+
+import math
+import os
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from .embedding_cache import save_npy
+
+AUTO_IVF_THRESHOLD = 20_000
+
+
+def normalize_rows(x: np.ndarray) -> np.ndarray:
+    x = np.atleast_2d(np.asarray(x, dtype=np.float32))
+    return x / np.clip(np.linalg.norm(x, axis=1, keepdims=True), 1e-12, None)
+
+
+def _top_k(scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Row-wise top-k of a (n, m) score matrix, best first."""
+    k = min(k, scores.shape[1])
+    if k == 0:
+        empty = np.zeros((scores.shape[0], 0))
+        return empty.astype(np.float32), empty.astype(np.int64)
+
+    part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-part_scores, axis=1, kind="stable")
+    return np.take_along_axis(part_scores, order, axis=1), np.take_along_axis(part, order, axis=1)
+
+
+class TemplateIndex:
+    """
+    Cosine-similarity index; ids are row positions in the built matrix.
+    normalized=True promises unit-length rows, which are then used as
+    given (a memory-mapped file stays mapped instead of being copied).
+    """
+
+    name = "index"
+
+    # Arrays that, together with the embeddings, restore a built index;
+    # empty when building is as cheap as loading
+    state_names: Tuple[str, ...] = ()
+
+    def build(self, embeddings: np.ndarray, normalized: bool = False) -> "TemplateIndex":
+        raise NotImplementedError
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Returns (scores, ids), each (n_queries, k), best first."""
+        raise NotImplementedError
+
+    def cache_key(self) -> str:
+        """Identifies the build parameters in persisted file names."""
+        return self.name
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {}
+
+    def restore(self, state: Dict[str, np.ndarray], embeddings: np.ndarray, normalized: bool = False) -> "TemplateIndex":
+        raise NotImplementedError
+
+
+class BruteForceIndex(TemplateIndex):
+    name = "brute"
+
+    def __init__(self):
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+
+    def build(self, embeddings: np.ndarray, normalized: bool = False) -> "BruteForceIndex":
+        self._vectors = embeddings if normalized else normalize_rows(embeddings)
+        return self
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        return _top_k(normalize_rows(queries) @ self._vectors.T, k)
+
+
+class IVFIndex(TemplateIndex):
+    """
+    Spherical k-means partitions the examples into `n_lists` lists
+    (default ~sqrt(n)); a query only scores the examples of its
+    `n_probe` nearest lists. Recall rises with n_probe, latency too.
+    """
+
+    name = "ivf"
+    state_names = ("centroids", "order", "bounds")
+
+    def __init__(
+        self,
+        n_lists: Optional[int] = None,
+        n_probe: int = 8,
+        iterations: int = 10,
+        train_size: int = 50_000,
+        seed: int = 0
+    ):
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.iterations = iterations
+        self.train_size = train_size
+        self.seed = seed
+
+        self.centroids = np.zeros((0, 0), dtype=np.float32)
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+        # Example ids grouped by list; list i is order[bounds[i]:bounds[i + 1]]
+        self._order = np.zeros(0, dtype=np.int64)
+        self._bounds = np.zeros(1, dtype=np.int64)
+
+    def build(self, embeddings: np.ndarray, normalized: bool = False) -> "IVFIndex":
+        vectors = embeddings if normalized else normalize_rows(embeddings)
+        n = len(vectors)
+        n_lists = self.n_lists or max(1, int(math.sqrt(n)))
+        n_lists = min(n_lists, n)
+
+        rng = np.random.default_rng(self.seed)
+
+        # Train the centroids on a sample; assign everything afterwards
+        sample = vectors
+        if n > self.train_size:
+            sample = vectors[rng.choice(n, self.train_size, replace=False)]
+
+        centroids = sample[rng.choice(len(sample), n_lists, replace=False)]
+        for _ in range(self.iterations):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            counts = np.bincount(assign, minlength=n_lists)
+            # Empty lists keep their previous centroid
+            filled = counts > 0
+            centroids[filled] = normalize_rows(sums[filled])
+
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+        order = np.argsort(assign, kind="stable")
+        bounds = np.searchsorted(assign[order], np.arange(n_lists + 1))
+
+        self.centroids = centroids
+        self._vectors = vectors
+        self._order = order.astype(np.int64)
+        self._bounds = bounds.astype(np.int64)
+        return self
+
+    def cache_key(self) -> str:
+        return f"ivf-{self.n_lists or 'auto'}-{self.iterations}-{self.train_size}-{self.seed}"
+
+    def state(self) -> Dict[str, np.ndarray]:
+        return {"centroids": self.centroids, "order": self._order, "bounds": self._bounds}
+
+    def restore(self, state: Dict[str, np.ndarray], embeddings: np.ndarray, normalized: bool = False) -> "IVFIndex":
+        self.centroids = state["centroids"]
+        self._order = state["order"]
+        self._bounds = state["bounds"]
+        self._vectors = embeddings if normalized else normalize_rows(embeddings)
+        return self
+
+    def search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        queries = normalize_rows(queries)
+        n_probe = min(self.n_probe, len(self.centroids))
+        _, probes = _top_k(queries @ self.centroids.T, n_probe)
+
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+        ids = np.full((len(queries), k), -1, dtype=np.int64)
+
+        for row, (query, lists) in enumerate(zip(queries, probes)):
+            candidates = np.concatenate([self._order[self._bounds[i]:self._bounds[i + 1]] for i in lists])
+            if len(candidates) == 0:
+                continue
+            s, local = _top_k((self._vectors[candidates] @ query)[None, :], k)
+            scores[row, :s.shape[1]] = s[0]
+            ids[row, :s.shape[1]] = candidates[local[0]]
+
+        return scores, ids
+
+
+def make_index(kind: str = "auto", n_examples: int = 0, **kwargs) -> TemplateIndex:
+    """'brute', 'ivf', or 'auto' (IVF from AUTO_IVF_THRESHOLD examples up)."""
+    if kind == "auto":
+        kind = "ivf" if n_examples >= AUTO_IVF_THRESHOLD else "brute"
+
+    if kind == "brute":
+        return BruteForceIndex()
+    if kind == "ivf":
+        return IVFIndex(**kwargs)
+
+    raise ValueError(f"Unknown index kind {kind!r}; expected 'auto', 'brute' or 'ivf'")
+
+
+def load_or_build_index(
+    index: TemplateIndex,
+    embeddings: np.ndarray,
+    cache_prefix: Optional[str] = None,
+    normalized: bool = False
+) -> TemplateIndex:
+    """
+    Builds `index` over `embeddings`, or restores it from
+    "{cache_prefix}.{cache_key}.{name}.npy" files (memory-mapped) saved
+    by an earlier build. cache_prefix should carry the same library hash
+    as the embeddings file; None always builds.
+    """
+    if cache_prefix is None or not index.state_names:
+        return index.build(embeddings, normalized=normalized)
+
+    paths = {name: f"{cache_prefix}.{index.cache_key()}.{name}.npy" for name in index.state_names}
+    if all(os.path.exists(p) for p in paths.values()):
+        state = {name: np.load(p, mmap_mode="r") for name, p in paths.items()}
+        return index.restore(state, embeddings, normalized=normalized)
+
+    index.build(embeddings, normalized=normalized)
+    for name, array in index.state().items():
+        save_npy(paths[name], array)
+    return index
@@ -0,0 +1,170 @@
+"""
+Lightweight spans for the compile pipeline.
+
+Nothing is recorded unless a trace is active:
+
+    with trace([JsonlSpanExporter("spans.jsonl")]) as t:
+        compiler.compile(...)
+    t.spans  # every finished Span, children before parents
+
+Instrumented code opens spans with `span(name)` and records on them with
+annotate() (attributes of the innermost span) and count() (counters
+added to every open span, so token counts and cache hits roll up from
+LM calls to their stage and to the whole compile). Without an active
+trace these are a context-variable lookup and return immediately.
+
+The active trace lives in a ContextVar, so concurrent compiles on
+different threads or asyncio tasks keep separate traces.
+"""
+
+import json
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start: float  # epoch seconds
+    duration_s: float = 0.0
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    counters: Dict[str, float] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+# ============================================================
+# Exporters
+# ============================================================
+
+class SpanExporter:
+    """Receives the spans of each finished trace."""
+
+    def export(self, spans: List[Span]) -> None:
+        raise NotImplementedError
+
+
+class InMemorySpanExporter(SpanExporter):
+    def __init__(self):
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]) -> None:
+        with self._lock:
+            self.spans.extend(spans)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.spans.clear()
+
+
+class JsonlSpanExporter(SpanExporter):
+    """Appends one JSON object per span to `path`."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]) -> None:
+        lines = "".join(json.dumps(s.to_dict(), default=str) + "\n" for s in spans)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+
+# ============================================================
+# Traces and spans
+# ============================================================
+
+class Trace:
+    def __init__(self, exporters: Optional[List[SpanExporter]] = None):
+        self.trace_id = uuid.uuid4().hex
+        self.exporters = list(exporters or [])
+        self.spans: List[Span] = []
+        self.stack: List[Span] = []
+
+
+_ACTIVE: ContextVar[Optional[Trace]] = ContextVar("language_compiler_trace", default=None)
+
+
+class trace:
+    """Context manager that records spans and exports them on exit."""
+
+    def __init__(self, exporters: Optional[List[SpanExporter]] = None):
+        self.trace = Trace(exporters)
+
+    def __enter__(self) -> Trace:
+        self._token = _ACTIVE.set(self.trace)
+        return self.trace
+
+    def __exit__(self, *exc) -> None:
+        _ACTIVE.reset(self._token)
+        for exporter in self.trace.exporters:
+            exporter.export(self.trace.spans)
+
+
+class span:
+    """Times a block as a child of the innermost open span."""
+
+    __slots__ = ("name", "attributes", "_trace", "_span", "_started")
+
+    def __init__(self, name: str, **attributes):
+        self.name = name
+        self.attributes = attributes
+        self._trace = None
+        self._span = None
+
+    def __enter__(self) -> Optional[Span]:
+        t = self._trace = _ACTIVE.get()
+        if t is None:
+            return None
+
+        parent = t.stack[-1].span_id if t.stack else None
+        self._span = Span(
+            name=self.name,
+            trace_id=t.trace_id,
+            span_id=uuid.uuid4().hex[:16],
+            parent_id=parent,
+            start=time.time(),
+            attributes=dict(self.attributes)
+        )
+        self._started = time.perf_counter()
+        t.stack.append(self._span)
+        return self._span
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self._span is None:
+            return
+        self._span.duration_s = time.perf_counter() - self._started
+        if exc_type is not None:
+            self._span.attributes["error"] = exc_type.__name__
+        self._trace.stack.pop()
+        self._trace.spans.append(self._span)
+
+
+def active() -> bool:
+    return _ACTIVE.get() is not None
+
+
+def annotate(**attributes) -> None:
+    """Sets attributes on the innermost open span."""
+    t = _ACTIVE.get()
+    if t is not None and t.stack:
+        t.stack[-1].attributes.update(attributes)
+
+
+def count(**counters: float) -> None:
+    """Adds to counters on every open span."""
+    t = _ACTIVE.get()
+    if t is None:
+        return
+    for s in t.stack:
+        for name, value in counters.items():
+            s.counters[name] = s.counters.get(name, 0) + value
@@ -0,0 +1,62 @@
+import asyncio
+
+from src.language_compiler.pipeline import LanguageCompiler
+from src.language_compiler.scheduler import MicroBatchScheduler
+from tests.test_batch import DummyLM, DummySemantic
+
+
+def make_compiler():
+    return LanguageCompiler(lm=DummyLM(), semantic=DummySemantic(), max_wait=0.05)
+
+
+async def compile_all(compiler, instructions, **kwargs):
+    return await asyncio.gather(*(compiler.acompile(i, **kwargs) for i in instructions))
+
+
+def test_acompile_matches_compile():
+    compiler = make_compiler()
+
+    instructions = [
+        "If temperature exceeds 30, turn on the AC.",
+        "If it takes too long, open another counter.",
+        "If temperature exceeds 25, turn on the AC.",
+    ]
+
+    expected = [compiler.compile(i, to_code=True, interactive=True) for i in instructions]
+    got = asyncio.run(compile_all(compiler, instructions, to_code=True, interactive=True))
+
+    assert [o.model_dump() for o in got] == [o.model_dump() for o in expected]
+
+
+def test_concurrent_requests_share_batches():
+    compiler = make_compiler()
+
+    instructions = [
+        "If temperature exceeds 30, turn on the AC.",
+        "If temperature exceeds 25, turn on the AC.",
+    ] * 3
+
+    asyncio.run(compile_all(compiler, instructions, to_code=True))
+
+    # One batch for the reasoning stage, one for the code stage (the
+    # pseudocode is rendered without the LLM)
+    assert compiler.lm.single_calls == 0
+    assert compiler.lm.batch_calls == 2
+    assert compiler.scheduler.stats["deduplicated"] == 8
+    assert compiler.scheduler.stats["batched_prompts"] == 4
+
+
+def test_batch_flushes_at_max_size():
+    lm = DummyLM()
+    scheduler = MicroBatchScheduler(lm, max_batch_size=2, max_wait=10.0)
+
+    async def run():
+        return await asyncio.wait_for(
+            asyncio.gather(*(scheduler.complete(f"prompt {i}", stage="code") for i in range(4))),
+            timeout=5.0
+        )
+
+    outputs = asyncio.run(run())
+
+    assert len(outputs) == 4
+    assert lm.batch_calls == 2
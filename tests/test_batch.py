@@ -0,0 +1,77 @@
+from src.language_compiler.pipeline import LanguageCompiler
+from src.language_compiler.semantic_preprocessor import SemanticResult
+
+
+class DummyLM:
+    """Fake LM that records how it was called."""
+    def __init__(self):
+        self.single_calls = 0
+        self.batch_calls = 0
+
+    def complete(self, prompt: str, **kwargs):
+        self.single_calls += 1
+        text = prompt.lower()
+
+        if "extract structured logic" in text:
+            value = "30" if "30" in prompt else "25"
+            return (
+                '{"steps": ['
+                f'{{"id": "S1", "role": "condition", "text": "temperature > {value}", "depends_on": []}},'
+                '{"id": "S2", "role": "action", "text": "TURN_ON AC", "depends_on": ["S1"]}'
+                ']}'
+            )
+
+        if "convert this json logic plan" in text:
+            value = "30" if "30" in prompt else "25"
+            return f"IF temperature > {value}:\n    TURN_ON(AC)"
+
+        return "if temperature > 25:\n    TURN_ON('AC')"
+
+    def complete_batch(self, prompts, **kwargs):
+        self.batch_calls += 1
+        outputs = [self.complete(p) for p in prompts]
+        self.single_calls -= len(prompts)
+        return outputs
+
+
+class DummySemantic:
+    def normalize(self, instruction: str) -> SemanticResult:
+        return SemanticResult(
+            normalized_instruction=instruction,
+            matched_intent=None,
+            similarity=0.0,
+            missing_slots=[]
+        )
+
+    def normalize_batch(self, instructions):
+        return [self.normalize(i) for i in instructions]
+
+
+def make_compiler():
+    return LanguageCompiler(lm=DummyLM(), semantic=DummySemantic())
+
+
+def test_compile_batch_matches_compile():
+    compiler = make_compiler()
+
+    instructions = [
+        "If temperature exceeds 30, turn on the AC.",
+        "If it takes too long, open another counter.",
+        "If temperature exceeds 25, turn on the AC.",
+    ]
+
+    expected = [compiler.compile(i, to_code=True, interactive=True) for i in instructions]
+    got = compiler.compile_batch(instructions, to_code=True, interactive=True)
+
+    assert [o.model_dump() for o in got] == [o.model_dump() for o in expected]
+
+
+def test_compile_batch_uses_one_call_per_stage():
+    compiler = make_compiler()
+
+    compiler.compile_batch(["If temperature exceeds 30, turn on the AC."] * 4, to_code=True)
+
+    assert compiler.lm.single_calls == 0
+    # reasoning and python; pseudocode is rendered without the LLM and
+    # no repair pass is needed
+    assert compiler.lm.batch_calls == 2
@@ -0,0 +1,45 @@
+from src.language_compiler.eval import benchmark
+
+
+def test_fake_benchmark_covers_every_stage():
+    rows = benchmark.run(["fake"], isolate=False)
+
+    assert [r["scenario"] for r in rows] == [
+        "semantic", "reasoning", "pseudocode", "code", "compile", "compile_batch"
+    ]
+    for r in rows:
+        assert r["lm"] == "fake"
+        assert r["instructions_per_s"] > 0
+        assert r["latency_p95_s"] >= r["latency_p50_s"]
+        assert r["peak_rss_mb"] > 0
+
+    # every LM-backed scenario generated tokens
+    assert all(r["tokens_per_s"] > 0 for r in rows if r["scenario"] != "semantic")
+
+
+def test_compare_flags_regressions_by_direction():
+    base = [{"lm": "fake", "scenario": "compile", "latency_p50_s": 1.0, "instructions_per_s": 10.0}]
+    rows = [{"lm": "fake", "scenario": "compile", "latency_p50_s": 1.5, "instructions_per_s": 12.0}]
+
+    changes = {c["metric"]: c for c in benchmark.compare(rows, base, tolerance=0.2)}
+
+    assert changes["latency_p50_s"]["regression"]
+    assert not changes["instructions_per_s"]["regression"]
+
+
+def test_isolated_scenarios_report_their_own_peak_rss():
+    rows = benchmark.run(["fake"], scenarios=["semantic", "compile"])
+
+    assert [r["scenario"] for r in rows] == ["semantic", "compile"]
+    assert all(r["peak_rss_mb"] > 0 for r in rows)
+
+
+def test_speculation_reports_a_measured_speedup(tmp_path):
+    model = benchmark.build_tiny_model(str(tmp_path / "tiny"))
+    rows = benchmark.speculation_speedup(model, benchmark.INSTRUCTIONS[:2], max_tokens=16)
+
+    assert [r["stage"] for r in rows] == benchmark.SPECULATION_STAGES
+    for r in rows:
+        assert r["greedy_s"] > 0 and r["speculative_s"] > 0
+        assert r["speedup"] == r["greedy_s"] / r["speculative_s"]
+        assert r["outputs_match"] == 1.0
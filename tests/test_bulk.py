@@ -0,0 +1,116 @@
+import json
+
+import pytest
+
+from src.language_compiler import bulk, jsonl_runner
+from src.language_compiler.schemas import CompilerOutput, LogicPlan, LogicUnit, PseudocodeBlock
+
+
+class DummyCompiler:
+    calls = []
+
+    def __init__(self, **kwargs):
+        pass
+
+    def compile_batch(self, instructions, **kwargs):
+        DummyCompiler.calls.append(list(instructions))
+        return [
+            CompilerOutput(
+                reasoning=LogicPlan(steps=[LogicUnit(id="S1", role="action", text=i)]),
+                pseudocode=PseudocodeBlock(code=f"DO {i}"),
+            )
+            for i in instructions
+        ]
+
+
+def write_rules(path, rules):
+    path.write_text("".join(json.dumps(rule) + "\n" for rule in rules))
+
+
+def test_compile_file_writes_in_order_and_resumes(tmp_path, monkeypatch):
+    monkeypatch.setattr(jsonl_runner, "LanguageCompiler", DummyCompiler)
+    DummyCompiler.calls = []
+
+    source = tmp_path / "rules.jsonl"
+    out = tmp_path / "compiled.jsonl"
+    source.write_text(
+        json.dumps("rule 0") + "\n\n"
+        + "".join(json.dumps({"instruction": f"rule {i}"}) + "\n" for i in range(1, 5))
+    )
+
+    # A previous run finished rules 0 and 1, then died mid-line
+    out.write_text(
+        json.dumps({"index": 0}) + "\n" + json.dumps({"index": 1}) + "\n" + '{"index": 2, "reasoning": {"st'
+    )
+
+    summary = bulk.compile_file(str(source), str(out), batch_size=2)
+
+    assert summary["skipped"] == 2
+    assert summary["compiled"] == 3
+    assert DummyCompiler.calls == [["rule 2", "rule 3"], ["rule 4"]]
+
+    rows = [json.loads(line) for line in out.read_text().splitlines()]
+    assert [r["index"] for r in rows] == [0, 1, 2, 3, 4]
+    assert CompilerOutput.model_validate(rows[-1]).pseudocode.code == "DO rule 4"
+
+    # Nothing left to do on a second run
+    assert bulk.compile_file(str(source), str(out))["compiled"] == 0
+
+
+def test_iter_instructions_rejects_objects_without_instruction(tmp_path):
+    source = tmp_path / "rules.jsonl"
+    source.write_text(json.dumps({"text": "rule"}) + "\n")
+
+    with pytest.raises(ValueError, match=":1:"):
+        list(bulk.iter_instructions(str(source)))
+
+
+def test_resume_is_keyed_on_ids_not_line_count(tmp_path, monkeypatch):
+    monkeypatch.setattr(jsonl_runner, "LanguageCompiler", DummyCompiler)
+    DummyCompiler.calls = []
+
+    source = tmp_path / "rules.jsonl"
+    out = tmp_path / "compiled.jsonl"
+    write_rules(source, [{"id": "a", "instruction": "rule a"}, {"id": "b", "instruction": "rule b"}])
+    bulk.compile_file(str(source), str(out))
+
+    # The file is reordered and grows before the next nightly run
+    write_rules(source, [
+        {"id": "c", "instruction": "rule c"},
+        {"id": "b", "instruction": "rule b"},
+        {"id": "a", "instruction": "rule a"},
+    ])
+    DummyCompiler.calls = []
+    summary = bulk.compile_file(str(source), str(out))
+
+    assert summary["compiled"] == 1
+    assert DummyCompiler.calls == [["rule c"]]
+    assert [json.loads(line)["id"] for line in out.read_text().splitlines()] == ["a", "b", "c"]
+
+
+def test_ids_and_positions_do_not_collide(tmp_path, monkeypatch):
+    monkeypatch.setattr(jsonl_runner, "LanguageCompiler", DummyCompiler)
+    DummyCompiler.calls = []
+
+    source = tmp_path / "rules.jsonl"
+    out = tmp_path / "compiled.jsonl"
+    write_rules(source, [{"id": 1, "instruction": "rule a"}, "rule b"])
+    bulk.compile_file(str(source), str(out))
+
+    # Position 1 is "rule b"; the id 1 of "rule a" must not mark it done
+    write_rules(source, [{"id": 1, "instruction": "rule a"}, "rule b", "rule c"])
+    DummyCompiler.calls = []
+    summary = bulk.compile_file(str(source), str(out))
+
+    assert summary["compiled"] == 1
+    assert DummyCompiler.calls == [["rule c"]]
+    rows = [json.loads(line) for line in out.read_text().splitlines()]
+    assert [(r.get("id"), r.get("index")) for r in rows] == [(1, None), (None, 1), (None, 2)]
+
+
+def test_iter_instructions_rejects_non_scalar_ids(tmp_path):
+    source = tmp_path / "rules.jsonl"
+    source.write_text(json.dumps({"id": ["a"], "instruction": "rule"}) + "\n")
+
+    with pytest.raises(ValueError, match="'id' must be a string or an integer"):
+        list(bulk.iter_instructions(str(source)))
@@ -0,0 +1,82 @@
+import sqlite3
+
+from src.language_compiler.completion_cache import CompletionCache
+
+
+def test_cache_roundtrip_and_counters(tmp_path):
+    cache = CompletionCache(str(tmp_path / "cache.sqlite"))
+    key = CompletionCache.make_key("qwen", "prompt", max_tokens=256)
+
+    assert cache.get(key) is None
+    cache.put(key, "output")
+    assert cache.get(key) == "output"
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["entries"] == 1
+
+
+def test_cache_key_depends_on_all_inputs():
+    base = CompletionCache.make_key("qwen", "prompt", max_tokens=256)
+
+    assert base == CompletionCache.make_key("qwen", "prompt", max_tokens=256)
+    assert base != CompletionCache.make_key("phi", "prompt", max_tokens=256)
+    assert base != CompletionCache.make_key("qwen", "prompt!", max_tokens=256)
+    assert base != CompletionCache.make_key("qwen", "prompt", max_tokens=500)
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = CompletionCache(str(tmp_path / "cache.sqlite"), max_entries=2)
+
+    cache.put("a", "1")
+    cache.put("b", "2")
+    cache.get("a")          # "b" is now the least recently used
+    cache.put("c", "3")
+
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+    assert cache.get("c") == "3"
+
+
+def test_cache_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    CompletionCache(path).put("k", "v")
+
+    other = CompletionCache(path)
+    assert other.get("k") == "v"
+    assert other.stats()["total_hits"] == 1
+
+
+def test_cache_get_does_not_wait_for_the_write_lock(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = CompletionCache(path, timeout=0.1)
+    cache.put("k", "v")
+
+    # Another process mid-write: lookups still answer, counters are buffered
+    writer = sqlite3.connect(path)
+    writer.execute("BEGIN IMMEDIATE")
+    assert cache.get("k") == "v"
+    assert cache.get("missing") is None
+    writer.rollback()
+
+    stats = cache.stats()
+    assert (stats["total_hits"], stats["total_misses"]) == (1, 1)
+
+
+def test_cache_counts_rows_without_scanning(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = CompletionCache(path, max_entries=3)
+    for key in "abcde":
+        cache.put(key, "1")
+    cache.put("e", "2")     # an update is not a new row
+
+    assert len(cache) == 3
+    assert cache.stats()["entries"] == 3
+
+    # Caches written before the row counter existed are counted once on open
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute("DELETE FROM counters WHERE name = 'entries'")
+    assert len(CompletionCache(path)) == 3
@@ -0,0 +1,99 @@
+import os
+import tempfile
+import threading
+
+import pytest
+
+from src.language_compiler import daemon
+from src.language_compiler.pipeline import LanguageCompiler
+from tests import test_streaming
+
+
+_init = LanguageCompiler.__init__
+
+
+def fake_init(self, model="phi", cache=None, precision="auto", backend="torch"):
+    _init(self, lm=test_streaming.DummyLM(), semantic=test_streaming.DummySemantic())
+
+
+@pytest.fixture
+def running_daemon(monkeypatch):
+    monkeypatch.setattr(LanguageCompiler, "__init__", fake_init)
+
+    # Unix socket paths are length-limited, so keep this one short
+    path = os.path.join(tempfile.mkdtemp(), "d.sock")
+    server = daemon._Server(path, daemon._Handler)
+    server.daemon = daemon.CompileDaemon(model="phi")
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield path
+
+    server.shutdown()
+    server.server_close()
+    os.unlink(path)
+
+
+def test_daemon_matches_in_process_compile(running_daemon):
+    payload = {"instruction": "If temp > 25, turn on AC.", "to_code": True, "interactive": True}
+
+    messages = list(daemon.request(payload, socket_path=running_daemon))
+
+    expected = LanguageCompiler().compile(payload["instruction"], to_code=True, interactive=True)
+    assert messages == [{"output": expected.model_dump()}]
+
+
+def test_daemon_streams_events(running_daemon):
+    payload = {"instruction": "If temp > 25, turn on AC.", "to_code": True, "stream": True}
+
+    messages = list(daemon.request(payload, socket_path=running_daemon))
+
+    assert messages[0]["event"]["kind"] == "plan"
+    assert "output" in messages[-1]
+
+
+def test_daemon_reports_errors(running_daemon):
+    with pytest.raises(RuntimeError):
+        list(daemon.request({"to_code": True}, socket_path=running_daemon))
+
+
+def test_missing_daemon_is_unavailable():
+    path = os.path.join(tempfile.mkdtemp(), "none.sock")
+
+    assert not daemon.is_running(path)
+    with pytest.raises(daemon.DaemonUnavailable):
+        list(daemon.request({"instruction": "x"}, socket_path=path))
+
+
+def test_slow_client_does_not_hold_the_compile_lock(monkeypatch):
+    monkeypatch.setattr(LanguageCompiler, "__init__", fake_init)
+    compile_daemon = daemon.CompileDaemon(model="phi")
+    payload = {"instruction": "If temp > 25, turn on AC.", "to_code": True, "stream": True}
+
+    # A client that reads one message and then stalls
+    stalled = compile_daemon.run(payload)
+    next(stalled)
+
+    done = []
+    other = threading.Thread(target=lambda: done.append(list(compile_daemon.run(payload))), daemon=True)
+    other.start()
+    other.join(timeout=10)
+
+    assert done and "output" in done[0][-1]
+
+
+def test_unusable_socket_is_unavailable(monkeypatch):
+    import errno
+    import socket
+
+    # A socket owned by another user, or a path that is not a socket
+    for error in (PermissionError(errno.EACCES, "Permission denied"), OSError(errno.ENOTSOCK, "Not a socket")):
+        class Refusing(socket.socket):
+            def connect(self, address, error=error):
+                raise error
+
+        monkeypatch.setattr(daemon.socket, "socket", Refusing)
+
+        assert not daemon.is_running("/tmp/any.sock")
+        with pytest.raises(daemon.DaemonUnavailable):
+            list(daemon.request({"instruction": "x"}, socket_path="/tmp/any.sock"))
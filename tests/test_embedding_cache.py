@@ -0,0 +1,35 @@
+import numpy as np
+
+from src.language_compiler.embedding_cache import QueryCache, load_or_build
+
+
+def test_embeddings_persist_and_reload(tmp_path):
+    calls = []
+
+    def encode(texts):
+        calls.append(list(texts))
+        return np.arange(len(texts) * 2, dtype=np.float32).reshape(len(texts), 2)
+
+    first = load_or_build("emb", ["a", "b"], encode, cache_dir=str(tmp_path))
+    second = load_or_build("emb", ["a", "b"], encode, cache_dir=str(tmp_path))
+
+    assert len(calls) == 1
+    assert isinstance(second, np.memmap)
+    assert np.array_equal(first, second)
+
+    # A changed library or embedder gets its own file
+    load_or_build("emb", ["a", "b", "c"], encode, cache_dir=str(tmp_path))
+    load_or_build("other", ["a", "b"], encode, cache_dir=str(tmp_path))
+    assert len(calls) == 3
+
+
+def test_query_cache_evicts_least_recently_used():
+    cache = QueryCache(max_entries=2)
+    cache.put("a", np.zeros(1))
+    cache.put("b", np.zeros(1))
+    cache.get("a")
+    cache.put("c", np.zeros(1))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert len(cache) == 2
@@ -0,0 +1,90 @@
+import json
+import random
+from collections import Counter
+
+from data.generation import generate_dataset
+from data.generation.instruction_templates import ambiguous, multi_condition, temporal
+from src.language_compiler.intent_parser import IntentParser
+
+
+def _read(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_same_seed_same_corpus_for_any_worker_count(tmp_path):
+    a, b = tmp_path / "a.jsonl", tmp_path / "b.jsonl"
+
+    assert generate_dataset.generate(300, str(a), seed=7, workers=1, shard_size=64) == 300
+    assert generate_dataset.generate(300, str(b), seed=7, workers=2, shard_size=64) == 300
+
+    assert a.read_bytes() == b.read_bytes()
+
+
+def test_items_are_unique_and_labelled(tmp_path):
+    path = tmp_path / "corpus.jsonl"
+    generate_dataset.generate(500, str(path), seed=1, shard_size=100)
+    rows = _read(path)
+
+    assert len({r["instruction"] for r in rows}) == 500
+    for r in rows:
+        assert r["gold_steps"]
+        assert r["gold_pseudocode"]
+        assert isinstance(r["vague_phrases"], list)
+
+
+def test_different_seeds_differ(tmp_path):
+    a, b = tmp_path / "a.jsonl", tmp_path / "b.jsonl"
+    generate_dataset.generate(50, str(a), seed=1)
+    generate_dataset.generate(50, str(b), seed=2)
+
+    assert a.read_bytes() != b.read_bytes()
+
+
+def test_ambiguous_gold_matches_precheck():
+    parser = IntentParser(lm=None)
+    rng = random.Random(0)
+
+    for _ in range(50):
+        instruction, steps = ambiguous(rng)
+        plan = parser.precheck(instruction)
+        assert plan is not None
+        assert plan.steps[0].clarification_field == steps[0]["clarification_field"]
+
+
+def test_multi_condition_gold_pseudocode():
+    instruction, steps = multi_condition(random.Random(3))
+    item = generate_dataset.make_item("multi_condition", instruction, steps, generate_dataset.PseudocodeRenderer())
+
+    assert item["gold_pseudocode"].startswith("IF ")
+    assert " AND " in item["gold_pseudocode"]
+    assert [s["role"] for s in item["gold_steps"]] == ["condition", "condition", "action"]
+
+
+def test_type_mix_follows_weights(tmp_path):
+    path = tmp_path / "corpus.jsonl"
+    generate_dataset.generate(1480, str(path), seed=0, shard_size=500)
+
+    counts = Counter(r["type"] for r in _read(path))
+    assert counts == generate_dataset.quotas(1480)
+    assert counts["ambiguous"] == counts["temporal"] == 220
+    assert counts["simple"] == counts["threshold"] == 300
+
+
+def test_simple_and_threshold_use_different_shapes(tmp_path):
+    path = tmp_path / "corpus.jsonl"
+    generate_dataset.generate(200, str(path), seed=0)
+    rows = _read(path)
+
+    assert all(r["gold_steps"][0].get("operator") for r in rows if r["type"] == "threshold")
+    assert not any(r["gold_steps"][0].get("operator") for r in rows if r["type"] == "simple")
+
+
+def test_temporal_gold_is_a_comparison():
+    rng = random.Random(5)
+
+    for _ in range(50):
+        instruction, steps = temporal(rng)
+        cond = steps[0]
+        assert cond["operator"] in ("==", "<", ">", ">=")
+        assert cond["text"].split(f" {cond['operator']} ")[0] in ("elapsed minutes", "elapsed hours", "time", "time of day")
@@ -0,0 +1,109 @@
+import numpy as np
+import pytest
+
+from src.language_compiler.eval.metrics import SemanticScorer
+
+
+class CountingEmbedder:
+    """Embeds a text as (len, vowel count, 1) and records encode() calls."""
+    def __init__(self):
+        self.calls = []
+
+    def encode(self, texts, **kwargs):
+        single = isinstance(texts, str)
+        self.calls.append(1 if single else len(texts))
+        rows = [[len(t), sum(c in "aeiou" for c in t), 1.0] for t in ([texts] if single else texts)]
+        rows = np.array(rows, dtype=np.float32)
+        return rows[0] if single else rows
+
+
+def make_scorer():
+    scorer = SemanticScorer(backend="onnx")
+    scorer._model = CountingEmbedder()
+    return scorer
+
+
+def test_score_batch_matches_score():
+    instructions = ["turn on the fan", "open the window when it is hot", "alarm"]
+    rendered = ["IF x THEN fan_on()", "IF hot THEN open_window()", "alarm"]
+
+    single = [make_scorer().score(i, r) for i, r in zip(instructions, rendered)]
+    scorer = make_scorer()
+    batch = scorer.score_batch(instructions, rendered)
+
+    assert np.allclose(batch, single)
+    assert scorer.model.calls == [3, 3]
+
+
+def test_score_batch_reuses_instruction_embeddings():
+    scorer = make_scorer()
+    precomputed = CountingEmbedder().encode(["turn on the fan"])
+
+    scores = scorer.score_batch(["turn on the fan"], ["turn on the fan"], instruction_embeddings=precomputed)
+
+    assert scorer.model.calls == [1]
+    assert scores[0] == pytest.approx(1.0)
+
+    with pytest.raises(ValueError):
+        scorer.score_batch(["a"], [])
+
+
+def test_structural_scores_compare_dependency_edges_through_alignment():
+    from src.language_compiler.eval.metrics import structural_scores
+
+    gold = [
+        {"id": "S1", "role": "condition", "text": "temperature > 30"},
+        {"id": "S2", "role": "condition", "text": "window closed"},
+        {"id": "S3", "role": "action", "text": "turn on ac", "depends_on": ["S1", "S2"]},
+    ]
+    # Same plan, different ids and order
+    pred = [
+        {"id": "A", "role": "action", "text": "turn on ac", "depends_on": ["C2", "C1"]},
+        {"id": "C1", "role": "condition", "text": "temperature > 30"},
+        {"id": "C2", "role": "condition", "text": "window closed"},
+    ]
+    scores = structural_scores(pred, gold)
+    assert scores["f1"] == 1.0
+    assert scores["dependency_f1"] == 1.0
+
+    # Wiring the action to only one condition loses half the edges
+    pred[0]["depends_on"] = ["C1"]
+    assert structural_scores(pred, gold)["dependency_f1"] == pytest.approx(2 / 3)
+
+
+def test_unmatched_predicted_edges_count_separately():
+    from src.language_compiler.eval.metrics import structural_scores
+
+    gold = [
+        {"id": "S1", "role": "condition", "text": "temperature > 30"},
+        {"id": "S2", "role": "action", "text": "turn on ac", "depends_on": ["S1"]},
+    ]
+    # Two extra steps with no gold match, each wired to S1
+    pred = gold + [
+        {"id": "X", "role": "action", "text": "ring bell", "depends_on": ["S1"]},
+        {"id": "Y", "role": "action", "text": "send alert", "depends_on": ["S1"]},
+    ]
+
+    # 1 correct edge out of 3 predicted, 1 of 1 gold
+    assert structural_scores(pred, gold)["dependency_f1"] == pytest.approx(0.5)
+
+
+def test_linear_sum_assignment_is_optimal():
+    from src.language_compiler.eval.metrics import linear_sum_assignment
+
+    cost = np.array([[4, 1, 3], [2, 0, 5], [3, 2, 2]])
+    rows, cols = linear_sum_assignment(cost)
+    assert cost[rows, cols].sum() == 5
+
+    rows, cols = linear_sum_assignment(cost[:, :2].T)
+    assert len(rows) == 2 and cost[:, :2].T[rows, cols].sum() == 3
+
+
+def test_token_jaccard_bulk_matches_per_item():
+    from src.language_compiler.eval.metrics import behavioral_equivalence, token_jaccard_bulk
+
+    preds = ["IF temp > 30 THEN ac_on()", "", "ALARM"]
+    golds = ["IF temp > 25 THEN ac_on()", "", "alarm now"]
+
+    expected = [behavioral_equivalence(p, g)["token_jaccard"] for p, g in zip(preds, golds)]
+    assert np.allclose(token_jaccard_bulk(preds, golds), expected)
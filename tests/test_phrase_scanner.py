@@ -0,0 +1,48 @@
+from src.language_compiler.intent_parser import IntentParser
+from src.language_compiler.phrase_scanner import scan, vague_phrases
+
+
+def test_scan_reports_phrases_numbers_and_verbs_in_one_pass():
+    hits = scan("If queue length exceeds 12.5 for too  long, turn on the fan.")
+
+    assert [(h.kind, h.phrase) for h in hits] == [
+        ("trigger", "if"),
+        ("number", "12.5"),
+        ("vague", "too long"),
+        ("verb", "turn on"),
+    ]
+    text = "If queue length exceeds 12.5 for too  long, turn on the fan."
+    assert all(text[h.start:h.end].lower().split() == h.phrase.split() for h in hits)
+
+
+def test_word_boundaries():
+    assert vague_phrases("Open the valve sooner than before.") == []
+    assert vague_phrases("Highlight the dashboard.") == []
+    assert vague_phrases("Open the valve soon.") == ["soon"]
+
+
+def test_longest_phrase_wins():
+    assert vague_phrases("As soon as the door opens, turn on the light.") == []
+    assert vague_phrases("Send a notification as soon as possible.") == ["as soon as possible"]
+
+
+def test_nouns_in_conditions_are_not_action_verbs():
+    def verbs(text):
+        return [h.phrase for h in scan(text) if h.kind == "verb"]
+
+    assert verbs("If the water level is lower than 20.") == []
+    assert verbs("If the heat index exceeds 40.") == []
+    assert verbs("If the sound level is above 80.") == []
+    assert verbs("If the sound level is above 80, close the windows.") == ["close"]
+
+
+def test_intent_parser_uses_scanner():
+    class NoLM:
+        def complete(self, *args, **kwargs):
+            raise AssertionError("LLM should not be called")
+
+    parser = IntentParser(NoLM(), use_rules=False)
+    plan = parser.parse("Open another counter if the queue gets busy.")
+
+    assert plan.steps[0].clarification_needed
+    assert plan.steps[0].clarification_field == "load_threshold"
@@ -0,0 +1,38 @@
+import torch
+
+from src.language_compiler.lm_provider import LMProvider
+from src.language_compiler.registry import ModelRegistry
+
+
+def make_lm(prefix_ids):
+    """LMProvider with a fake prefilled prefix: one layer, (batch, heads, seq, dim)."""
+    lm = LMProvider("dummy", registry=ModelRegistry())
+    kv = torch.arange(len(prefix_ids), dtype=torch.float32).view(1, 1, -1, 1)
+    lm._prefixes = [(prefix_ids, ((kv, kv),))]
+    lm._model = object()  # no Cache class support → legacy tuples
+    return lm
+
+
+def test_prefix_reused_and_expanded_to_batch():
+    lm = make_lm([1, 2, 3])
+    ids = torch.tensor([[1, 2, 3, 7, 8], [1, 2, 3, 9, 9]])
+
+    past = lm._prefix_past(ids, torch.ones_like(ids))
+
+    key, value = past[0]
+    assert key.shape == (2, 1, 3, 1)
+
+
+def test_prefix_skipped_when_not_shared_or_padded():
+    lm = make_lm([1, 2, 3])
+
+    other = torch.tensor([[1, 2, 4, 7]])
+    assert lm._prefix_past(other, torch.ones_like(other)) is None
+
+    padded = torch.tensor([[0, 1, 2, 3, 7]])
+    mask = torch.tensor([[0, 1, 1, 1, 1]])
+    assert lm._prefix_past(padded, mask) is None
+
+    # The whole prompt is the prefix: nothing left to prefill
+    exact = torch.tensor([[1, 2, 3]])
+    assert lm._prefix_past(exact, torch.ones_like(exact)) is None
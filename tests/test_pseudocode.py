@@ -1,30 +1,112 @@
-from src.language_compiler.schemas import LogicPlan, LogicUnit
-from src.language_compiler.pseudocode import PseudocodeGenerator
-
-
-class DummyLM:
-    """Fake LM for pseudocode generation."""
-    def complete(self, prompt: str, **kwargs) -> str:
-        return (
-            "IF NOT raining:\n"
-            "    IF temperature > 25:\n"
-            "        TURN_ON(AC)"
-        )
-
-
-def test_pseudocode_generation():
-    lm = DummyLM()
-    gen = PseudocodeGenerator(lm)
-
-    plan = LogicPlan(steps=[
-        LogicUnit(id="S1", role="condition", text="NOT raining", depends_on=[]),
-        LogicUnit(id="S2", role="condition", text="temperature > 25"),
-        LogicUnit(id="S3", role="action", text="TURN_ON AC", depends_on=["S1", "S2"]),
-    ])
-
-    pseudo = gen.generate(plan)
-
-    assert "IF NOT raining" in pseudo.code
-    assert "TURN_ON(AC)" in pseudo.code
-    assert isinstance(pseudo.code, str)
-
+from src.language_compiler.schemas import LogicPlan, LogicUnit
+from src.language_compiler.pseudocode import PseudocodeGenerator
+
+
+class DummyLM:
+    """Fake LM for pseudocode generation."""
+    def complete(self, prompt: str, **kwargs) -> str:
+        return (
+            "IF NOT raining:\n"
+            "    IF temperature > 25:\n"
+            "        TURN_ON(AC)"
+        )
+
+
+def test_pseudocode_generation():
+    lm = DummyLM()
+    gen = PseudocodeGenerator(lm)
+
+    plan = LogicPlan(steps=[
+        LogicUnit(id="S1", role="condition", text="NOT raining", depends_on=[]),
+        LogicUnit(id="S2", role="condition", text="temperature > 25"),
+        LogicUnit(id="S3", role="action", text="TURN_ON AC", depends_on=["S1", "S2"]),
+    ])
+
+    pseudo = gen.generate(plan)
+
+    assert "IF NOT raining" in pseudo.code
+    assert "TURN_ON(AC)" in pseudo.code
+    assert isinstance(pseudo.code, str)
+
+
+
+class FailingLM:
+    def complete(self, prompt: str, **kwargs) -> str:
+        raise AssertionError("LLM should not be called")
+
+
+def test_renderer_nests_conditions_without_llm():
+    gen = PseudocodeGenerator(FailingLM())
+
+    plan = LogicPlan(steps=[
+        LogicUnit(id="S1", role="condition", text="temperature", operator=">", value="30"),
+        LogicUnit(id="S2", role="condition", text="it is raining", negated=True, depends_on=["S1"]),
+        LogicUnit(id="S3", role="action", text="set AC temperature to 20", depends_on=["S2"]),
+    ])
+
+    pseudo = gen.generate(plan)
+
+    assert pseudo.code == (
+        "IF temperature > 30:\n"
+        "    IF NOT it is raining:\n"
+        "        SET_AC_TEMPERATURE(20)"
+    )
+
+
+def test_renderer_emits_todo_for_clarifications():
+    gen = PseudocodeGenerator(FailingLM())
+
+    plan = LogicPlan(steps=[
+        LogicUnit(
+            id="S1", role="condition", text="queue length", operator=">",
+            clarification_needed=True, clarification_field="queue_length_threshold"
+        ),
+        LogicUnit(id="S2", role="action", text="open another counter", depends_on=["S1"]),
+    ])
+
+    pseudo = gen.generate(plan, interactive=True)
+
+    assert "IF queue length > TODO(queue_length_threshold):" in pseudo.code
+    assert pseudo.missing_clarifications == ["queue_length_threshold"]
+
+
+def test_unrenderable_plan_falls_back_to_llm():
+    gen = PseudocodeGenerator(DummyLM())
+
+    # cyclic dependencies cannot be rendered deterministically
+    plan = LogicPlan(steps=[
+        LogicUnit(id="S1", role="action", text="A", depends_on=["S2"]),
+        LogicUnit(id="S2", role="action", text="B", depends_on=["S1"]),
+    ])
+
+    assert "TURN_ON(AC)" in gen.generate(plan).code
+
+
+def test_renderer_leaves_unknown_comparison_phrases_to_the_llm():
+    gen = PseudocodeGenerator(DummyLM())
+
+    plan = LogicPlan(steps=[
+        LogicUnit(id="S1", role="condition", text="temperature greater than 30", operator=">", value="30"),
+        LogicUnit(id="S2", role="action", text="TURN_ON AC", depends_on=["S1"]),
+    ])
+
+    assert gen.renderer.render(plan) is None
+    assert "greater than 30 >" not in gen.generate(plan).code
+
+
+def test_renderer_calls_only_known_verbs():
+    gen = PseudocodeGenerator(FailingLM())
+
+    plan = LogicPlan(steps=[
+        LogicUnit(id="S1", role="condition", text="temperature", operator=">", value="30"),
+        LogicUnit(id="S2", role="action", text="AC off", depends_on=["S1"]),
+        LogicUnit(id="S3", role="action", text="TV on", depends_on=["S1"]),
+        LogicUnit(id="S4", role="action", text="TURN_ON fan", depends_on=["S1"]),
+    ])
+
+    assert gen.generate(plan).code == (
+        "IF temperature > 30:\n"
+        "    AC_OFF()\n"
+        "    TV_ON()\n"
+        "    TURN_ON(fan)"
+    )
@@ -0,0 +1,67 @@
+import threading
+
+import pytest
+
+from src.language_compiler.registry import ModelRegistry, get_registry
+from src.language_compiler.lm_provider import LMProvider
+
+
+def test_registry_loads_each_key_once():
+    registry = ModelRegistry()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        return object()
+
+    first = registry.get_or_load(("causal_lm", "qwen"), loader)
+    second = registry.get_or_load(("causal_lm", "qwen"), loader)
+
+    assert first is second
+    assert len(calls) == 1
+
+
+def test_registry_concurrent_loads_share_one_instance():
+    registry = ModelRegistry()
+    calls = []
+    results = []
+
+    def loader():
+        calls.append(1)
+        return object()
+
+    threads = [
+        threading.Thread(target=lambda: results.append(registry.get_or_load("emb", loader)))
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert all(r is results[0] for r in results)
+
+
+def test_lm_provider_is_lazy():
+    registry = ModelRegistry()
+    lm = LMProvider(model="qwen-mini", registry=registry)
+
+    assert lm.model_name == "Qwen/Qwen2.5-0.5B-Instruct"
+    assert lm.weights_key not in registry
+
+
+def test_default_registry_is_process_wide():
+    assert get_registry() is get_registry()
+
+
+def test_precision_is_part_of_weights_key():
+    registry = ModelRegistry()
+    full = LMProvider(model="qwen-mini", registry=registry, precision="float32")
+    int8 = LMProvider(model="qwen-mini", registry=registry, precision="int8")
+
+    assert full.weights_key != int8.weights_key
+    assert full._cache_key("p", 10) != int8._cache_key("p", 10)
+
+    with pytest.raises(ValueError):
+        LMProvider(model="qwen-mini", registry=registry, precision="fp8")
@@ -0,0 +1,111 @@
+from src.language_compiler.rule_parser import RuleBasedParser
+from src.language_compiler.intent_parser import IntentParser
+from src.language_compiler.semantic_preprocessor import SemanticResult
+
+
+class FailingLM:
+    """The fast path must never reach the LLM."""
+    def complete(self, prompt: str, **kwargs) -> str:
+        raise AssertionError("LLM should not be called")
+
+
+def test_threshold_action():
+    plan = RuleBasedParser().parse(
+        "If humidity is greater than 70, dehumidify the room.", "threshold_action"
+    )
+
+    cond, action = plan.steps
+    assert cond.role == "condition"
+    assert cond.text == "humidity > 70"
+    assert (cond.operator, cond.value) == (">", "70")
+    assert action.text == "dehumidify the room"
+    assert action.depends_on == ["S1"]
+
+
+def test_threshold_action_trailing_condition():
+    plan = RuleBasedParser().parse(
+        "Notify me when CPU usage goes above 90 percent.", "threshold_action"
+    )
+
+    assert plan.steps[0].text == "CPU usage > 90"
+    assert plan.steps[1].text == "Notify me"
+
+
+def test_event_action():
+    plan = RuleBasedParser().parse(
+        "When the door opens, turn on the hallway light.", "event_action"
+    )
+
+    assert plan.steps[0].text == "the door opens"
+    assert plan.steps[1].text == "turn on the hallway light"
+
+
+def test_unless_negation():
+    plan = RuleBasedParser().parse("Water the garden unless it is raining.", "unless_negation")
+
+    assert plan.steps[0].text == "it is raining"
+    assert plan.steps[0].negated is True
+    assert plan.steps[1].text == "Water the garden"
+
+
+def test_compound_instructions_fall_back():
+    rules = RuleBasedParser()
+
+    assert rules.parse(
+        "If temperature exceeds 30 and humidity is high, close the windows.", "threshold_action"
+    ) is None
+    assert rules.parse("Turn on the AC if it is hot.", "threshold_action") is None
+    assert rules.parse("Open the door.", "unknown_intent") is None
+
+
+def test_intent_parser_fast_path_skips_llm():
+    parser = IntentParser(FailingLM())
+    sem = SemanticResult(
+        normalized_instruction="If temperature exceeds 30, turn on the AC.",
+        matched_intent="threshold_action",
+        similarity=0.95,
+        missing_slots=[]
+    )
+
+    plan = parser.parse(sem.normalized_instruction, semantic=sem)
+
+    assert plan.steps[0].text == "temperature > 30"
+    assert plan.steps[1].text == "turn on the AC"
+
+
+def test_qualifiers_after_the_value_fall_back():
+    rules = RuleBasedParser()
+
+    assert rules.parse(
+        "If the temperature is above 30 at night, turn on the AC.", "threshold_action"
+    ) is None
+    assert rules.parse(
+        "If temperature exceeds 30 for ten minutes, turn on the AC.", "threshold_action"
+    ) is None
+    assert rules.parse(
+        "If temperature exceeds 30 then turn on the AC.", "threshold_action"
+    ).steps[1].text == "turn on the AC"
+
+
+def test_negated_actions_fall_back():
+    rules = RuleBasedParser()
+
+    assert rules.parse("Do not water the garden unless it is sunny.", "unless_negation") is None
+    assert rules.parse("Don't water the garden unless it is sunny.", "unless_negation") is None
+    assert rules.parse("Never open the vents unless the fan is on.", "unless_negation") is None
+    assert rules.parse("When the door opens, do not turn on the light.", "event_action") is None
+    assert rules.parse("If humidity exceeds 70, never open the windows.", "threshold_action") is None
+
+
+def test_negated_conditions_fall_back():
+    rules = RuleBasedParser()
+
+    assert rules.parse("If pressure never exceeds 5, open the valve.", "threshold_action") is None
+    assert rules.parse("If pressure does not exceed 5, open the valve.", "threshold_action") is None
+    assert rules.parse("If pressure no longer exceeds 5, open the valve.", "threshold_action") is None
+    assert rules.parse("If pressure is not above 5, open the valve.", "threshold_action") is None
+    assert rules.parse("Open the valve if pressure never exceeds 5.", "threshold_action") is None
+
+    # "noise" contains "no" but is not a negation
+    plan = rules.parse("If noise level exceeds 80, close the windows.", "threshold_action")
+    assert plan.steps[0].text == "noise level > 80"
@@ -0,0 +1,71 @@
+import json
+
+from src.language_compiler import jsonl_runner
+from src.language_compiler.eval import run_eval
+from src.language_compiler.schemas import CompilerOutput, LogicPlan, LogicUnit, PseudocodeBlock
+
+
+class DummyCompiler:
+    calls = []
+
+    def __init__(self, **kwargs):
+        pass
+
+    def compile_batch(self, instructions, **kwargs):
+        DummyCompiler.calls.append(list(instructions))
+        return [
+            CompilerOutput(
+                reasoning=LogicPlan(steps=[LogicUnit(id="S1", role="action", text=i)]),
+                pseudocode=PseudocodeBlock(code=f"DO {i}"),
+            )
+            for i in instructions
+        ]
+
+
+class DummyScorer:
+    def __init__(self, **kwargs):
+        pass
+
+    def score(self, instruction, rendered):
+        return 1.0
+
+    def score_batch(self, instructions, rendered, instruction_embeddings=None):
+        return [1.0] * len(instructions)
+
+
+def write_gold(path, n):
+    with open(path, "w") as f:
+        for i in range(n):
+            f.write(json.dumps({
+                "instruction": f"instruction {i}",
+                "gold_steps": [{"id": "S1", "role": "action", "text": f"instruction {i}"}],
+                "gold_pseudocode": f"DO instruction {i}",
+            }) + "\n")
+
+
+def test_run_sharded_appends_and_resumes(tmp_path, monkeypatch):
+    monkeypatch.setattr(jsonl_runner, "LanguageCompiler", DummyCompiler)
+    monkeypatch.setattr(run_eval, "SemanticScorer", DummyScorer)
+    DummyCompiler.calls = []
+
+    gold = tmp_path / "gold.jsonl"
+    out = tmp_path / "results.jsonl"
+    write_gold(gold, 5)
+
+    # A previous run finished items 0 and 1, then died mid-line
+    out.write_text(
+        json.dumps({"index": 0}) + "\n" + json.dumps({"index": 1}) + "\n" + '{"index": 2, "instr'
+    )
+
+    summary = run_eval.run_sharded(str(gold), str(out), chunk_size=2)
+
+    assert summary["skipped"] == 2
+    assert summary["evaluated"] == 3
+    assert DummyCompiler.calls == [["instruction 2", "instruction 3"], ["instruction 4"]]
+
+    rows = [json.loads(line) for line in out.read_text().splitlines()]
+    assert [r["index"] for r in rows] == [0, 1, 2, 3, 4]
+    assert rows[-1]["struct_f1"] == 1.0
+
+    # Nothing left to do on a second run
+    assert run_eval.run_sharded(str(gold), str(out))["evaluated"] == 0
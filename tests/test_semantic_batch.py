@@ -0,0 +1,79 @@
+import re
+
+import numpy as np
+
+from src.language_compiler.semantic_preprocessor import SemanticPreprocessor
+
+
+class BagOfWordsEmbedder:
+    """Deterministic stand-in for MiniLM: hashed bag of words."""
+    def __init__(self):
+        self.calls = 0
+
+    def encode(self, texts, **kwargs):
+        self.calls += 1
+        single = isinstance(texts, str)
+        rows = []
+        for text in [texts] if single else texts:
+            v = np.zeros(64, dtype=np.float32)
+            for w in re.findall(r"[a-z]+", text.lower()):
+                v[sum(map(ord, w)) % 64] += 1.0
+            rows.append(v)
+        return rows[0] if single else np.stack(rows)
+
+
+def make_preprocessor():
+    return SemanticPreprocessor(embedder=BagOfWordsEmbedder(), embedding_dir=None, min_similarity=0.5)
+
+
+INSTRUCTIONS = [
+    "If temperature exceeds 30, turn on the AC.",
+    "When the door opens, turn on the hallway light.",
+    "If temperature exceeds a bit, turn on the AC.",
+    "Completely unrelated sentence about bananas.",
+]
+
+
+def test_normalize_batch_matches_normalize():
+    batch = make_preprocessor().normalize_batch(INSTRUCTIONS)
+    single = [make_preprocessor().normalize(i) for i in INSTRUCTIONS]
+
+    assert [(r.normalized_instruction, r.matched_intent, r.missing_slots) for r in batch] == \
+        [(r.normalized_instruction, r.matched_intent, r.missing_slots) for r in single]
+    assert np.allclose([r.similarity for r in batch], [r.similarity for r in single])
+
+
+def test_normalize_batch_top_k_and_single_encode():
+    pre = make_preprocessor()
+
+    results = pre.normalize_batch(INSTRUCTIONS + INSTRUCTIONS[:2], top_k=2)
+
+    # One encode for the examples, one for the distinct queries
+    assert pre.embedder.calls == 2
+    for r in results:
+        assert len(r.top_matches) == 2
+        assert r.top_matches[0][1] >= r.top_matches[1][1]
+        assert r.similarity == r.top_matches[0][1]
+
+    assert results[0].matched_intent == "threshold_action"
+    assert results[0].missing_slots == []
+    assert results[2].missing_slots == ["operator", "threshold"]  # vague, no number
+
+
+def test_persisted_ivf_index_is_reused(tmp_path, monkeypatch):
+    from src.language_compiler.template_index import IVFIndex
+
+    def make(index):
+        return SemanticPreprocessor(
+            embedder=BagOfWordsEmbedder(), embedding_dir=str(tmp_path), min_similarity=0.5, index=index
+        )
+
+    first = make(IVFIndex(n_lists=4, n_probe=4)).normalize_batch(INSTRUCTIONS)
+
+    def no_build(self, *args, **kwargs):
+        raise AssertionError("k-means should not run again")
+
+    monkeypatch.setattr(IVFIndex, "build", no_build)
+    second = make(IVFIndex(n_lists=4, n_probe=4)).normalize_batch(INSTRUCTIONS)
+
+    assert [r.matched_intent for r in first] == [r.matched_intent for r in second]
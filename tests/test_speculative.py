@@ -0,0 +1,85 @@
+from types import SimpleNamespace
+
+import torch
+
+from src.language_compiler.speculative import (
+    PromptLookupProposer,
+    Proposer,
+    SpeculationStats,
+    speculative_generate,
+)
+
+VOCAB = 50
+
+
+class CountingLM:
+    """Fake causal LM whose greedy next token is always (last token + 1)."""
+    device = torch.device("cpu")
+
+    def __call__(self, input_ids, past_key_values=None, use_cache=True):
+        seen = past_key_values[0][0].shape[2] if past_key_values is not None else 0
+        length = seen + input_ids.shape[1]
+
+        logits = torch.zeros(1, input_ids.shape[1], VOCAB)
+        for i, tok in enumerate(input_ids[0].tolist()):
+            logits[0, i, (tok + 1) % VOCAB] = 1.0
+
+        kv = torch.zeros(1, 1, length, 1)
+        return SimpleNamespace(logits=logits, past_key_values=((kv, kv),))
+
+
+class FixedProposer(Proposer):
+    """Proposes the right continuation, but breaks it every `wrong_every` tokens."""
+    def __init__(self, wrong_every=None):
+        self.wrong_every = wrong_every
+
+    def propose(self, ids, k):
+        out, tok = [], ids[-1]
+        for i in range(k):
+            tok = (tok + 1) % VOCAB
+            out.append(tok if self.wrong_every is None or (i + 1) % self.wrong_every else 0)
+        return out
+
+
+def greedy(prompt, n):
+    return prompt + [(prompt[-1] + i) % VOCAB for i in range(1, n + 1)]
+
+
+def test_output_matches_greedy_whatever_is_proposed():
+    prompt = [3, 4, 5]
+
+    for proposer in (FixedProposer(), FixedProposer(wrong_every=2), FixedProposer(wrong_every=1)):
+        out = speculative_generate(CountingLM(), torch.tensor([prompt]), proposer, max_new_tokens=12)
+        assert out[0].tolist() == greedy(prompt, 12)
+
+
+def test_perfect_proposals_need_few_target_passes():
+    stats = SpeculationStats()
+
+    speculative_generate(
+        CountingLM(), torch.tensor([[1]]), FixedProposer(),
+        max_new_tokens=20, num_speculative_tokens=4, stats=stats
+    )
+
+    assert stats.generated == 20
+    assert stats.accepted == stats.proposed
+    assert stats.target_passes < 20 / 4 + 2
+
+
+def test_stops_at_eos_inside_accepted_proposal():
+    out = speculative_generate(
+        CountingLM(), torch.tensor([[1]]), FixedProposer(),
+        max_new_tokens=20, eos_token_id=6
+    )
+
+    assert out[0].tolist() == [1, 2, 3, 4, 5, 6]
+
+
+def test_prompt_lookup_copies_after_latest_match():
+    proposer = PromptLookupProposer(max_ngram=2)
+    ids = [7, 8, 9, 1, 7, 8, 5, 6, 0, 7, 8]
+
+    # Latest earlier "7 8" is followed by 5 6 0
+    assert proposer.propose(ids, 3) == [5, 6, 0]
+    # No earlier occurrence of the last token at all
+    assert proposer.propose([1, 2, 3], 3) == []
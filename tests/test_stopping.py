@@ -0,0 +1,148 @@
+import torch
+
+from src.language_compiler.stopping import CodeStop, JsonStop, PseudocodeStop
+
+
+class CharTokenizer:
+    """One token per character; enough to drive the stopping criteria."""
+    def encode(self, text):
+        return [ord(c) for c in text]
+
+    def decode(self, ids, skip_special_tokens=True):
+        return "".join(chr(i) for i in ids)
+
+
+def sentencepiece_tokenizer():
+    """
+    Llama-style tokenizer: spaces become "▁", decode() strips the first
+    piece's leading space, and characters outside the vocabulary ("°")
+    fall back to one token per UTF-8 byte.
+    """
+    from tokenizers import Tokenizer, decoders, models, normalizers
+    from transformers import PreTrainedTokenizerFast
+
+    vocab = {"<unk>": 0}
+    for i in range(256):
+        vocab[f"<0x{i:02X}>"] = len(vocab)
+    for piece in ["▁", "\n", "▁▁", "▁▁▁▁"] + [chr(i) for i in range(33, 127)]:
+        vocab.setdefault(piece, len(vocab))
+
+    tok = Tokenizer(models.BPE(
+        vocab=vocab, merges=[("▁", "▁"), ("▁▁", "▁▁")], byte_fallback=True, unk_token="<unk>"
+    ))
+    tok.normalizer = normalizers.Sequence([normalizers.Prepend("▁"), normalizers.Replace(" ", "▁")])
+    tok.decoder = decoders.Sequence([
+        decoders.Replace("▁", " "), decoders.ByteFallback(), decoders.Fuse(), decoders.Strip(" ", 1, 0)
+    ])
+    return PreTrainedTokenizerFast(tokenizer_object=tok, clean_up_tokenization_spaces=False)
+
+
+def run(criterion_cls, prompt, rows, tok=None):
+    """Feeds each row one token at a time; returns the text kept per row."""
+    tok = tok or CharTokenizer()
+    prompt_ids = tok.encode(prompt)
+    crit = criterion_cls(tok, len(prompt_ids))
+
+    encoded = [tok.encode(r) for r in rows]
+    width = max(len(r) for r in encoded)
+    padded = [r + [r[-1]] * (width - len(r)) for r in encoded]
+
+    for step in range(1, width + 1):
+        ids = torch.tensor([prompt_ids + row[:step] for row in padded])
+        if crit(ids, None).all():
+            break
+
+    return [
+        tok.decode(encoded[i][:crit.stopped_at[i]]) if crit.stopped_at[i] is not None else rows[i]
+        for i in range(len(rows))
+    ]
+
+
+def test_json_stop_at_balanced_brace():
+    text = '{"steps": [{"id": "S1", "text": "a } in a string"}]} Explanation: ...'
+
+    kept, = run(JsonStop, "prompt", [text])
+
+    assert kept == '{"steps": [{"id": "S1", "text": "a } in a string"}]}'
+
+
+def test_code_stop_after_narration_line():
+    text = (
+        "def TURN_ON(x):\n"
+        "    print(x)\n"
+        "\n"
+        "if temperature > 25:\n"
+        "    TURN_ON('AC')\n"
+        "This code turns on the AC.\n"
+        "It is very useful.\n"
+    )
+
+    kept, = run(CodeStop, "prompt", [text])
+
+    assert kept.startswith("def TURN_ON(x):")
+    assert "TURN_ON('AC')" in kept
+    assert "very useful" not in kept
+
+
+def test_code_stop_keeps_any_valid_top_level_python():
+    from src.language_compiler.utils import clean_code
+
+    snippets = [
+        "import logging\nlogging.basicConfig(level=logging.INFO)\ndef handle(temp): ...\n",
+        "count = 0\ncount += 1\nstate.mode = 'eco'\nwith open('log.txt') as f:\n    f.write('x')\n",
+        "def check(t):\n    pass\nassert check(1) is None\nsettings = dict(\n    mode='eco',\n)\nprint(settings)\n",
+        "try:\n    run()\nexcept OSError:\n    pass\nfinally:\n    stop()\nThis code runs the job.\nIt is safe.\n",
+    ]
+
+    kept = run(CodeStop, "prompt", snippets)
+
+    # Same code-stage output with and without the stopper
+    assert [clean_code(k) for k in kept] == [clean_code(s) for s in snippets]
+    assert "handle" in kept[0] and "print(settings)" in kept[2]
+    assert "It is safe" not in kept[3]
+
+
+def test_pseudocode_stop_at_commentary():
+    text = "IF temperature > 25:\n    TURN_ON(AC)\nNote: the threshold is assumed.\nmore text\n"
+
+    kept, = run(PseudocodeStop, "prompt", [text])
+
+    assert "TURN_ON(AC)" in kept
+    assert "more text" not in kept
+
+
+def test_rows_stop_independently():
+    rows = ['{"a": 1} trailing', '{"b": {"c": 2}} more trailing text']
+
+    kept = run(JsonStop, "p", rows)
+
+    assert kept == ['{"a": 1}', '{"b": {"c": 2}}']
+
+
+def test_sentencepiece_spaces_and_multibyte_characters():
+    tok = sentencepiece_tokenizer()
+    text = (
+        "def TURN_ON(x):\n"
+        "    print(x)\n"
+        "\n"
+        "if temperature > 25:\n"
+        "    TURN_ON('AC')\n"
+        "Turns on the AC above 25°C.\n"
+        "It is very useful.\n"
+    )
+
+    kept, = run(CodeStop, "prompt", [text], tok=tok)
+
+    # Indented lines stay inside the code; narration ends it
+    assert kept.startswith("def TURN_ON(x):\n    print(x)")
+    assert "    TURN_ON('AC')" in kept
+    assert "very useful" not in kept
+
+    crit = JsonStop(tok, 0)
+    fed = []
+    crit._feed = lambda state, chunk: fed.append(chunk) or False
+    ids = tok.encode("{\"unit\": \"°C\", \"x\": 1}")
+    for step in range(1, len(ids) + 1):
+        crit(torch.tensor([ids[:step]]), None)
+
+    assert "".join(fed) == tok.decode(ids)
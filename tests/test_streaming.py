@@ -0,0 +1,66 @@
+from src.language_compiler.pipeline import LanguageCompiler
+from src.language_compiler.semantic_preprocessor import SemanticResult
+
+
+PLAN_JSON = """
+{
+  "steps": [
+    {"id": "S1", "role": "condition", "text": "temperature > 25", "depends_on": []},
+    {"id": "S2", "role": "action", "text": "TURN_ON AC", "depends_on": ["S1"]}
+  ]
+}
+"""
+
+PYTHON = "def TURN_ON(x):\n    print('TURN_ON', x)\n\nif temperature > 25:\n    TURN_ON('AC')"
+
+
+class DummyLM:
+    """Fake LM that streams its answers word by word."""
+    def complete(self, prompt: str, **kwargs) -> str:
+        if "extract structured logic" in prompt.lower():
+            return PLAN_JSON
+        return PYTHON
+
+    def stream(self, prompt: str, **kwargs):
+        text = self.complete(prompt, **kwargs)
+        for word in text.split(" "):
+            yield word + " "
+
+
+class DummySemantic:
+    def normalize(self, instruction: str) -> SemanticResult:
+        return SemanticResult(
+            normalized_instruction=instruction,
+            matched_intent=None,
+            similarity=0.0,
+            missing_slots=[]
+        )
+
+
+def make_compiler():
+    return LanguageCompiler(lm=DummyLM(), semantic=DummySemantic())
+
+
+def test_compile_stream_event_order():
+    compiler = make_compiler()
+
+    events = list(compiler.compile_stream("If temp > 25, turn on AC.", to_code=True))
+    kinds = [e.kind for e in events]
+
+    assert kinds[0] == "plan"
+    assert kinds.index("pseudocode") < kinds.index("code_token")
+    assert kinds.count("code_token") > 1
+    assert kinds[-1] == "done"
+
+
+def test_compile_stream_matches_compile():
+    compiler = make_compiler()
+
+    instruction = "If temp > 25, turn on AC."
+    expected = compiler.compile(instruction, to_code=True, interactive=True)
+    events = list(compiler.compile_stream(instruction, to_code=True, interactive=True))
+
+    assert events[-1].output.model_dump() == expected.model_dump()
+
+    streamed_code = "".join(e.text for e in events if e.kind == "code_token")
+    assert streamed_code.strip() == PYTHON
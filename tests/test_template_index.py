@@ -0,0 +1,92 @@
+import json
+
+import numpy as np
+import pytest
+
+from src.language_compiler.intent_templates import load_templates
+from src.language_compiler.template_index import BruteForceIndex, IVFIndex, load_or_build_index, make_index
+
+
+def clustered(n_clusters=50, per_cluster=40, dim=32, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_clusters, dim))
+    points = np.repeat(centers, per_cluster, axis=0) + 0.3 * rng.normal(size=(n_clusters * per_cluster, dim))
+    queries = centers + 0.3 * rng.normal(size=centers.shape)
+    return points.astype(np.float32), queries.astype(np.float32)
+
+
+def test_brute_force_is_exact():
+    points, queries = clustered()
+    scores, ids = BruteForceIndex().build(points).search(queries, 5)
+
+    normed = points / np.linalg.norm(points, axis=1, keepdims=True)
+    q = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    expected = np.argsort(-(q @ normed.T), axis=1)[:, :5]
+
+    assert np.array_equal(ids, expected)
+    assert np.all(np.diff(scores, axis=1) <= 0)
+
+
+def test_ivf_recall_against_brute_force():
+    points, queries = clustered()
+    _, exact = BruteForceIndex().build(points).search(queries, 10)
+    _, approx = IVFIndex(n_probe=4).build(points).search(queries, 10)
+
+    recall = np.mean([len(set(a) & set(e)) / 10 for a, e in zip(approx, exact)])
+    assert recall >= 0.9
+
+
+def test_make_index_auto_and_unknown():
+    assert isinstance(make_index("auto", 100), BruteForceIndex)
+    assert isinstance(make_index("auto", 50_000), IVFIndex)
+    with pytest.raises(ValueError):
+        make_index("hnsw")
+
+
+def test_load_templates_json_jsonl_and_dir(tmp_path):
+    template = {
+        "name": "door_light",
+        "canonical_form": "If the door opens, turn on the light.",
+        "examples": ["When the door opens, switch the light on."],
+    }
+    (tmp_path / "a.json").write_text(json.dumps([template]))
+    (tmp_path / "b.jsonl").write_text(json.dumps(dict(template, name="other")) + "\n")
+
+    assert [t["name"] for t in load_templates(str(tmp_path / "a.json"))] == ["door_light"]
+    assert [t["name"] for t in load_templates(str(tmp_path))] == ["door_light", "other"]
+
+    (tmp_path / "bad.json").write_text(json.dumps({"name": "broken"}))
+    with pytest.raises(ValueError):
+        load_templates(str(tmp_path / "bad.json"))
+
+
+def test_ivf_index_persists_and_memory_maps(tmp_path, monkeypatch):
+    points, queries = clustered()
+    prefix = str(tmp_path / "emb-abc")
+
+    built = load_or_build_index(IVFIndex(n_probe=4), points, prefix)
+    expected = built.search(queries, 5)
+
+    def no_build(self, *args, **kwargs):
+        raise AssertionError("k-means should not run again")
+
+    monkeypatch.setattr(IVFIndex, "build", no_build)
+    restored = load_or_build_index(IVFIndex(n_probe=4), points, prefix)
+
+    assert isinstance(restored.centroids, np.memmap)
+    assert np.array_equal(restored.search(queries, 5)[1], expected[1])
+
+    # Other build parameters get their own files
+    monkeypatch.undo()
+    load_or_build_index(IVFIndex(n_lists=7), points, prefix)
+    assert len(list(tmp_path.glob("emb-abc.ivf-7-*.centroids.npy"))) == 1
+
+
+def test_pre_normalized_embeddings_are_not_copied():
+    points, queries = clustered()
+    unit = points / np.linalg.norm(points, axis=1, keepdims=True)
+
+    index = BruteForceIndex().build(unit, normalized=True)
+
+    assert index._vectors is unit
+    assert np.array_equal(index.search(queries, 5)[1], BruteForceIndex().build(points).search(queries, 5)[1])
@@ -0,0 +1,84 @@
+import json
+
+from src.language_compiler import tracing
+from src.language_compiler.pipeline import LanguageCompiler
+from tests.test_batch import DummyLM, DummySemantic
+
+
+class BrokenCodeLM(DummyLM):
+    """First code attempt is invalid Python, so the repair pass runs."""
+    def complete(self, prompt: str, **kwargs):
+        if "syntax errors" in prompt:
+            return "turn_on('AC')"
+        out = super().complete(prompt, **kwargs)
+        return "if temperature >:" if out.startswith("if temperature > 25") else out
+
+
+def make_compiler(lm=None, **kwargs):
+    from src.language_compiler.pseudocode import PseudocodeGenerator
+
+    compiler = LanguageCompiler(lm=lm or DummyLM(), semantic=DummySemantic(), **kwargs)
+    compiler.pseudo = PseudocodeGenerator(compiler.lm, use_renderer=False)
+    return compiler
+
+
+def test_metrics_are_off_by_default():
+    out = make_compiler().compile("If temperature exceeds 30, turn on the AC.", to_code=True)
+    assert out.metrics is None
+
+
+def test_compile_metrics_per_stage_with_repair_and_fallback(tmp_path):
+    memory = tracing.InMemorySpanExporter()
+    path = tmp_path / "spans.jsonl"
+    compiler = make_compiler(
+        lm=BrokenCodeLM(),
+        collect_metrics=True,
+        span_exporters=[memory, tracing.JsonlSpanExporter(str(path))]
+    )
+
+    out = compiler.compile("If temperature exceeds 30, turn on the AC.", to_code=True)
+
+    metrics = out.metrics
+    assert [s.stage for s in metrics.stages] == ["semantic", "reasoning", "pseudocode", "code"]
+    stages = {s.stage: s for s in metrics.stages}
+    assert stages["reasoning"].source == "llm"
+    assert stages["code"].repaired
+    assert metrics.repaired and metrics.fallback
+    assert metrics.wall_s >= sum(s.wall_s for s in metrics.stages)
+
+    names = [s.name for s in memory.spans]
+    assert names.count("repair") == 1 and names[-1] == "compile"
+    assert [json.loads(line)["name"] for line in path.read_text().splitlines()] == names
+
+
+def test_counters_roll_up_to_every_open_span():
+    with tracing.trace() as t:
+        with tracing.span("outer"):
+            with tracing.span("inner"):
+                tracing.count(generated_tokens=5)
+                tracing.annotate(source="llm")
+            tracing.count(generated_tokens=2)
+
+    inner, outer = t.spans
+    assert inner.counters == {"generated_tokens": 5}
+    assert outer.counters == {"generated_tokens": 7}
+    assert inner.parent_id == outer.span_id
+    assert inner.attributes == {"source": "llm"} and outer.attributes == {}
+
+    # Outside a trace everything is a no-op
+    with tracing.span("ignored") as s:
+        tracing.count(generated_tokens=1)
+    assert s is None
+
+
+def test_streamed_tokens_are_counted_on_the_callers_span(tmp_path):
+    from src.language_compiler.eval.benchmark import build_tiny_model
+    from src.language_compiler.lm_provider import LMProvider
+
+    lm = LMProvider(model=build_tiny_model(str(tmp_path / "tiny")), precision="float32")
+
+    with tracing.trace() as t:
+        with tracing.span("pseudocode"):
+            "".join(lm.stream("If temp > 25, turn on AC.", max_tokens=8))
+
+    assert t.spans[0].counters["generated_tokens"] == lm.token_report()["default"]["generated_tokens"] > 0
@@ -1,23 +1,33 @@
-from src.language_compiler.utils import safe_json_loads
-
-
-def test_safe_json_loads_basic():
-    raw = "extra text {\"a\": 1, \"b\": 2} trailing text"
-    data = safe_json_loads(raw)
-    assert data["a"] == 1
-    assert data["b"] == 2
-
-
-def test_safe_json_loads_nested():
-    raw = """
-    Some text here
-    {
-       "steps": [
-          {"id": "S1", "role": "condition", "text": "x > 0", "depends_on": []}
-       ]
-    }
-    More garbage
-    """
-    data = safe_json_loads(raw)
-    assert "steps" in data
-    assert data["steps"][0]["id"] == "S1"
+from src.language_compiler.utils import cos_sim, safe_json_loads
+
+
+def test_safe_json_loads_basic():
+    raw = "extra text {\"a\": 1, \"b\": 2} trailing text"
+    data = safe_json_loads(raw)
+    assert data["a"] == 1
+    assert data["b"] == 2
+
+
+def test_safe_json_loads_nested():
+    raw = """
+    Some text here
+    {
+       "steps": [
+          {"id": "S1", "role": "condition", "text": "x > 0", "depends_on": []}
+       ]
+    }
+    More garbage
+    """
+    data = safe_json_loads(raw)
+    assert "steps" in data
+    assert data["steps"][0]["id"] == "S1"
+
+
+def test_cos_sim_rows_against_rows():
+    a = [1.0, 0.0]
+    b = [[2.0, 0.0], [0.0, 3.0], [-1.0, 0.0]]
+
+    sims = cos_sim(a, b)
+
+    assert sims.shape == (1, 3)
+    assert sims[0].tolist() == [1.0, 0.0, -1.0]